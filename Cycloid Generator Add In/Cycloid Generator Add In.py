@@ -1,12 +1,21 @@
 # Assuming you have not changed the general structure of the template no modification is needed in this file.
+import time
+_import_start = time.perf_counter()
+
 from . import commands
 from .lib import fusionAddInUtils as futil
+from . import config
 import adsk.core, adsk.fusion,traceback
 
+_import_time = time.perf_counter() - _import_start
+
 def run(context):
     try:
         # This will run the start function in each of your commands as defined in commands/__init__.py
+        start = time.perf_counter()
         commands.start()
+        futil.log(f'{config.ADDIN_NAME} started: imports {_import_time * 1000:.1f} ms, '
+                  f'start {(time.perf_counter() - start) * 1000:.1f} ms')
 
 
     except:
@@ -0,0 +1,842 @@
+import array
+import hashlib
+import json
+import math
+import time
+from typing import Callable
+
+import adsk.core
+import adsk.fusion
+
+from ...lib import fusionAddInUtils as futil
+from ...lib import cycloidGeometry as geometry
+from . import emit
+
+# Extrude operations used by the plan, mapped to the Fusion feature operation when applied.
+NEW_BODY = 'new'
+CUT = 'cut'
+JOIN = 'join'
+
+# Components of a drive built as an assembly, see drive_plan.
+DISC_COMPONENT = 'Cycloid Disc'
+RING_COMPONENT = 'Pin Ring'
+PIN_COMPONENT = 'Roller Pin'
+OUTPUT_PIN_COMPONENT = 'Output Pin'
+
+# Every entity apply_plan creates is tagged with an attribute holding the plan step it was
+# created for, so a later run can find the drive again and only change what differs.
+ATTRIBUTE_GROUP = 'CycloidGenerator'
+STEP_ATTRIBUTE = 'step'
+# The component a drive is built in carries the command inputs of the last build, see tag_drive.
+DRIVE_ATTRIBUTE = 'drive'
+# Inputs that were stored under another name by earlier versions, by their old name.
+RENAMED_PARAMETERS = {'stage_count': 'disc_set_count'}
+
+# Actions of apply_plan for a step of the new plan, see _diff_plan.
+KEEP = 'keep'
+EDIT = 'edit'
+CREATE = 'create'
+
+# Steps whose entities can be changed in place. Any other changed step is deleted and created again.
+_EDITABLE_KINDS = frozenset(('sketch', 'extrude', 'instance'))
+
+# Existing entities are deleted in this order, the reverse of the order they are created in.
+# A copy is made of a copy paste feature ('paste') followed by a move feature ('copy').
+_DELETE_ORDER = ('instance', 'copy', 'paste', 'extrude', 'sketch', 'component')
+
+
+class SketchStep:
+    """A sketch to create: closed outlines and circles, every curve carries a tag.
+
+    Tags are used by ExtrudeStep to pick profiles by the curves of their outer loop, so the
+    plan never depends on the order in which Fusion returns profiles. An outline of identical
+    lobes stores only its first lobe, see emit.emit_profile.
+    """
+
+    def __init__(self, name: str, plane: str = 'xZ', component: str = None):
+        self.name = name
+        self.plane = plane
+        self.component = component
+        self.outlines = []
+        self.circles = []
+
+    def add_outline(self, tag: str, xs, ys, lobes: int = 1):
+        self.outlines.append((tag, xs, ys, lobes))
+
+    def add_circle(self, tag: str, x: float, y: float, radius: float):
+        self.circles.append((tag, float(x), float(y), float(radius)))
+
+
+class ExtrudeStep:
+    """One extrude of every profile of a sketch whose outer loop is made of curves with one of `tags`."""
+
+    def __init__(self, name: str, sketch: str, tags, operation: str, distance: float):
+        self.name = name
+        self.sketch = sketch
+        self.tags = frozenset(tags)
+        self.operation = operation
+        self.distance = distance
+
+
+class CopyStep:
+    """A copy of the bodies of an extrude, moved by a rotation about the drive axis and a shift along it.
+
+    The drive axis is the normal of the sketch the extrude was made from, through its origin.
+    """
+
+    def __init__(self, name: str, source: str, angle: float, axial_offset: float):
+        self.name = name
+        self.source = source
+        self.angle = angle
+        self.axial_offset = axial_offset
+
+
+class InstanceStep:
+    """An occurrence of a plan component, moved by a rotation about the drive axis and a shift along it.
+
+    The occurrence references the bodies of the component instead of copying them. The drive
+    axis is the normal of the first sketch of the component, through its origin.
+    """
+
+    def __init__(self, name: str, component: str, angle: float, axial_offset: float):
+        self.name = name
+        self.component = component
+        self.angle = angle
+        self.axial_offset = axial_offset
+
+
+class FeaturePlan:
+    """Declarative list of the components, sketches, extrudes, body copies and occurrences that build a drive.
+
+    Sketches without a component are created in the component the plan is applied to.
+    """
+
+    def __init__(self, emit_mode: str = emit.EMIT_SPLINE):
+        self.emit_mode = emit_mode
+        self.components = []
+        self.sketches = []
+        self.extrudes = []
+        self.copies = []
+        self.instances = []
+
+    def component(self, name: str) -> str:
+        self.components.append(name)
+        return name
+
+    def sketch(self, name: str, plane: str = 'xZ', component: str = None) -> SketchStep:
+        step = SketchStep(name, plane, component)
+        self.sketches.append(step)
+        return step
+
+    def extrude(self, name: str, sketch: str, tags, operation: str, distance: float) -> ExtrudeStep:
+        step = ExtrudeStep(name, sketch, tags, operation, distance)
+        self.extrudes.append(step)
+        return step
+
+    def copy(self, name: str, source: str, angle: float, axial_offset: float) -> CopyStep:
+        step = CopyStep(name, source, angle, axial_offset)
+        self.copies.append(step)
+        return step
+
+    def instance(self, name: str, component: str, angle: float, axial_offset: float) -> InstanceStep:
+        step = InstanceStep(name, component, angle, axial_offset)
+        self.instances.append(step)
+        return step
+
+
+class ExistingStep:
+    """An entity created by an earlier run for a plan step, found through its tag.
+
+    kind, name, component, key and params are the tag written by apply_plan, see _plan_records.
+    """
+
+    def __init__(self, entity, kind: str, name: str, component: str = None, key=None, params=None):
+        self.entity = entity
+        self.kind = kind
+        self.name = name
+        self.component = component
+        self.key = key
+        self.params = params
+
+
+class PlanReport:
+    """Elapsed time and Fusion API calls per step of an applied plan."""
+
+    def __init__(self):
+        self.steps = []
+
+    def add(self, name: str, elapsed: float, calls: int):
+        self.steps.append((name, elapsed, calls))
+
+    @property
+    def elapsed(self) -> float:
+        return sum(elapsed for _, elapsed, _ in self.steps)
+
+    @property
+    def total_calls(self) -> int:
+        return sum(calls for _, _, calls in self.steps)
+
+    def summary(self) -> str:
+        steps = ', '.join(f'{name} {elapsed * 1000:.1f} ms/{calls} calls' for name, elapsed, calls in self.steps)
+        return f'{len(self.steps)} steps, {self.total_calls} API calls, {self.elapsed * 1000:.1f} ms ({steps})'
+
+
+def drive_plan(drive: geometry.DriveGeometry, disk_extent_length: float, roller_extent_length: float,
+               *, emit_mode: str = emit.EMIT_SPLINE, disc_count: int = 1, disc_set_count: int = 1,
+               components: bool = False) -> FeaturePlan:
+    """Builds the feature plan of a drive.
+
+    Two sketches on the XZ plane replace the seven separate sketches of the original build:
+    - 'disc' holds the disc outline with the eccentric bore and every output hole drawn in place,
+      so a single new body extrude creates the finished disc without any cut or pattern.
+    - 'ring' holds the roller plate, its throughhole and every roller pin. The plate and the pins
+      are extruded from it in opposite directions, again without cut or pattern.
+
+    With more than one disc per set or more than one stacked set, every further disc is a moved
+    copy of the first disc, see cycloidGeometry.disc_placements, so the profile is sketched only
+    once. All sets share the one ring of roller pins, which is made long enough to span every disc.
+
+    If components is True the drive is built as an assembly instead, see _assembly_plan.
+    """
+    plan = FeaturePlan(emit_mode)
+    pin_length = max(roller_extent_length, geometry.stack_length(disc_count, disc_set_count, disk_extent_length))
+    placements = geometry.disc_placements(disc_count, disc_set_count, disk_extent_length)
+    if components:
+        return _assembly_plan(plan, drive, disk_extent_length, pin_length, placements)
+
+    disc = plan.sketch('disc')
+    disc.add_outline('outline', *drive.outline.lobe_points(), lobes=drive.outline.lobe_count)
+    bore_x, bore_y = drive.bore_center
+    disc.add_circle('bore', bore_x, bore_y, drive.bore_radius)
+    for x, y in zip(drive.hole_xs, drive.hole_ys):
+        disc.add_circle('hole', x, y, drive.hole_radius)
+
+    ring = plan.sketch('ring')
+    ring.add_circle('plate', 0.0, 0.0, drive.plate_radius)
+    ring.add_circle('throughhole', 0.0, 0.0, drive.throughhole_radius)
+    for x, y in zip(drive.pin_xs, drive.pin_ys):
+        ring.add_circle('pin', x, y, drive.pin_radius)
+
+    plan.extrude('disc', 'disc', ['outline'], NEW_BODY, disk_extent_length)
+    # The plate is the annulus together with the pin regions so it is solid under the pins.
+    plan.extrude('roller plate', 'ring', ['plate', 'pin'], NEW_BODY, -disk_extent_length)
+    plan.extrude('roller pins', 'ring', ['pin'], NEW_BODY, pin_length)
+
+    for placement in placements:
+        if not placement.is_first:
+            plan.copy(f'disc {placement.disc_set + 1}.{placement.index + 1}', 'disc',
+                      placement.angle, placement.axial_offset)
+    return plan
+
+
+def _assembly_plan(plan: FeaturePlan, drive: geometry.DriveGeometry, disk_extent_length: float,
+                   pin_length: float, placements: list) -> FeaturePlan:
+    # Every part is a component with its own sketch, and every repeated part is an occurrence of
+    # its component. Only one roller pin and one output pin are modeled, so the number of bodies
+    # and sketch curves does not grow with the pin count.
+    plan.component(DISC_COMPONENT)
+    disc = plan.sketch('disc', component=DISC_COMPONENT)
+    disc.add_outline('outline', *drive.outline.lobe_points(), lobes=drive.outline.lobe_count)
+    bore_x, bore_y = drive.bore_center
+    disc.add_circle('bore', bore_x, bore_y, drive.bore_radius)
+    for x, y in zip(drive.hole_xs, drive.hole_ys):
+        disc.add_circle('hole', x, y, drive.hole_radius)
+    plan.extrude('disc', 'disc', ['outline'], NEW_BODY, disk_extent_length)
+    for placement in placements:
+        if not placement.is_first:
+            plan.instance(f'disc {placement.disc_set + 1}.{placement.index + 1}', DISC_COMPONENT,
+                          placement.angle, placement.axial_offset)
+
+    plan.component(RING_COMPONENT)
+    ring = plan.sketch('ring', component=RING_COMPONENT)
+    ring.add_circle('plate', 0.0, 0.0, drive.plate_radius)
+    ring.add_circle('throughhole', 0.0, 0.0, drive.throughhole_radius)
+    plan.extrude('roller plate', 'ring', ['plate'], NEW_BODY, -disk_extent_length)
+
+    # The pins are patterned around the drive axis, pin 0 and output pin 0 lie on the x axis.
+    plan.component(PIN_COMPONENT)
+    pin = plan.sketch('pin', component=PIN_COMPONENT)
+    pin.add_circle('pin', drive.pin_xs[0], drive.pin_ys[0], drive.pin_radius)
+    plan.extrude('roller pin', 'pin', ['pin'], NEW_BODY, pin_length)
+    for index in range(1, drive.pin_count):
+        plan.instance(f'roller pin {index + 1}', PIN_COMPONENT, 2 * math.pi * index / drive.pin_count, 0.0)
+
+    # The output pins are only possible while the holes are wider than the eccentric motion.
+    if drive.output_pin_radius > 0:
+        hole_count = len(drive.hole_xs)
+        plan.component(OUTPUT_PIN_COMPONENT)
+        output_pin = plan.sketch('output pin', component=OUTPUT_PIN_COMPONENT)
+        output_pin.add_circle('output pin', drive.hole_xs[0] - bore_x, drive.hole_ys[0] - bore_y,
+                              drive.output_pin_radius)
+        plan.extrude('output pin', 'output pin', ['output pin'], NEW_BODY, pin_length)
+        for index in range(1, hole_count):
+            plan.instance(f'output pin {index + 1}', OUTPUT_PIN_COMPONENT, 2 * math.pi * index / hole_count, 0.0)
+    return plan
+
+
+def _array_bytes(values) -> bytes:
+    return values.tobytes() if hasattr(values, 'tobytes') else array.array('d', values).tobytes()
+
+
+def _sketch_digest(step: SketchStep, emit_mode: str) -> str:
+    # Digest of everything drawn in a sketch, changes whenever a curve would change.
+    digest = hashlib.blake2b(emit_mode.encode(), digest_size=16)
+    for tag, xs, ys, lobes in step.outlines:
+        digest.update(f'{tag} {lobes}'.encode())
+        digest.update(_array_bytes(xs))
+        digest.update(_array_bytes(ys))
+    digest.update(repr(step.circles).encode())
+    return digest.hexdigest()
+
+
+def _plan_records(plan: FeaturePlan) -> dict:
+    # The tag of every step as (kind, name) -> record, in the order apply_plan creates them.
+    # key is what identifies the entity, params what can change without replacing it. Records
+    # go through JSON so they compare equal to the tags read back by find_drive.
+    sketch_components = {step.name: step.component for step in plan.sketches}
+    records = {}
+    for name in plan.components:
+        records['component', name] = {'component': name, 'key': None, 'params': None}
+    for step in plan.sketches:
+        records['sketch', step.name] = {'component': step.component, 'key': step.plane,
+                                        'params': _sketch_digest(step, plan.emit_mode)}
+    for step in plan.extrudes:
+        records['extrude', step.name] = {'component': sketch_components[step.sketch],
+                                         'key': [step.sketch, sorted(step.tags), step.operation],
+                                         'params': step.distance}
+    for step in plan.copies:
+        records['copy', step.name] = {'component': None, 'key': step.source,
+                                      'params': [step.angle, step.axial_offset]}
+    for step in plan.instances:
+        records['instance', step.name] = {'component': None, 'key': step.component,
+                                          'params': [step.angle, step.axial_offset]}
+    for (kind, name), record in records.items():
+        record.update(kind=kind, name=name)
+    return {step_id: json.loads(json.dumps(record)) for step_id, record in records.items()}
+
+
+def _dependencies(plan: FeaturePlan) -> dict:
+    # The step each step is built from, as (kind, name) -> (kind, name).
+    dependencies = {}
+    for step in plan.sketches:
+        if step.component is not None:
+            dependencies['sketch', step.name] = ('component', step.component)
+    for step in plan.extrudes:
+        dependencies['extrude', step.name] = ('sketch', step.sketch)
+    for step in plan.copies:
+        dependencies['copy', step.name] = ('extrude', step.source)
+    for step in plan.instances:
+        dependencies['instance', step.name] = ('component', step.component)
+    return dependencies
+
+
+def _diff_plan(plan: FeaturePlan, existing: dict) -> tuple:
+    # Compares a plan with the steps of an earlier run.
+    # Returns (records, actions, stale): the tag of every step, KEEP, EDIT or CREATE for every
+    # step, and the ExistingStep entities to delete, in deletion order.
+    records = _plan_records(plan)
+    dependencies = _dependencies(plan)
+    # Profiles are picked by the tags of freshly drawn curves, so a new extrude of a kept
+    # sketch needs the sketch redrawn. Those sketches are forced to EDIT and the diff repeated.
+    forced = set()
+    while True:
+        actions = {}
+        for step_id, record in records.items():
+            old = existing.get(step_id)
+            dependency = actions.get(dependencies.get(step_id), KEEP)
+            if old is None or old.key != record['key'] or old.component != record['component'] or dependency == CREATE:
+                action = CREATE
+            elif old.params != record['params'] or dependency == EDIT or step_id in forced:
+                action = EDIT
+            else:
+                action = KEEP
+            if action == EDIT and step_id[0] not in _EDITABLE_KINDS:
+                action = CREATE
+            actions[step_id] = action
+        redraw = {dependencies[step_id] for step_id, action in actions.items()
+                  if step_id[0] == 'extrude' and action == CREATE and actions[dependencies[step_id]] == KEEP}
+        if not redraw:
+            break
+        forced |= redraw
+
+    stale = [old for step_id, old in existing.items()
+             if actions.get(step_id, CREATE) == CREATE and old.kind != 'paste']
+    stale += [old for old in existing.values()
+              if old.kind == 'paste' and actions.get(('copy', old.name), CREATE) == CREATE]
+    # Entities inside a deleted component go with it.
+    deleted_components = {old.name for old in stale if old.kind == 'component'}
+    stale = [old for old in stale if old.kind == 'component' or old.component not in deleted_components]
+    stale.sort(key=lambda old: _DELETE_ORDER.index(old.kind))
+    return records, actions, stale
+
+
+def find_drive(design: adsk.fusion.Design) -> dict:
+    """Finds the entities of a drive built by an earlier run of apply_plan.
+
+    Only one drive per design is tracked, if there are several the tags of the last found win.
+
+    :returns:
+        A dict (kind, name) -> ExistingStep, empty if the design has no tagged drive.
+    """
+    existing = {}
+    for attribute in design.findAttributes(ATTRIBUTE_GROUP, STEP_ATTRIBUTE):
+        entity = attribute.parent
+        if entity is None:
+            continue
+        try:
+            record = json.loads(attribute.value)
+            step = ExistingStep(entity, **record)
+        except (ValueError, TypeError):
+            futil.log(f'Ignoring an unreadable {ATTRIBUTE_GROUP} tag: {attribute.value!r}')
+            continue
+        existing[step.kind, step.name] = step
+    return existing
+
+
+def tag_drive(component: adsk.fusion.Component, parameters: dict):
+    """Stores the inputs a drive was built from on the component it was built in."""
+    component.attributes.add(ATTRIBUTE_GROUP, DRIVE_ATTRIBUTE, json.dumps(parameters))
+
+
+def upgrade_parameters(parameters: dict) -> dict:
+    """Returns stored inputs with the names of earlier versions replaced, see RENAMED_PARAMETERS."""
+    return {RENAMED_PARAMETERS.get(name, name): value for name, value in parameters.items()}
+
+
+def drive_parameters(component: adsk.fusion.Component):
+    """Returns the inputs stored by tag_drive as a dict, or None if the component has no drive."""
+    attribute = component.attributes.itemByName(ATTRIBUTE_GROUP, DRIVE_ATTRIBUTE)
+    if attribute is None:
+        return None
+    try:
+        return upgrade_parameters(json.loads(attribute.value))
+    except ValueError:
+        return None
+
+
+def _tag(entity, record: dict):
+    entity.attributes.add(ATTRIBUTE_GROUP, STEP_ATTRIBUTE, json.dumps(record, sort_keys=True))
+
+
+def _fill_sketch(sketch, step: SketchStep, emit_mode: str) -> tuple:
+    # Draws the outlines and circles of a step into a sketch.
+    # Returns (tags_by_token, calls) with the tag of every curve by its entity token.
+    sketch.isComputeDeferred = True
+    calls = 1
+    tags_by_token = {}
+    for tag, xs, ys, lobes in step.outlines:
+        with futil.stage('sketch emission'):
+            curves, stats = emit.emit_profile(sketch, xs, ys, mode=emit_mode, lobes=lobes)
+        calls += stats.total_calls
+        for curve in curves:
+            tags_by_token[curve.entityToken] = tag
+        calls += len(curves)
+
+    circles = sketch.sketchCurves.sketchCircles
+    for tag, x, y, radius in step.circles:
+        circle = circles.addByCenterRadius(adsk.core.Point3D.create(x, y, 0), radius)
+        tags_by_token[circle.entityToken] = tag
+
+    sketch.isComputeDeferred = False
+    calls += 1 + 3 * len(step.circles)
+    return tags_by_token, calls
+
+
+def _clear_sketch(design: adsk.fusion.Design, sketch) -> int:
+    # Deletes every curve of a sketch in one call, returns the API calls made.
+    curves = adsk.core.ObjectCollection.create()
+    for curve in sketch.sketchCurves:
+        curves.add(curve)
+    if curves.count:
+        design.deleteEntities(curves)
+    calls = 3 + 2 * curves.count
+    return calls
+
+
+_OPERATIONS = {
+    NEW_BODY: adsk.fusion.FeatureOperations.NewBodyFeatureOperation,
+    CUT: adsk.fusion.FeatureOperations.CutFeatureOperation,
+    JOIN: adsk.fusion.FeatureOperations.JoinFeatureOperation,
+}
+
+
+def _select_profiles(sketch, tags_by_token: dict, tags: frozenset):
+    # Profiles whose outer loop only consists of curves carrying one of the requested tags.
+    selected = adsk.core.ObjectCollection.create()
+    calls = 1
+    for profile in sketch.profiles:
+        for loop in profile.profileLoops:
+            calls += 1
+            if not loop.isOuter:
+                continue
+            curve_tags = {tags_by_token.get(curve.sketchEntity.entityToken) for curve in loop.profileCurves}
+            calls += loop.profileCurves.count
+            if curve_tags <= tags:
+                selected.add(profile)
+                calls += 1
+            break
+    return selected, calls
+
+
+def _drive_axis(sketch) -> tuple:
+    # The normal of the sketch through its origin, as (direction, origin) in model space.
+    return sketch.xDirection.crossProduct(sketch.yDirection), sketch.origin
+
+
+def _placement_transform(drive_axis: tuple, angle: float, axial_offset: float):
+    # Rotation about the drive axis, then a shift along it.
+    axis, origin = drive_axis
+    transform = adsk.core.Matrix3D.create()
+    transform.setToRotation(angle, axis, origin)
+    if not axial_offset:
+        return transform
+    shift = axis.copy()
+    shift.scaleBy(axial_offset)
+    translation = adsk.core.Matrix3D.create()
+    translation.translation = shift
+    transform.transformBy(translation)
+    return transform
+
+
+class PlanJournal:
+    """Undo log of a plan being applied, so a cancelled build can be rolled back.
+
+    Arguments:
+    previous -- The FeaturePlan the existing drive was built from. Sketches redrawn for the new
+                plan are drawn from it again on rollback. If None they keep the new curves.
+    """
+
+    def __init__(self, previous: FeaturePlan = None):
+        self.previous = previous
+        self._undo = []
+
+    def add(self, function: Callable, *args):
+        self._undo.append((function, args))
+
+    def rollback(self) -> int:
+        """Undoes everything recorded, newest first. Returns the number of undo actions run."""
+        count = len(self._undo)
+        while self._undo:
+            function, args = self._undo.pop()
+            function(*args)
+        return count
+
+
+def _old_record(old: ExistingStep) -> dict:
+    return {'kind': old.kind, 'name': old.name, 'component': old.component, 'key': old.key, 'params': old.params}
+
+
+def _restore_distance(extrude, distance: float):
+    extrude.extentOne.distance.value = distance
+
+
+def _restore_transform(occurrence, transform):
+    occurrence.transform2 = transform
+
+
+def _redraw_sketch(design: adsk.fusion.Design, sketch, step: SketchStep, emit_mode: str, extrudes: list):
+    # Undo of a redrawn sketch: draw the previous step again and give the extrudes in
+    # `extrudes`, as (ExtrudeFeature, previous ExtrudeStep), their previous profiles back.
+    if step is None:
+        futil.log(f'Cannot restore the curves of sketch {sketch.name}, the previous plan is unknown')
+        return
+    _clear_sketch(design, sketch)
+    tags_by_token, _ = _fill_sketch(sketch, step, emit_mode)
+    for extrude, extrude_step in extrudes:
+        profiles, _ = _select_profiles(sketch, tags_by_token, extrude_step.tags)
+        extrude.timelineObject.rollTo(True)
+        extrude.profile = profiles
+    if extrudes:
+        design.timeline.moveToEnd()
+
+
+class _BaseFeatureEdit:
+    # The base feature of every component a plan without history builds in. Only one base
+    # feature can be edited at a time, so switching components finishes the open edit.
+
+    def __init__(self, journal: PlanJournal):
+        self.journal = journal
+        self.features = []
+        self.editing = None
+
+    def enter(self, component: adsk.fusion.Component):
+        if self.editing is not None and self.editing.parentComponent == component:
+            return
+        self.finish()
+        feature = next((feature for feature in self.features if feature.parentComponent == component), None)
+        if feature is None:
+            feature = component.features.baseFeatures.add()
+            self.features.append(feature)
+            self.journal.add(feature.deleteMe)
+        feature.startEdit()
+        self.editing = feature
+
+    def finish(self):
+        if self.editing is not None:
+            self.editing.finishEdit()
+            self.editing = None
+
+
+def apply_plan(design: adsk.fusion.Design, component: adsk.fusion.Component, plan: FeaturePlan, *,
+               history: bool = True, existing: dict = None) -> tuple:
+    """Creates the components, sketches, extrudes, copies and occurrences of a plan in the given component.
+
+    Everything created is tagged, see find_drive. Given the drive of an earlier run as existing,
+    only the steps that differ are touched: a changed sketch is redrawn in place and its extrudes
+    get the new profiles, changed extrude distances and occurrence placements are edited, steps
+    that are no longer part of the plan are deleted and new ones created. A thickness change
+    only edits extrude distances, a pin count change redraws the disc and adds or deletes pin
+    occurrences. Everything else is kept as it is.
+
+    Arguments:
+    design -- The design that owns the component.
+    component -- The component to build in. Plan components are created as its children.
+    plan -- The FeaturePlan to apply.
+    history -- If False the sketches, extrudes and copies are built inside one base feature per
+               component, so Fusion does not recompute the timeline after every feature. The rest
+               of the design keeps its history, but the drive features cannot be edited, so
+               nothing is tagged and existing is ignored. A direct modeling design is built as it is.
+    existing -- The ExistingStep entities of an earlier run by (kind, name), from find_drive.
+
+    :returns:
+        A tuple (entities, report). entities maps every component, sketch, extrude, copy and
+        instance name to what was created or kept for it: an Occurrence for components and
+        instances, a Sketch, an ExtrudeFeature or a MoveFeature. report is a PlanReport.
+    """
+    steps = apply_plan_steps(design, component, plan, history=history, existing=existing)
+    while True:
+        try:
+            next(steps)
+        except StopIteration as done:
+            return done.value
+
+
+def apply_plan_steps(design: adsk.fusion.Design, component: adsk.fusion.Component, plan: FeaturePlan, *,
+                     history: bool = True, existing: dict = None, journal: PlanJournal = None):
+    """Generator version of apply_plan that pauses after every step, so the plan can be applied in chunks.
+
+    Yields (label, done, total) after every step, where done of total steps are finished, and
+    returns (entities, report) like apply_plan. Entities the new plan no longer needs are only
+    deleted by the last step, so the drive can be rolled back up to then with the journal.
+
+    Arguments:
+    journal -- A PlanJournal that records how to undo every change, or None.
+    Other arguments as for apply_plan.
+    """
+    report = PlanReport()
+    entities = {}
+    sketches = {}
+    sketch_components = {}
+    tags_by_sketch = {}
+    components = {None: component}
+    journal = journal or PlanJournal()
+    previous_sketches = {step.name: step for step in journal.previous.sketches} if journal.previous else {}
+    previous_extrudes = {step.name: step for step in journal.previous.extrudes} if journal.previous else {}
+    redrawn = {}
+
+    parametric = history and design.designType == adsk.fusion.DesignTypes.ParametricDesignType
+    records, actions, stale = _diff_plan(plan, existing if parametric and existing else {})
+    kept = sum(action == KEEP for action in actions.values())
+    total = len(actions) - kept + (1 if stale else 0)
+    done = 0
+
+    def retag(entity, step_id):
+        if not parametric:
+            return 0
+        if actions[step_id] == EDIT:
+            journal.add(_tag, entity, _old_record(existing[step_id]))
+        _tag(entity, records[step_id])
+        return 2
+
+    # Without history everything but the components and occurrences is built inside base
+    # features. A direct modeling design has no timeline and no base features.
+    base_edit = None
+    if not history and design.designType == adsk.fusion.DesignTypes.ParametricDesignType:
+        base_edit = _BaseFeatureEdit(journal)
+    try:
+        for name in plan.components:
+            if actions['component', name] == KEEP:
+                occurrence = existing['component', name].entity
+                entities[name] = occurrence
+                components[name] = occurrence.component
+                continue
+            with futil.stage(f'component {name}'):
+                start = time.perf_counter()
+                occurrence = component.occurrences.addNewComponent(adsk.core.Matrix3D.create())
+                journal.add(occurrence.deleteMe)
+                components[name] = occurrence.component
+                components[name].name = name
+                entities[name] = occurrence
+                calls = 5 + retag(occurrence, ('component', name))
+                report.add(f'component {name}', time.perf_counter() - start, calls)
+            done += 1
+            yield f'component {name}', done, total
+
+        for step in plan.sketches:
+            step_id = ('sketch', step.name)
+            action = actions[step_id]
+            if action == KEEP:
+                sketch = existing[step_id].entity
+            else:
+                with futil.stage(f'sketch {step.name}'):
+                    start = time.perf_counter()
+                    target = components[step.component]
+                    if action == EDIT:
+                        sketch = existing[step_id].entity
+                        redrawn[step.name] = []
+                        journal.add(_redraw_sketch, design, sketch, previous_sketches.get(step.name),
+                                    journal.previous.emit_mode if journal.previous else plan.emit_mode,
+                                    redrawn[step.name])
+                        calls = _clear_sketch(design, sketch)
+                    else:
+                        if base_edit:
+                            base_edit.enter(target)
+                        plane = getattr(target, f'{step.plane}ConstructionPlane')
+                        sketch = target.sketches.add(plane)
+                        journal.add(sketch.deleteMe)
+                        calls = 2
+                    tags_by_sketch[step.name], fill_calls = _fill_sketch(sketch, step, plan.emit_mode)
+                    calls += fill_calls + retag(sketch, step_id)
+                    report.add(f'{"update " if action == EDIT else ""}sketch {step.name}',
+                               time.perf_counter() - start, calls)
+            entities[step.name] = sketches[step.name] = sketch
+            sketch_components[step.name] = components[step.component]
+            if action != KEEP:
+                done += 1
+                yield f'sketch {step.name}', done, total
+
+        for step in plan.extrudes:
+            step_id = ('extrude', step.name)
+            action = actions[step_id]
+            if action == KEEP:
+                entities[step.name] = existing[step_id].entity
+                continue
+            with futil.stage(f'extrude {step.name}'):
+                start = time.perf_counter()
+                calls = 0
+                if action == CREATE or actions['sketch', step.sketch] != KEEP:
+                    profiles, calls = _select_profiles(sketches[step.sketch], tags_by_sketch[step.sketch], step.tags)
+                    if profiles.count == 0:
+                        raise RuntimeError(f'No profiles found for the {step.name} extrude')
+                if action == CREATE:
+                    if base_edit:
+                        base_edit.enter(sketch_components[step.sketch])
+                    extrudes = sketch_components[step.sketch].features.extrudeFeatures
+                    extrude_input = extrudes.createInput(profiles, _OPERATIONS[step.operation])
+                    extrude_input.setDistanceExtent(False, adsk.core.ValueInput.createByReal(step.distance))
+                    extrude = extrudes.add(extrude_input)
+                    journal.add(extrude.deleteMe)
+                    calls += 6
+                else:
+                    extrude = existing[step_id].entity
+                    if actions['sketch', step.sketch] != KEEP:
+                        # A feature's profiles can only be changed with the timeline rolled back to it.
+                        extrude.timelineObject.rollTo(True)
+                        extrude.profile = profiles
+                        design.timeline.moveToEnd()
+                        if step.name in previous_extrudes:
+                            redrawn[step.sketch].append((extrude, previous_extrudes[step.name]))
+                        calls += 5
+                    if existing[step_id].params != records[step_id]['params']:
+                        distance = extrude.extentOne.distance
+                        journal.add(_restore_distance, extrude, distance.value)
+                        distance.value = step.distance
+                        calls += 4
+                entities[step.name] = extrude
+                calls += retag(extrude, step_id)
+                report.add(f'{"update " if action == EDIT else ""}extrude {step.name}',
+                           time.perf_counter() - start, calls)
+            done += 1
+            yield f'extrude {step.name}', done, total
+
+        features = component.features
+        extrude_sketches = {step.name: step.sketch for step in plan.extrudes}
+        for step in plan.copies:
+            step_id = ('copy', step.name)
+            if actions[step_id] == KEEP:
+                entities[step.name] = existing[step_id].entity
+                continue
+            with futil.stage(f'copy {step.name}'):
+                start = time.perf_counter()
+                if base_edit:
+                    base_edit.enter(component)
+                sketch = sketches[extrude_sketches[step.source]]
+                sources = adsk.core.ObjectCollection.create()
+                for body in entities[step.source].bodies:
+                    sources.add(body)
+                paste = features.copyPasteBodies.add(sources)
+                journal.add(paste.deleteMe)
+                bodies = adsk.core.ObjectCollection.create()
+                for body in paste.bodies:
+                    bodies.add(body)
+                move_input = features.moveFeatures.createInput2(bodies)
+                move_input.defineAsFreeMove(_placement_transform(_drive_axis(sketch), step.angle, step.axial_offset))
+                entities[step.name] = features.moveFeatures.add(move_input)
+                journal.add(entities[step.name].deleteMe)
+                calls = 21 + 4 * bodies.count
+                if parametric:
+                    _tag(paste, dict(records[step_id], kind='paste'))
+                    _tag(entities[step.name], records[step_id])
+                    calls += 4
+                report.add(f'copy {step.name}', time.perf_counter() - start, calls)
+            done += 1
+            yield f'copy {step.name}', done, total
+
+        # Occurrences cannot be added while a base feature is edited.
+        if base_edit:
+            base_edit.finish()
+
+        # The drive axis of a component is taken from its first sketch.
+        component_sketches = {}
+        for step in reversed(plan.sketches):
+            component_sketches[step.component] = sketches[step.name]
+        occurrences = component.occurrences
+        for name in plan.components:
+            steps = [step for step in plan.instances if step.component == name]
+            for step in steps:
+                if actions['instance', step.name] == KEEP:
+                    entities[step.name] = existing['instance', step.name].entity
+            steps = [step for step in steps if actions['instance', step.name] != KEEP]
+            if not steps:
+                continue
+            drive_axis = _drive_axis(component_sketches[name])
+            # Instances are timed per component, the generator may pause between them.
+            start = time.perf_counter()
+            elapsed = 0.0
+            calls = 5
+            for step in steps:
+                with futil.stage(f'instances {name}'):
+                    step_id = ('instance', step.name)
+                    transform = _placement_transform(drive_axis, step.angle, step.axial_offset)
+                    if actions[step_id] == EDIT:
+                        occurrence = existing[step_id].entity
+                        journal.add(_restore_transform, occurrence, occurrence.transform2)
+                        occurrence.transform2 = transform
+                        calls += 2
+                    else:
+                        occurrence = occurrences.addExistingComponent(components[name], transform)
+                        journal.add(occurrence.deleteMe)
+                    entities[step.name] = occurrence
+                    step_calls = (8 if step.axial_offset else 3) + retag(occurrence, step_id)
+                    calls += step_calls
+                elapsed += time.perf_counter() - start
+                done += 1
+                yield f'instance {step.name}', done, total
+                start = time.perf_counter()
+            report.add(f'instances {name}', elapsed, calls)
+
+        # Deleting cannot be undone, so it is the last step and nothing is deleted if the build
+        # is cancelled before.
+        if stale:
+            with futil.stage('delete'):
+                start = time.perf_counter()
+                for old in stale:
+                    old.entity.deleteMe()
+                report.add(f'delete {len(stale)}', time.perf_counter() - start, len(stale))
+        if kept:
+            report.add(f'keep {kept}', 0.0, 0)
+    finally:
+        if base_edit:
+            base_edit.finish()
+
+    return entities, report
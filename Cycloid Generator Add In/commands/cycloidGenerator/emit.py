@@ -0,0 +1,174 @@
+import math
+import time
+from collections import Counter
+
+import adsk.core
+
+# Ways to write a computed profile into a sketch.
+# 'spline' adds one closed fitted spline through all points in a single API call.
+# 'lines' adds one line per segment with sketch compute deferred until the end.
+# A profile of identical lobes is drawn as one lobe, the others are made by a sketch circular
+# pattern, so the points and curves the API has to create drop by the number of lobes.
+EMIT_SPLINE = 'spline'
+EMIT_LINES = 'lines'
+EMIT_MODES = (EMIT_SPLINE, EMIT_LINES)
+
+
+class EmitStats:
+    """Per-run counts of Fusion API calls and elapsed time for a sketch emission."""
+
+    def __init__(self):
+        self.api_calls = Counter()
+        self.segments = 0
+        self.refreshes = 0
+        self.elapsed = 0.0
+
+    def count(self, name: str, calls: int = 1):
+        self.api_calls[name] += calls
+
+    @property
+    def total_calls(self) -> int:
+        return sum(self.api_calls.values())
+
+    def summary(self) -> str:
+        calls = ', '.join(f'{name}={count}' for name, count in sorted(self.api_calls.items()))
+        return (f'{self.segments} segments, {self.total_calls} API calls ({calls}), '
+                f'{self.refreshes} viewport refreshes, {self.elapsed * 1000:.1f} ms')
+
+
+def emit_profile(
+        sketch,
+        xs,
+        ys,
+        *,
+        mode: str = EMIT_SPLINE,
+        lobes: int = 1,
+        z: float = 0.0,
+        viewport=None,
+        refresh_every: int = None,
+        refresh_at_end: bool = False,
+        stats: EmitStats = None
+):
+    """Writes a closed profile into a sketch in one bulk operation.
+
+    Arguments:
+    sketch -- The sketch to add the profile to.
+    xs, ys -- The profile point coordinates. The last point is connected back to the first.
+              With lobes, the points of one lobe up to and including the first point of the next.
+    mode -- EMIT_SPLINE for one closed fitted spline or EMIT_LINES for deferred line segments.
+    lobes -- Number of identical lobes around the sketch origin. If more than 1 the lobe given by
+             xs, ys is drawn open, with one spline or its line segments, and patterned lobes times.
+    z -- Z coordinate of all points in sketch space.
+    viewport -- Viewport to refresh, required if refresh_every or refresh_at_end is used.
+    refresh_every -- Refresh the viewport every N line segments. None disables it.
+                     Only used by EMIT_LINES, a spline is a single entity.
+    refresh_at_end -- Refresh the viewport once when the profile is complete.
+    stats -- An EmitStats to record API calls into. A new one is created if not specified.
+
+    :returns:
+        A tuple (curves, stats) of the created sketch curves and the recorded statistics.
+    """
+    if mode not in EMIT_MODES:
+        raise ValueError(f'Unknown emit mode {mode!r}, expected one of {EMIT_MODES}')
+    if (refresh_every or refresh_at_end) and viewport is None:
+        raise ValueError('A viewport is required to refresh during emission')
+
+    stats = stats or EmitStats()
+    start = time.perf_counter()
+
+    closed = lobes <= 1
+    points = [adsk.core.Point3D.create(float(x), float(y), z) for x, y in zip(xs, ys)]
+    stats.count('Point3D.create', len(points))
+    if closed and len(points) < 3:
+        raise ValueError(f'A closed profile needs at least 3 points, got {len(points)}')
+    if len(points) < 2:
+        raise ValueError(f'A lobe needs at least 2 points, got {len(points)}')
+
+    if mode == EMIT_SPLINE:
+        curves = _emit_spline(sketch, points, stats, closed)
+    else:
+        curves = _emit_lines(sketch, points, stats, viewport, refresh_every, closed)
+    if not closed:
+        curves += _emit_pattern(sketch, curves, lobes, stats)
+
+    if refresh_at_end:
+        viewport.refresh()
+        stats.count('Viewport.refresh')
+        stats.refreshes += 1
+
+    stats.elapsed += time.perf_counter() - start
+    return curves, stats
+
+
+def _emit_spline(sketch, points, stats: EmitStats, closed: bool):
+    collection = adsk.core.ObjectCollection.create()
+    stats.count('ObjectCollection.create')
+    for point in points:
+        collection.add(point)
+    stats.count('ObjectCollection.add', len(points))
+
+    spline = sketch.sketchCurves.sketchFittedSplines.add(collection)
+    stats.count('SketchFittedSplines.add')
+    if closed:
+        spline.isClosed = True
+        stats.count('SketchFittedSpline.isClosed')
+    stats.segments += 1
+    return [spline]
+
+
+def _emit_lines(sketch, points, stats: EmitStats, viewport, refresh_every: int, closed: bool):
+    # Defer the sketch solve so Fusion only recomputes once after all lines are added.
+    # A caller that already deferred compute keeps it deferred.
+    was_deferred = sketch.isComputeDeferred
+    sketch.isComputeDeferred = True
+    stats.count('Sketch.isComputeDeferred')
+
+    sketch_lines = sketch.sketchCurves.sketchLines
+    lines = []
+    try:
+        first_point = None
+        last_point = points[0]
+        for point in points[1:] + ([None] if closed else []):
+            # The final segment closes the loop onto the first sketch point.
+            line = sketch_lines.addByTwoPoints(last_point, point if point is not None else first_point)
+            stats.count('SketchLines.addByTwoPoints')
+            lines.append(line)
+            if first_point is None:
+                first_point = line.startSketchPoint
+            last_point = line.endSketchPoint
+
+            if refresh_every and len(lines) % refresh_every == 0:
+                viewport.refresh()
+                stats.count('Viewport.refresh')
+                stats.refreshes += 1
+    finally:
+        sketch.isComputeDeferred = was_deferred
+        stats.count('Sketch.isComputeDeferred')
+
+    stats.segments += len(lines)
+    return lines
+
+
+def _emit_pattern(sketch, curves: list, lobes: int, stats: EmitStats) -> list:
+    # Copies the curves of one lobe around the sketch origin, returns the copies.
+    entities = adsk.core.ObjectCollection.create()
+    for curve in curves:
+        entities.add(curve)
+    constraints = sketch.geometricConstraints
+    pattern_input = constraints.createCircularPatternInput(entities, sketch.originPoint)
+    # The quantity includes the lobe itself, a full circle spaces the copies evenly.
+    pattern_input.quantity = adsk.core.ValueInput.createByReal(lobes)
+    pattern_input.totalAngle = adsk.core.ValueInput.createByReal(2 * math.pi)
+    copies = list(constraints.addCircularPattern(pattern_input).createdEntities)
+    stats.count('ObjectCollection.create')
+    stats.count('ObjectCollection.add', len(curves))
+    stats.count('Sketch.geometricConstraints')
+    stats.count('Sketch.originPoint')
+    stats.count('GeometricConstraints.createCircularPatternInput')
+    stats.count('ValueInput.createByReal', 2)
+    stats.count('CircularPatternConstraintInput.quantity')
+    stats.count('CircularPatternConstraintInput.totalAngle')
+    stats.count('GeometricConstraints.addCircularPattern')
+    stats.count('CircularPatternConstraint.createdEntities')
+    stats.segments += len(copies)
+    return copies
@@ -1,23 +1,23 @@
 import adsk.core
+import adsk.fusion
 import os
 from ...lib import fusionAddInUtils as futil
+from . import emit
 from ... import config
-import traceback
 import math
+import traceback
+import time
 
-def deg_range(start, stop, step):
-    r = start
-    while r <= stop:
-        yield r
-        r += step
+# The geometry engine (NumPy, the profile cache) and the feature builder are only loaded on the
+# first command_created, see initialize_engine, so loading the add-in stays fast as they grow.
+geometry = None
+build = None
+simulation = None
+generation = None
 
-def cos(angle):
-    return math.cos(math.radians(angle))
-def sin(angle):
-    return math.sin(math.radians(angle))
- 
-app = adsk.core.Application.get()
-ui = app.userInterface
+# Set by start(), so importing this module does not touch the Fusion API.
+app = None
+ui = None
 
 
 # TODO *** Specify the command identity information. ***
@@ -36,6 +36,51 @@ WORKSPACE_ID = 'FusionSolidEnvironment'
 PANEL_ID = 'SolidScriptsAddinsPanel'
 COMMAND_BESIDE_ID = 'ScriptsManagerCommand'
 
+# Radial clearance in cm added to the pin radius when offsetting the disc profile,
+# the same as cycloidGeometry.DEFAULT_PIN_CLEARANCE.
+PIN_CLEARANCE = 0.4
+
+# How the disc profile is written into the sketch, see emit.py.
+# EMIT_SPLINE adds a single closed fitted spline, EMIT_LINES adds deferred line segments.
+PROFILE_EMIT_MODE = emit.EMIT_SPLINE
+
+# Redraw the viewport once when the drive is complete.
+VIEWPORT_REFRESH_AT_END = False
+
+# If False the drive features are built inside base features so Fusion does not recompute the
+# timeline after every feature, see build.apply_plan. The drive itself can then no longer be edited.
+BUILD_WITH_HISTORY = True
+
+# Inputs that change the preview geometry. Changes to any other input reuse the cached preview.
+GEOMETRY_INPUT_IDS = ('pin_count', 'cycloid_radius', 'pin_radius', 'eccentricity', 'profile_tolerance')
+
+# The preview is drawn at a coarser chord tolerance than the final geometry. Geometry input changes
+# closer together than PREVIEW_DRAG_INTERVAL seconds are treated as a spinner drag and use the
+# even coarser drag settings, so every intermediate value can be drawn without lag. Once no input
+# changed for PREVIEW_DRAG_INTERVAL seconds the drag is over and command_inputs_settled draws the
+# preview again at PREVIEW_TOLERANCE, so the coarse drag preview does not stay on screen.
+PREVIEW_TOLERANCE = 0.005
+PREVIEW_MAX_SAMPLES = 4000
+PREVIEW_DRAG_TOLERANCE = 0.02
+PREVIEW_DRAG_MAX_SAMPLES = 600
+PREVIEW_DRAG_INTERVAL = 0.25
+
+# Events that fire with every keystroke or spinner step are logged at most once per
+# EVENT_LOG_INTERVAL seconds, see futil.add_handler. Other events are logged every time.
+EVENT_LOG_LEVEL = adsk.core.LogLevels.InfoLogLevel
+EVENT_LOG_INTERVAL = 1.0
+
+# Crank angle steps of the contact simulation shown below the inputs. It runs with every new
+# preview drive, but not while a spinner is dragged.
+PREVIEW_SIMULATION_STEPS = 720
+
+# Build large drives in the background with a progress dialog and a cancel button, see
+# generation.py. Only used with BUILD_WITH_HISTORY, as a drive without history is not tagged.
+ASYNC_GENERATION = True
+
+# Custom event that runs the chunks of a background build on the main thread.
+GENERATION_EVENT_ID = f'{CMD_ID}_generation'
+
 # Resource location for command icons, here we assume a sub folder in this directory named "resources".
 ICON_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resources', '')
 
@@ -43,14 +88,37 @@ ICON_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resource
 # they are not released and garbage collected.
 local_handlers = []
 
+# Computed drive geometry shared by the preview and execute, keyed by the drive parameters.
+# Created by initialize_engine.
+profile_cache = None
+
+# The background build in progress or last finished, see generation.GenerationJob.
+_job = None
+
+# State of the command preview. The drive is looked up again only after command_input_changed
+# reports a change to a geometry input, otherwise the last one is redrawn as is.
+_preview = {
+    'key': None,
+    'drive': None,
+    'dirty': True,
+    'last_change': 0.0,
+    'dragging': False,
+}
+
 
 # Executed when add-in is run.
+# Only the command definition and its button are created here, see initialize_engine.
 def start():
+    global app, ui
+    app = adsk.core.Application.get()
+    ui = app.userInterface
+
     # Create a command Definition.
     cmd_def = ui.commandDefinitions.addButtonDefinition(CMD_ID, CMD_NAME, CMD_Description, ICON_FOLDER)
 
     # Define an event handler for the command created event. It will be called when the button is clicked.
-    futil.add_handler(cmd_def.commandCreated, command_created)
+    futil.add_handler(cmd_def.commandCreated, command_created, name=f'{CMD_NAME} Command Created Event',
+                      log_level=EVENT_LOG_LEVEL)
 
     # ******** Add a button into the UI so the user can run the command. ********
     # Get the target workspace the button will be created in.
@@ -65,6 +133,9 @@ def start():
     # Specify if the command is promoted to the main toolbar. 
     control.isPromoted = IS_PROMOTED
 
+    # Register the custom event that drives background builds.
+    futil.add_handler(app.registerCustomEvent(GENERATION_EVENT_ID), generation_event)
+
 # Executed when add-in is stopped.
 def stop():
     # Get the various UI elements for this command
@@ -81,11 +152,39 @@ def stop():
     if command_definition:
         command_definition.deleteMe()
 
+    app.unregisterCustomEvent(GENERATION_EVENT_ID)
+
+# Loads the geometry engine and the feature builder and creates the profile cache.
+# Called by the first command_created, later calls return immediately.
+def initialize_engine():
+    global geometry, build, simulation, generation, profile_cache
+    if profile_cache is not None:
+        return
+
+    start = time.perf_counter()
+    from ...lib import cycloidGeometry as geometry
+    from ...lib.cycloidGeometry import simulation
+    from . import build, generation
+    table = None
+    if config.PROFILE_TABLE_FILE and os.path.isfile(config.PROFILE_TABLE_FILE):
+        try:
+            table = geometry.ProfileTable.load(config.PROFILE_TABLE_FILE)
+        except (OSError, ValueError) as error:
+            futil.log(f'{CMD_NAME} profile table not loaded: {error}', adsk.core.LogLevels.WarningLogLevel)
+    profile_cache = geometry.ProfileCache(
+        config.PROFILE_CACHE_SIZE,
+        config.PROFILE_CACHE_FOLDER if config.PROFILE_CACHE_ON_DISK else None,
+        max_disk_entries=config.PROFILE_CACHE_DISK_ENTRIES,
+        table=table
+    )
+    futil.log(f'{CMD_NAME} geometry engine loaded in {(time.perf_counter() - start) * 1000:.1f} ms '
+              f'(NumPy {"available" if geometry.has_numpy() else "not available"})')
+
+
 # Function that is called when a user clicks the corresponding button in the UI.
 # This defines the contents of the command dialog and connects to the command related events.
 def command_created(args: adsk.core.CommandCreatedEventArgs):
-    # General logging for debug.
-    futil.log(f'{CMD_NAME} Command Created Event')
+    initialize_engine()
 
     # https://help.autodesk.com/view/fusion360/ENU/?contextId=CommandInputs
     inputs = args.command.commandInputs
@@ -117,22 +216,56 @@ def command_created(args: adsk.core.CommandCreatedEventArgs):
     default_value = adsk.core.ValueInput.createByString('10')
     inputs.addValueInput('roller_extent_length', 'Roller Pins Extrude Extent Length', defaultLengthUnits, default_value)
 
+    # Maximum deviation of the sketched disc profile from the true curve, default 0.01 mm.
+    default_value = adsk.core.ValueInput.createByString('0.01 mm')
+    inputs.addValueInput('profile_tolerance', 'Profile Tolerance', defaultLengthUnits, default_value)
+
+    # Number of discs per set, 2 puts a second disc 180 degrees out of phase for balance.
+    inputs.addIntegerSpinnerCommandInput('disc_count', 'Discs per Set', 1, geometry.MAX_DISC_COUNT, 1, 1)
+
+    # Number of disc sets stacked on the same eccentric to share the load, all sets share the
+    # roller pins. This does not add a reduction stage, see cycloidGeometry.disc_placements.
+    inputs.addIntegerSpinnerCommandInput('disc_set_count', 'Stacked Disc Sets', 1, geometry.MAX_DISC_SET_COUNT,
+                                         1, 1)
+
+    # Build the disc, pin ring, roller pin and output pin as components, with every repeated
+    # part as an occurrence. If unchecked all bodies are built in the root component.
+    inputs.addBoolValueInput('build_components', 'Build as Components', True, '', True)
+
+    # Update the drive built by an earlier run in place, changing only what depends on the
+    # changed inputs, see build.apply_plan. If unchecked a new drive is built next to it.
+    inputs.addBoolValueInput('update_existing', 'Update Existing Drive', True, '', True)
+
+    # Button that fills in the inputs from a saved design record, see load_design_record.
+    inputs.addBoolValueInput('load_record', 'Load Design Record...', False, '', False)
+
+    # Reason the OK button is disabled, filled in by command_validate_input.
+    inputs.addTextBoxCommandInput('validation_message', 'Design Check', '', 2, True)
+
+    # Backlash, transmission error and peak pin force of the previewed drive, see command_preview.
+    inputs.addTextBoxCommandInput('simulation_summary', 'Simulation', '', 3, True)
+
     #Output Roller Pin Shaft Offset Radius value input field, default 5
 
-    # Connect to the events that are needed by this command.
-    futil.add_handler(args.command.execute, command_execute, local_handlers=local_handlers)
-    futil.add_handler(args.command.inputChanged, command_input_changed, local_handlers=local_handlers)
-    futil.add_handler(args.command.executePreview, command_preview, local_handlers=local_handlers)
-    futil.add_handler(args.command.validateInputs, command_validate_input, local_handlers=local_handlers)
-    futil.add_handler(args.command.destroy, command_destroy, local_handlers=local_handlers)
+    # Connect to the events that are needed by this command. Every event is logged by its handler,
+    # the ones that fire continuously while a spinner is dragged at most once per EVENT_LOG_INTERVAL.
+    futil.add_handler(args.command.execute, command_execute, name=f'{CMD_NAME} Command Execute Event',
+                      log_level=EVENT_LOG_LEVEL, local_handlers=local_handlers)
+    futil.add_handler(args.command.inputChanged, command_input_changed, name=f'{CMD_NAME} Input Changed Event',
+                      log_level=EVENT_LOG_LEVEL, log_interval=EVENT_LOG_INTERVAL, local_handlers=local_handlers)
+    futil.add_handler(args.command.inputChanged, command_inputs_settled, name=f'{CMD_NAME} Inputs Settled',
+                      coalesce=PREVIEW_DRAG_INTERVAL, local_handlers=local_handlers)
+    futil.add_handler(args.command.executePreview, command_preview, name=f'{CMD_NAME} Command Preview Event',
+                      log_level=EVENT_LOG_LEVEL, log_interval=EVENT_LOG_INTERVAL, local_handlers=local_handlers)
+    futil.add_handler(args.command.validateInputs, command_validate_input, name=f'{CMD_NAME} Validate Input Event',
+                      log_level=EVENT_LOG_LEVEL, log_interval=EVENT_LOG_INTERVAL, local_handlers=local_handlers)
+    futil.add_handler(args.command.destroy, command_destroy, name=f'{CMD_NAME} Command Destroy Event',
+                      log_level=EVENT_LOG_LEVEL, local_handlers=local_handlers)
 
 
 # This event handler is called when the user clicks the OK button in the command dialog or 
 # is immediately called after the created event not command inputs were created for the dialog.
 def command_execute(args: adsk.core.CommandEventArgs):
-    # General logging for debug.
-    futil.log(f'{CMD_NAME} Command Execute Event')
-
     # TODO ******************************** Your code here ********************************
  
     # Get a reference to your command's inputs.
@@ -161,189 +294,254 @@ def command_execute(args: adsk.core.CommandEventArgs):
     roller_extent_length_input = inputs.itemById('roller_extent_length')
     roller_extent_length = roller_extent_length_input.value
 
-    # === Place your sketch creation code here ===
-    doc = app.activeDocument
-    design = app.activeProduct
-    rootComp = design.rootComponent
-    # Create a new sketch on the XZ plane of the root component.
-    cycloid_sketches = rootComp.sketches
-    cycloid_sketch = cycloid_sketches.add(rootComp.xZConstructionPlane)
+    # Access the value of 'profile_tolerance' (value input)
+    profile_tolerance_input = inputs.itemById('profile_tolerance')
+    profile_tolerance = profile_tolerance_input.value
 
-    # TODO *** Add your code to create the cycloid drive here. ***
-    #Using some code and math from RoTechnic's design of a cycloidal drive in Python and Fusion 360 https://github.com/roTechnic/CycloidalDesign
-    rolling_circle_radius = cycloid_radius / pin_count
-    reduction_ratio = pin_count - 1
-    cycloid_base_radius = rolling_circle_radius * reduction_ratio
+    # Access the values of 'disc_count' and 'disc_set_count' (integer spinner inputs)
+    disc_count = inputs.itemById('disc_count').value
+    disc_set_count = inputs.itemById('disc_set_count').value
 
-    last_point = None
-    line = None
+    # Access the value of 'build_components' (checkbox)
+    build_components = inputs.itemById('build_components').value
 
-    lines = []
+    # Access the value of 'update_existing' (checkbox)
+    update_existing = inputs.itemById('update_existing').value
 
-    for angle in deg_range(0, 360, 5):
-        x = (cycloid_base_radius + rolling_circle_radius) * cos(angle)
-        y = (cycloid_base_radius + rolling_circle_radius) * sin(angle)
- 
-        point_x = x + (rolling_circle_radius - eccentricity) * cos(pin_count*angle)
-        point_y = y + (rolling_circle_radius - eccentricity) * sin(pin_count*angle)
-
-        if angle == 0:
-            # Create the first point
-            last_point = adsk.core.Point3D.create(point_x, point_y, 0)
-        else:
-            # Create a line from the last point to the current point
-            line = cycloid_sketch.sketchCurves.sketchLines.addByTwoPoints(last_point, adsk.core.Point3D.create(point_x, point_y, 0))
-            last_point = line.endSketchPoint
-            lines.append(line)
-
-        # Watch the curve get drawn in the sketch.
-        app.activeViewport.refresh()
-    curves = cycloid_sketch.findConnectedCurves(lines[0])
-            
-    # # Create the offset for the roller pins.
-    sketch_direction_point = adsk.core.Point3D.create(0, 0, 0)
-    offset_curves = cycloid_sketch.offset(curves, sketch_direction_point, pin_radius + 0.4)
-
-    # Create a sketch for the eccentric shaft in the disk.
-    eccentric_shaf_sketches = rootComp.sketches
-    eccentric_shaft_sketch = eccentric_shaf_sketches.add(rootComp.xZConstructionPlane)
-    sketchCircles = eccentric_shaft_sketch.sketchCurves.sketchCircles
-    eccentric_point = adsk.core.Point3D.create(eccentricity, 0, disk_extent_length)
-    eccentric_circle = sketchCircles.addByCenterRadius(eccentric_point, pin_radius)
-    
-    # Create a sketch for a roller pin at the edge of the cycloidal disk with the specified offset.
-    roller_sketches = rootComp.sketches
-    roller_sketch = roller_sketches.add(rootComp.xZConstructionPlane)
-    roller_circles = roller_sketch.sketchCurves.sketchCircles
-    roller_pin_center = adsk.core.Point3D.create(cycloid_radius - eccentricity, 0, 0) 
-    roller_pin_circle = roller_circles.addByCenterRadius(roller_pin_center, pin_radius)
-
-    # Create a sketch for the roller pin plate.
-    origin_point = adsk.core.Point3D.create(0, 0, 0)
-    roller_plate_sketches = rootComp.sketches
-    roller_plate_sketch = roller_plate_sketches.add(rootComp.xZConstructionPlane)
-    roller_plate_circle = roller_plate_sketch.sketchCurves.sketchCircles.addByCenterRadius(origin_point, cycloid_radius + pin_radius)
-
-    # Create a sketch for the throughhole in the centre of the roller disk.
-    throughhole_sketches = rootComp.sketches
-    throughhole_sketch = throughhole_sketches.add(rootComp.xZConstructionPlane)
-    throughhole_circle = throughhole_sketch.sketchCurves.sketchCircles.addByCenterRadius(origin_point, pin_radius + 0.2)
-
-    # Create a sketch for the output  roller pins
-    output_roller_sketches = rootComp.sketches
-    output_roller_sketch = output_roller_sketches.add(rootComp.xZConstructionPlane)
-    output_roller_circles = output_roller_sketch.sketchCurves.sketchCircles
-    output_roller_center = adsk.core.Point3D.create(cycloid_radius / 2.25, 0, disk_extent_length)
-    output_roller_circle = output_roller_circles.addByCenterRadius(output_roller_center, pin_radius)
-
-    # Extrude the cycloidal disk based on user provided disk_extent_length.
-    cycloid_prof = cycloid_sketch.profiles.item(1)
-    # Create an extrusion input
-    cycloid_extrudes = rootComp.features.extrudeFeatures
-    extInput = cycloid_extrudes.createInput(cycloid_prof, adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
-    # Define that the extent is a distance extent of disk extent length.
-    distance = adsk.core.ValueInput.createByReal(disk_extent_length)
-    extInput.setDistanceExtent(False, distance)
-    # Create the extrusion.
-    ext = cycloid_extrudes.add(extInput)
-
-    #Cut the hole for the eccentric shaft in the cycloidal disk.
-    eccentric_prof = eccentric_shaft_sketch.profiles.item(0)
-    eccentric_shaft_extrudes = rootComp.features.extrudeFeatures
-    cutInput = eccentric_shaft_extrudes.createInput(eccentric_prof, adsk.fusion.FeatureOperations.CutFeatureOperation)
-    # Define that the extent is a distance extent of user provided disk_extent_length.
-    distance = adsk.core.ValueInput.createByReal(-disk_extent_length)
-    cutInput.setDistanceExtent(False, distance)
-    # Create the cut.
-    cut = eccentric_shaft_extrudes.add(cutInput)
-
-    # Extrude roller plate under roller pin ring.
-    roller_plate_prof = roller_plate_sketch.profiles.item(0)
-    # Create an extrusion input
-    roller_plate_extrudes = rootComp.features.extrudeFeatures 
-    extInput = roller_plate_extrudes.createInput(roller_plate_prof, adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
-    # Define that the extent is a distance extent same as the disk extent length.
-    distance = adsk.core.ValueInput.createByReal(-disk_extent_length)
-    extInput.setDistanceExtent(False, distance)
-    # Create the extrusion.
-    ext = roller_plate_extrudes.add(extInput)
-
-    #Extrude user provided pin_count # of roller pins 360 deg around the cycloidal disk.
-    rollers_prof = roller_sketch.profiles.item(0)
-    # Create an extrusion input
-    roller_extrudes = rootComp.features.extrudeFeatures
-    extInput = roller_extrudes.createInput(rollers_prof, adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
-    # Define that the extent is a distance extent of user provided roller_extent_length.
-    distance = adsk.core.ValueInput.createByReal(roller_extent_length)
-    extInput.setDistanceExtent(False, distance)
-    # Create the extrusion.
-    ext = roller_extrudes.add(extInput)
-    # Get the body created by extrusion
-    roller_body = rootComp.bRepBodies.item(2)
-    # Create input entities for circular pattern
-    inputEntites = adsk.core.ObjectCollection.create()
-    inputEntites.add(roller_body)
-    # Get Y axis for circular pattern
-    yAxis = rootComp.yConstructionAxis
-    # Create the input for circular pattern
-    circularFeats = rootComp.features.circularPatternFeatures
-    circularFeatInput = circularFeats.createInput(inputEntites, yAxis)
-    # Set the quantity of the elements
-    circularFeatInput.quantity = adsk.core.ValueInput.createByReal(pin_count)
-    # Set the angle of the circular pattern
-    circularFeatInput.totalAngle = adsk.core.ValueInput.createByString('360 deg')
-    # Set symmetry of the circular pattern
-    circularFeatInput.isSymmetric = True
-    # Create the circular pattern 
-    circularFeat = circularFeats.add(circularFeatInput)
-
-    #Cut output roller pins 360 deg into the cycloidal disk.
-    # Create a sketch the axis in the centre of the eccentric disk.
-    eccentric_axis_sketches = rootComp.sketches
-    eccentric_axis_sketch = eccentric_axis_sketches.add(rootComp.xYConstructionPlane)
-    lines = eccentric_axis_sketch.sketchCurves.sketchLines
-    line1 = lines.addByTwoPoints(adsk.core.Point3D.create(eccentricity, 0, 0), adsk.core.Point3D.create(eccentricity, 1, 0))
-    roller_pin_center = adsk.core.Point3D.create(cycloid_radius, 0, 0)
-    output_rollers_prof = output_roller_sketch.profiles.item(0)
-    # Create an extrusion input
-    output_roller_extrudes = rootComp.features.extrudeFeatures
-    cutInput = output_roller_extrudes.createInput(output_rollers_prof, adsk.fusion.FeatureOperations.CutFeatureOperation)
-    # Define that the extent is a distance extent of user provided roller_extent_length.
-    distance = adsk.core.ValueInput.createByReal(-disk_extent_length)
-    cutInput.setDistanceExtent(False, distance)
-    # Create the extrusion.
-    cut = output_roller_extrudes.add(cutInput)
-    # Create input entities for circular pattern
-    inputEntites = adsk.core.ObjectCollection.create()
-    inputEntites.add(cut)
-    circularFeats = cut.parentComponent.features.circularPatternFeatures
-    circularFeatInput = circularFeats.createInput(inputEntites, line1)
-    # Set the quantity of the elements
-    circularFeatInput.quantity = adsk.core.ValueInput.createByReal((pin_count - 1)/2)
-    # Set the angle of the circular pattern
-    circularFeatInput.totalAngle = adsk.core.ValueInput.createByString('360 deg')
-    # Set symmetry of the circular pattern
-    circularFeatInput.isSymmetric = True
-    # Create the circular pattern 
-    circularFeat = circularFeats.add(circularFeatInput)
-
-    # Cut the hole for the throughhole in the roller plate.
-    throughhole_prof = throughhole_sketch.profiles.item(0)
-    throughhole_extrudes = rootComp.features.extrudeFeatures
-    cutInput = throughhole_extrudes.createInput(throughhole_prof, adsk.fusion.FeatureOperations.CutFeatureOperation)
-    # Define that the extent is a distance extent of user provided disk_extent_length.
-    distance = adsk.core.ValueInput.createByReal(-disk_extent_length)
-    cutInput.setDistanceExtent(False, distance)
-    # Create the cut.
-    cut = throughhole_extrudes.add(cutInput)
+    # All inputs that define a drive, stored on the design with the drive so a later run can
+    # roll back to it, see generation.py.
+    parameters = {
+        'pin_count': pin_count, 'cycloid_radius': cycloid_radius, 'pin_radius': pin_radius,
+        'eccentricity': eccentricity, 'profile_tolerance': profile_tolerance,
+        'disk_extent_length': disk_extent_length, 'roller_extent_length': roller_extent_length,
+        'disc_count': disc_count, 'disc_set_count': disc_set_count, 'build_components': build_components,
+    }
+
+    # === Place your sketch creation code here ===
+    design = adsk.fusion.Design.cast(app.activeProduct)
+    rootComp = design.rootComponent
+
+    if ASYNC_GENERATION and BUILD_WITH_HISTORY:
+        start_generation(design, rootComp, parameters, update_existing)
+        return
+
+    # TODO *** Add your code to create the cycloid drive here. ***
+    with futil.profile_run('execute', update_existing=update_existing, **parameters):
+        with futil.stage('point computation'):
+            drive, plan = compute_plan(parameters)
+        outline = drive.outline
+        futil.log(f'{CMD_NAME} {profile_cache.stats()}')
+        futil.log(f'{CMD_NAME} disc outline computed: {outline.point_count} points, '
+                  f'max chord error {outline.max_error:.6f}, converged={outline.converged}, '
+                  f'{outline.loops_trimmed} loops trimmed')
+
+        # A drive built by an earlier run is updated in place, only the steps of the plan that
+        # changed are applied.
+        with futil.stage('build'):
+            existing = build.find_drive(design) if update_existing and BUILD_WITH_HISTORY else None
+            entities, report = build.apply_plan(design, rootComp, plan, history=BUILD_WITH_HISTORY,
+                                                existing=existing)
+            if BUILD_WITH_HISTORY:
+                build.tag_drive(rootComp, parameters)
+        futil.log(f'{CMD_NAME} drive built: {report.summary()}')
+        save_design_record(drive, parameters)
+
+        if VIEWPORT_REFRESH_AT_END:
+            app.activeViewport.refresh()
+
+
+# Computes the geometry and the feature plan of a drive from the command inputs as a tuple (drive, plan).
+# Does not use the Fusion API, so it can run on a worker thread.
+def compute_plan(parameters: dict):
+    # Compute the disc outline in one batched call, see lib/cycloidGeometry/offset.py.
+    # This is the epitrochoid moved inwards by the roller pin radius plus clearance, computed in
+    # closed form with loops at the lobe tips trimmed, so Fusion never has to offset the profile.
+    # Points are refined until every chord is within profile_tolerance of the true curve.
+    drive = profile_cache.get_drive(parameters['pin_count'], parameters['cycloid_radius'], parameters['pin_radius'],
+                                    parameters['eccentricity'], parameters['profile_tolerance'],
+                                    clearance=PIN_CLEARANCE)
+
+    # Build the whole drive from one feature plan, see build.py. The disc, roller plate and
+    # roller pins come from two sketches and three extrudes, without separate cuts or patterns.
+    # Further discs and disc sets are moved copies of the first disc. As components, every part
+    # is modeled once and repeated discs and pins are occurrences.
+    plan = build.drive_plan(drive, parameters['disk_extent_length'], parameters['roller_extent_length'],
+                            emit_mode=PROFILE_EMIT_MODE, disc_count=parameters['disc_count'],
+                            disc_set_count=parameters['disc_set_count'], components=parameters['build_components'])
+    return drive, plan
+
+
+# Starts building a drive in the background. The geometry is computed on a worker thread and
+# the plan applied in chunks from GENERATION_EVENT_ID, see generation.GenerationJob.
+def start_generation(design: adsk.fusion.Design, component: adsk.fusion.Component, parameters: dict,
+                     update_existing: bool):
+    global _job
+    if _job is not None and _job.is_running:
+        ui.messageBox(f'{CMD_NAME}: a drive is still being built.')
+        return
+
+    # The drive being updated is rebuilt from its stored inputs if the new build is cancelled.
+    previous = build.drive_parameters(component) if update_existing else None
+    # The drive computed on the worker thread, finish saves it as the design record.
+    drive = None
+
+    def compute():
+        nonlocal drive
+        drive, plan = compute_plan(parameters)
+        previous_plan = compute_plan(previous)[1] if previous else None
+        return plan, previous_plan
+
+    def begin_apply(plan, journal):
+        existing = build.find_drive(design) if update_existing else None
+        return build.apply_plan_steps(design, component, plan, existing=existing, journal=journal)
+
+    def finish(entities, report):
+        build.tag_drive(component, parameters)
+        futil.log(f'{CMD_NAME} drive built: {report.summary()}')
+        save_design_record(drive, parameters)
+        if VIEWPORT_REFRESH_AT_END:
+            app.activeViewport.refresh()
+
+    _job = generation.GenerationJob(GENERATION_EVENT_ID, CMD_NAME, compute, begin_apply, finish,
+                                    profile=dict(update_existing=update_existing, **parameters))
+    _job.start()
+
+
+# Saves the design record of a drive that was built, see config.SAVE_DESIGN_RECORDS.
+# A drive with the same inputs overwrites its earlier record.
+def save_design_record(drive, parameters: dict):
+    if not config.SAVE_DESIGN_RECORDS:
+        return
+    path = os.path.join(config.DESIGN_RECORD_FOLDER, geometry.record_name(parameters))
+    try:
+        geometry.write_record(path, drive, parameters, tolerance=parameters['profile_tolerance'])
+    except OSError as error:
+        futil.log(f'{CMD_NAME} design record not saved: {error}', adsk.core.LogLevels.WarningLogLevel)
+
+
+# Fills in the command inputs from a design record and puts its drive in the profile cache, so
+# building it again uses the stored geometry instead of computing it.
+def load_design_record(inputs: adsk.core.CommandInputs, path: str):
+    record = geometry.read_record(path)
+    profile_cache.put(record.drive, record.tolerance, **record.sampling)
+    for input_id, value in build.upgrade_parameters(record.parameters).items():
+        command_input = inputs.itemById(input_id)
+        if command_input is not None and input_id != 'load_record':
+            command_input.value = value
+    _preview['dirty'] = True
+    futil.log(f'{CMD_NAME} design record loaded: {path}')
+
+
+# Asks for a design record file and loads it, see load_design_record.
+def choose_design_record(inputs: adsk.core.CommandInputs):
+    dialog = ui.createFileDialog()
+    dialog.title = 'Load Design Record'
+    dialog.filter = f'Design Records (*{geometry.RECORD_SUFFIX})'
+    dialog.initialDirectory = config.DESIGN_RECORD_FOLDER
+    if dialog.showOpen() != adsk.core.DialogResults.DialogOK:
+        return
+    try:
+        load_design_record(inputs, dialog.filename)
+    except (OSError, ValueError) as error:
+        ui.messageBox(f'{CMD_NAME}: {error}')
+
+
+# Runs the next chunk of the background build, on the main thread.
+def generation_event(args: adsk.core.CustomEventArgs):
+    if _job is not None:
+        _job.on_event(args)
 
 
 # This event handler is called when the command needs to compute a new preview in the graphics window.
 def command_preview(args: adsk.core.CommandEventArgs):
-    # General logging for debug.
-    futil.log(f'{CMD_NAME} Command Preview Event')
     inputs = args.command.commandInputs
 
+    pin_count, cycloid_radius, pin_radius, eccentricity, profile_tolerance = get_geometry_parameters(inputs)
+
+    # Use the coarse settings while the user is still dragging a spinner.
+    if _preview['dragging']:
+        tolerance, max_samples = PREVIEW_DRAG_TOLERANCE, PREVIEW_DRAG_MAX_SAMPLES
+    else:
+        tolerance, max_samples = PREVIEW_TOLERANCE, PREVIEW_MAX_SAMPLES
+    tolerance = max(tolerance, profile_tolerance)
+
+    key = (pin_count, cycloid_radius, pin_radius, eccentricity, tolerance, max_samples)
+    with futil.profile_run('preview', pin_count=pin_count, dragging=_preview['dragging']):
+        if _preview['dirty'] or _preview['key'] != key:
+            start = time.perf_counter()
+            try:
+                with futil.stage('point computation'):
+                    # Preview drives change with every spinner step, they are not worth a file.
+                    drive = profile_cache.get_drive(pin_count, cycloid_radius, pin_radius, eccentricity, tolerance,
+                                                    clearance=PIN_CLEARANCE, persist=False,
+                                                    max_samples=max_samples)
+            except ValueError as error:
+                # Invalid parameters are reported by command_validate_input, just skip the preview.
+                futil.log(f'{CMD_NAME} Preview skipped: {error}')
+                return
+            _preview['key'] = key
+            _preview['drive'] = drive
+            _preview['dirty'] = False
+            futil.log(f'{CMD_NAME} Preview outline ready: {drive.outline.point_count} points in '
+                      f'{(time.perf_counter() - start) * 1000:.1f} ms, {profile_cache.stats()}')
+
+            if not _preview['dragging']:
+                with futil.stage('simulation'):
+                    show_simulation(inputs, pin_count, cycloid_radius, pin_radius, eccentricity)
+
+        with futil.stage('draw preview'):
+            draw_preview(_preview['drive'])
+
+
+# Returns the inputs that define the disc geometry as a tuple
+# (pin_count, cycloid_radius, pin_radius, eccentricity, profile_tolerance).
+def get_geometry_parameters(inputs: adsk.core.CommandInputs):
+    return (
+        inputs.itemById('pin_count').value,
+        inputs.itemById('cycloid_radius').value,
+        inputs.itemById('pin_radius').value,
+        inputs.itemById('eccentricity').value,
+        inputs.itemById('profile_tolerance').value,
+    )
+
+
+# Simulates one input revolution of the drive and shows the result in the 'simulation_summary' input.
+def show_simulation(inputs: adsk.core.CommandInputs, pin_count, cycloid_radius, pin_radius, eccentricity):
+    summary_input = inputs.itemById('simulation_summary')
+    if summary_input is None:
+        return
+    result = simulation.simulate_drive(pin_count, cycloid_radius, pin_radius, eccentricity,
+                                       clearance=PIN_CLEARANCE, steps=PREVIEW_SIMULATION_STEPS)
+    summary = result.summary()
+    if math.isnan(summary['min_backlash_arcmin']):
+        summary_input.formattedText = 'No contact, the disc is free to turn.'
+        return
+    summary_input.formattedText = (
+        f"Backlash {summary['min_backlash_arcmin']:.1f} - {summary['max_backlash_arcmin']:.1f} arcmin<br>"
+        f"Transmission error {summary['transmission_error_pp_arcmin']:.2f} arcmin peak to peak<br>"
+        f"Max pin force {summary['max_pin_force']:.1f} N at {simulation.DEFAULT_TORQUE / 100:g} Nm, "
+        f"min gap {summary['min_gap'] * 10:.3f} mm"
+    )
+
+
+# Draws the low resolution preview: the disc outline and the ring of roller pins.
+# Everything created during executePreview is removed by Fusion when the preview ends.
+def draw_preview(drive: 'geometry.DriveGeometry'):
+    design = app.activeProduct
+    rootComp = design.rootComponent
+    preview_sketch = rootComp.sketches.add(rootComp.xZConstructionPlane)
+    preview_sketch.isComputeDeferred = True
+
+    emit.emit_profile(preview_sketch, *drive.outline.lobe_points(), mode=emit.EMIT_SPLINE,
+                      lobes=drive.outline.lobe_count)
+
+    # The roller pins sit on a circle around the disc centre, same as in command_execute.
+    pin_circles = preview_sketch.sketchCurves.sketchCircles
+    for x, y in zip(drive.pin_xs, drive.pin_ys):
+        pin_circles.addByCenterRadius(adsk.core.Point3D.create(float(x), float(y), 0), drive.pin_radius)
+
+    preview_sketch.isComputeDeferred = False
+
 
 # This event handler is called when the user changes anything in the command dialog
 # allowing you to modify values of other inputs based on that change.
@@ -351,30 +549,59 @@ def command_input_changed(args: adsk.core.InputChangedEventArgs):
     changed_input = args.input
     inputs = args.inputs
 
-    # General logging for debug.
-    futil.log(f'{CMD_NAME} Input Changed Event fired from a change to {changed_input.id}')
+    if changed_input.id == 'load_record':
+        choose_design_record(inputs)
+        return
+
+    # Geometry changes closer together than PREVIEW_DRAG_INTERVAL are a spinner drag.
+    if changed_input.id in GEOMETRY_INPUT_IDS:
+        now = time.perf_counter()
+        _preview['dragging'] = now - _preview['last_change'] < PREVIEW_DRAG_INTERVAL
+        _preview['last_change'] = now
+        _preview['dirty'] = True
+
+
+# Called once no input changed for PREVIEW_DRAG_INTERVAL seconds, with all changes since the last call.
+# The preview of a spinner drag used the coarse drag settings, it is drawn again at full resolution.
+def command_inputs_settled(changes: futil.InputChanges):
+    if not _preview['dragging']:
+        return
+    futil.log(f'{CMD_NAME} Inputs settled after {changes.count} changes in {changes.duration:.2f} s to '
+              f"{', '.join(changed.id for changed in changes.changed)}")
+    _preview['dragging'] = False
+    _preview['dirty'] = True
+    changes.command.doExecutePreview()
 
 
 # This event handler is called when the user interacts with any of the inputs in the dialog
 # which allows you to verify that all of the inputs are valid and enables the OK button.
 def command_validate_input(args: adsk.core.ValidateInputsEventArgs):
-    # General logging for debug.
-    futil.log(f'{CMD_NAME} Validate Input Event')
-
     inputs = args.inputs
-    
+
     # Verify the validity of the input values. This controls if the OK button is enabled or not.
-    valueInput = inputs.itemById('value_input')
-    if valueInput.value >= 0:
-        args.areInputsValid = True
-    else:
-        args.areInputsValid = False
-        
+    # Only closed form checks run here, see lib/cycloidGeometry/validation.py, so this is cheap
+    # enough for every keystroke. Results are cached per parameter tuple.
+    pin_count, cycloid_radius, pin_radius, eccentricity, profile_tolerance = get_geometry_parameters(inputs)
+    messages = [issue.message for issue in geometry.check_design(pin_count, cycloid_radius, pin_radius,
+                                                                 eccentricity, clearance=PIN_CLEARANCE)]
+    for input_id, label in (('disk_extent_length', 'Disk extrude extent length'),
+                            ('roller_extent_length', 'Roller pins extrude extent length'),
+                            ('profile_tolerance', 'Profile tolerance')):
+        if not inputs.itemById(input_id).value > 0:
+            messages.append(f'{label} must be greater than zero.')
+
+    args.areInputsValid = not messages
+    message_input = inputs.itemById('validation_message')
+    if message_input is not None:
+        message_input.formattedText = '<br>'.join(messages)
+
 
 # This event handler is called when the command terminates.
 def command_destroy(args: adsk.core.CommandEventArgs):
-    # General logging for debug.
-    futil.log(f'{CMD_NAME} Command Destroy Event')
+    # Call counts and latencies of the command's handlers, then disconnect them.
+    if config.DEBUG:
+        futil.log(f'{CMD_NAME} handlers:\n{futil.handler_report(local_handlers)}')
+    futil.clear_handlers(local_handlers)
 
-    global local_handlers
-    local_handlers = []
+    # Release the cached preview geometry.
+    _preview.update(key=None, drive=None, dirty=True, last_change=0.0, dragging=False)
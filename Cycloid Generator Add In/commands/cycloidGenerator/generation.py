@@ -0,0 +1,166 @@
+# Background generation of a drive, so large builds do not freeze Fusion.
+# The compute phase (profile, outline, hole positions and the feature plan) runs on a worker
+# thread and must not call the Fusion API. The apply phase makes the API calls on the main
+# thread in chunks of at most CHUNK_TIME seconds, each chunk run from a custom event, so Fusion
+# handles user input between chunks. A ProgressDialog shows the stage and percent done, and
+# cancelling it rolls the drive back to how it was before, see build.PlanJournal.
+
+import threading
+import time
+import traceback
+from typing import Callable
+
+import adsk.core
+
+from ...lib import fusionAddInUtils as futil
+from . import build
+
+# Longest time in seconds one chunk of the apply phase keeps the main thread busy.
+CHUNK_TIME = 0.1
+
+# Range of the progress dialog. The compute phase is shown as the first COMPUTE_PROGRESS of it.
+PROGRESS_MAXIMUM = 1000
+COMPUTE_PROGRESS = 100
+
+# States of a GenerationJob.
+COMPUTING = 'computing'
+APPLYING = 'applying'
+FINISHED = 'finished'
+CANCELLED = 'cancelled'
+FAILED = 'failed'
+
+
+class GenerationJob:
+    """One drive build running in the background.
+
+    Arguments:
+    event_id -- Id of the registered custom event whose handler calls on_event.
+    title -- Title of the progress dialog.
+    compute -- Function run on the worker thread that returns (plan, previous_plan). previous_plan
+               is the FeaturePlan of the drive being updated, or None.
+    begin_apply -- Function(plan, journal) run on the main thread that returns the generator of
+                   build.apply_plan_steps for the plan.
+    finish -- Function(entities, report) run on the main thread once the plan is applied.
+    profile -- Details of the profile run that times the apply phase, see futil.begin_run.
+    """
+
+    def __init__(self, event_id: str, title: str, compute: Callable, begin_apply: Callable, finish: Callable,
+                 profile: dict = None):
+        self.event_id = event_id
+        self.title = title
+        self.state = COMPUTING
+        self.max_chunk_time = 0.0
+        self._compute = compute
+        self._begin_apply = begin_apply
+        self._finish = finish
+        self._result = None
+        self._error = None
+        self._steps = None
+        self._journal = None
+        self._profile = profile or {}
+        self._run = None
+        self._start = time.perf_counter()
+        self._app = adsk.core.Application.get()
+        self._dialog = self._app.userInterface.createProgressDialog()
+        self._dialog.isCancelButtonShown = True
+        self._dialog.cancelButtonText = 'Cancel'
+        self._dialog.isBackgroundTranslucent = False
+
+    @property
+    def is_running(self) -> bool:
+        return self.state in (COMPUTING, APPLYING)
+
+    def start(self):
+        """Shows the progress dialog and starts the compute phase on a worker thread."""
+        self._dialog.show(self.title, 'Computing geometry', 0, PROGRESS_MAXIMUM, 0)
+        # The worker thread is not profiled, stages of the apply phase are recorded per chunk.
+        self._run = futil.begin_run('generate', **self._profile)
+        threading.Thread(target=self._run_compute, name=self.title, daemon=True).start()
+
+    def _run_compute(self):
+        # Worker thread, only fireCustomEvent may be called from here.
+        try:
+            self._result = self._compute()
+        except Exception:
+            self._error = traceback.format_exc()
+        self._app.fireCustomEvent(self.event_id, COMPUTING)
+
+    def on_event(self, args: adsk.core.CustomEventArgs):
+        """Advances the job by one chunk. Called on the main thread from the custom event handler."""
+        if not self.is_running:
+            return
+        if self.state == COMPUTING:
+            if self._error is not None:
+                self._end(FAILED, f'Computing the drive failed:\n{self._error}')
+                return
+            if self._dialog.wasCancelled:
+                self._end(CANCELLED, 'Cancelled before anything was built')
+                return
+            if self._run is not None:
+                self._run.details['compute_time'] = time.perf_counter() - self._start
+            plan, previous = self._result
+            self._journal = build.PlanJournal(previous)
+            try:
+                with futil.resume_run(self._run), futil.stage('build'):
+                    self._steps = self._begin_apply(plan, self._journal)
+            except Exception:
+                self._end(FAILED, f'Starting the build failed:\n{traceback.format_exc()}')
+                return
+            self.state = APPLYING
+            self._dialog.progressValue = COMPUTE_PROGRESS
+        self._apply_chunk()
+
+    def _apply_chunk(self):
+        if self._dialog.wasCancelled:
+            self._rollback(CANCELLED, 'Cancelled')
+            return
+        # Every chunk applies at least one step, so the build always advances.
+        start = time.perf_counter()
+        try:
+            with futil.resume_run(self._run), futil.stage('build'):
+                label, done, total = next(self._steps)
+                while time.perf_counter() - start < CHUNK_TIME:
+                    label, done, total = next(self._steps)
+        except StopIteration as finished:
+            self.max_chunk_time = max(self.max_chunk_time, time.perf_counter() - start)
+            self._dialog.progressValue = PROGRESS_MAXIMUM
+            # A drive that cannot be tagged could not be found by a later run, so it is rolled back.
+            try:
+                with futil.resume_run(self._run), futil.stage('finish'):
+                    self._finish(*finished.value)
+            except Exception:
+                self._rollback(FAILED, f'Finishing the drive failed:\n{traceback.format_exc()}')
+                return
+            self._end(FINISHED, f'in {time.perf_counter() - self._start:.2f} s, '
+                                f'longest chunk {self.max_chunk_time * 1000:.1f} ms')
+            return
+        except Exception:
+            self._rollback(FAILED, f'Building the drive failed:\n{traceback.format_exc()}')
+            return
+        self.max_chunk_time = max(self.max_chunk_time, time.perf_counter() - start)
+
+        progress = COMPUTE_PROGRESS + (PROGRESS_MAXIMUM - COMPUTE_PROGRESS) * done // max(total, 1)
+        self._dialog.progressValue = progress
+        self._dialog.message = f'{label} ({done} of {total}), %p% done'
+        self._app.fireCustomEvent(self.event_id, APPLYING)
+
+    def _rollback(self, state: str, message: str):
+        # Closing the generator runs its cleanup, which finishes an open base feature edit.
+        self._steps.close()
+        self._steps = None
+        try:
+            undone = self._journal.rollback()
+            message = f'{message}, {undone} changes rolled back'
+        except Exception:
+            message = f'{message}, rolling back failed:\n{traceback.format_exc()}'
+            state = FAILED
+        self._end(state, message)
+
+    def _end(self, state: str, message: str):
+        self.state = state
+        self._dialog.hide()
+        futil.end_run(self._run, None if state == FINISHED else state)
+        self._run = None
+        futil.log(f'{self.title} {state}: {message}')
+        if state == FAILED:
+            self._app.userInterface.messageBox(f'{self.title} {state}:\n{message}')
@@ -18,4 +18,32 @@ ADDIN_NAME = os.path.basename(os.path.dirname(__file__))
 COMPANY_NAME = 'ACME'
 
 # Palettes
-sample_palette_id = f'{COMPANY_NAME}_{ADDIN_NAME}_palette_id'
\ No newline at end of file
+sample_palette_id = f'{COMPANY_NAME}_{ADDIN_NAME}_palette_id'
+
+# Computed drive geometry is cached by its parameters. PROFILE_CACHE_SIZE drives are kept
+# in memory, and if PROFILE_CACHE_ON_DISK is True the drives that are built are also stored in
+# PROFILE_CACHE_FOLDER so they survive restarting Fusion. The folder keeps the last
+# PROFILE_CACHE_DISK_ENTRIES of them. Preview drives are never written to disk.
+PROFILE_CACHE_SIZE = 32
+PROFILE_CACHE_ON_DISK = True
+PROFILE_CACHE_FOLDER = os.path.join(os.path.dirname(__file__), 'cache')
+PROFILE_CACHE_DISK_ENTRIES = 256
+
+# The disc profiles of the standard eccentricity ratios, see cycloidGeometry.standard_keys, are scaled
+# from the unit profiles in PROFILE_TABLE_FILE instead of sampled, see lib/cycloidGeometry/table.py.
+# Rebuild it with
+# python -m lib.cycloidGeometry.table build tables/standard.cyt
+PROFILE_TABLE_FILE = os.path.join(os.path.dirname(__file__), 'tables', 'standard.cyt')
+
+# If SAVE_DESIGN_RECORDS is True every drive built is also saved as a design record in
+# DESIGN_RECORD_FOLDER, see lib/cycloidGeometry/record.py. A record can be loaded in the
+# command dialog to build the same drive again without computing it.
+SAVE_DESIGN_RECORDS = True
+DESIGN_RECORD_FOLDER = os.path.join(os.path.dirname(__file__), 'records')
+
+# When PROFILING is True every command execution and preview writes a JSON summary of the time
+# spent per stage to PROFILE_LOG_FILE. The file is rotated when it grows. Off by default, also
+# with DEBUG, as it adds a little time to every stage. The API calls of a build are counted by
+# the benchmark, see benchmarks/bench_generator.py.
+PROFILING = False
+PROFILE_LOG_FILE = os.path.join(os.path.dirname(__file__), 'logs', 'profile.jsonl')
@@ -0,0 +1,15 @@
+# Fusion independent geometry for the cycloid drive generator.
+# Nothing in this package may import adsk so it can be used headless.
+from .profile import *
+from .sampling import *
+from .offset import *
+from .drive import *
+from .record import *
+from .table import *
+from .cache import *
+from .discs import *
+from .validation import *
+from .metrics import *
+from .export import *
+from .mesh import *
+from .layout import *
@@ -0,0 +1,208 @@
+# Parameter keyed memoization of computed drive geometry.
+# Entries are kept in a bounded in-memory LRU and can optionally be persisted to a folder
+# as design records, see record.py, so the same drive is only ever computed once. The folder
+# is bounded too, the least recently written records are deleted first. Drives whose disc
+# profile is in a ProfileTable take the profile from the table, see table.py.
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from .sampling import DEFAULT_TOLERANCE
+from .drive import DEFAULT_PIN_CLEARANCE, DriveGeometry, compute_drive
+from .record import read_record, write_record
+
+__all__ = [
+    'ProfileCache',
+    'drive_key',
+]
+
+# Floats are rounded to this many digits before they are used in a key, so values that only
+# differ by unit conversion noise share one entry.
+_KEY_DIGITS = 9
+
+
+def drive_key(pin_count: int, cycloid_radius: float, pin_radius: float, eccentricity: float,
+              tolerance: float = DEFAULT_TOLERANCE, *, clearance: float = DEFAULT_PIN_CLEARANCE,
+              **sampling) -> tuple:
+    """Returns the normalized cache key for a set of drive parameters and sample settings."""
+    def normalize(value):
+        return round(float(value), _KEY_DIGITS) if isinstance(value, float) else value
+
+    settings = tuple(sorted((name, normalize(value)) for name, value in sampling.items()))
+    return (int(pin_count), normalize(float(cycloid_radius)), normalize(float(pin_radius)),
+            normalize(float(eccentricity)), normalize(float(tolerance)), normalize(float(clearance)), settings)
+
+
+class ProfileCache:
+    """Bounded LRU cache of DriveGeometry with optional on-disk persistence.
+
+    Arguments:
+    max_entries -- Maximum number of drives kept in memory.
+    folder -- Folder for the on-disk store. If None nothing is written to disk.
+    max_disk_entries -- Maximum number of records kept in the folder.
+    use_numpy -- Return NumPy arrays (True) or lists (False) for entries loaded from disk.
+    table -- ProfileTable of precomputed disc profiles looked up before computing a drive, or None.
+    """
+
+    def __init__(self, max_entries: int = 32, folder: str = None, *, max_disk_entries: int = 256,
+                 use_numpy: bool = None, table=None):
+        if max_entries < 1:
+            raise ValueError(f'max_entries must be at least 1, got {max_entries}')
+        if max_disk_entries < 1:
+            raise ValueError(f'max_disk_entries must be at least 1, got {max_disk_entries}')
+        self.max_entries = max_entries
+        self.folder = folder
+        self.max_disk_entries = max_disk_entries
+        self.use_numpy = use_numpy
+        self.table = table
+        self._entries = OrderedDict()
+        # The generator computes drives on a worker thread while a command preview may use the cache.
+        # The lock only guards the dicts and counters, drives are computed outside it. A drive being
+        # computed has an Event in _pending, other threads asking for it wait for that instead.
+        self._lock = threading.RLock()
+        self._pending = {}
+        self.hits = 0
+        self.disk_hits = 0
+        self.table_hits = 0
+        self.misses = 0
+        self.disk_errors = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> str:
+        return (f'profile cache: {self.hits} hits, {self.disk_hits} disk hits, {self.table_hits} table hits, '
+                f'{self.misses} misses, {self.disk_errors} disk errors, '
+                f'{len(self._entries)}/{self.max_entries} entries')
+
+    def clear(self, *, disk: bool = False):
+        """Empties the in-memory cache and, if disk is True, deletes the on-disk store."""
+        with self._lock:
+            self._entries.clear()
+        if disk and self.folder and os.path.isdir(self.folder):
+            for name in os.listdir(self.folder):
+                if name.endswith('.bin'):
+                    os.remove(os.path.join(self.folder, name))
+
+    def get_drive(self, pin_count: int, cycloid_radius: float, pin_radius: float, eccentricity: float,
+                  tolerance: float = DEFAULT_TOLERANCE, *, clearance: float = DEFAULT_PIN_CLEARANCE,
+                  persist: bool = True, **sampling) -> DriveGeometry:
+        """Returns the drive geometry for the parameters, computing it only on a cache miss.
+
+        Takes the same arguments as compute_drive. Safe to call from several threads, a drive
+        asked for by several threads at once is only computed by the first one.
+        If persist is False a computed drive is only kept in memory, as for previews whose
+        parameters change with every spinner step.
+        """
+        key = drive_key(pin_count, cycloid_radius, pin_radius, eccentricity, tolerance,
+                        clearance=clearance, **sampling)
+        while True:
+            with self._lock:
+                drive = self._entries.get(key)
+                if drive is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return drive
+                pending = self._pending.get(key)
+                if pending is None:
+                    self._pending[key] = threading.Event()
+                    break
+            # If the other thread fails, or its drive is evicted before this one wakes up, the
+            # next pass computes it here.
+            pending.wait()
+
+        try:
+            # A table drive only computes its outline, which is cheaper than reading a file, so it is
+            # not saved to disk.
+            drive = None
+            if self.table is not None:
+                drive = self.table.lookup(pin_count, cycloid_radius, pin_radius, eccentricity, tolerance,
+                                          clearance=clearance, **sampling)
+            if drive is not None:
+                counter = 'table_hits'
+            else:
+                drive = self._load(key)
+                if drive is not None:
+                    counter = 'disk_hits'
+                else:
+                    counter = 'misses'
+                    drive = compute_drive(pin_count, cycloid_radius, pin_radius, eccentricity, tolerance,
+                                          clearance=clearance, use_numpy=self.use_numpy, **sampling)
+            with self._lock:
+                setattr(self, counter, getattr(self, counter) + 1)
+                self._insert(key, drive)
+        finally:
+            with self._lock:
+                self._pending.pop(key).set()
+
+        if counter == 'misses' and persist:
+            self._save(key, drive)
+        return drive
+
+    def put(self, drive: DriveGeometry, tolerance: float = DEFAULT_TOLERANCE, **sampling):
+        """Adds a drive computed elsewhere, for example read from a design record.
+
+        Arguments:
+        drive -- The drive geometry.
+        tolerance -- Chord tolerance the drive was computed with.
+        sampling -- Extra sampling keyword arguments the drive was computed with.
+        """
+        key = drive_key(drive.pin_count, drive.cycloid_radius, drive.pin_radius, drive.eccentricity, tolerance,
+                        clearance=drive.clearance, **sampling)
+        with self._lock:
+            self._insert(key, drive)
+
+    def _insert(self, key: tuple, drive: DriveGeometry):
+        self._entries[key] = drive
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _path(self, key: tuple) -> str:
+        digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.folder, f'{digest}.bin')
+
+    def _save(self, key: tuple, drive: DriveGeometry):
+        # The cache only saves work, a folder that cannot be written must not stop the generator.
+        if not self.folder:
+            return
+        *_, tolerance, _, sampling = key
+        try:
+            write_record(self._path(key), drive, tolerance=tolerance, sampling=dict(sampling))
+            self._prune()
+        except OSError:
+            with self._lock:
+                self.disk_errors += 1
+
+    def _prune(self):
+        # Deletes the least recently written records beyond max_disk_entries.
+        with os.scandir(self.folder) as entries:
+            records = [(entry.stat().st_mtime, entry.path) for entry in entries if entry.name.endswith('.bin')]
+        if len(records) <= self.max_disk_entries:
+            return
+        records.sort()
+        for _, path in records[:len(records) - self.max_disk_entries]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _load(self, key: tuple):
+        if not self.folder:
+            return None
+        path = self._path(key)
+        if not os.path.isfile(path):
+            return None
+
+        # Not memory-mapped, a mapped file could not be replaced or cleared while its drive is cached.
+        try:
+            record = read_record(path, use_numpy=self.use_numpy, memory_map=False)
+        except (OSError, ValueError, KeyError):
+            return None
+        drive = record.drive
+        if drive_key(drive.pin_count, drive.cycloid_radius, drive.pin_radius, drive.eccentricity,
+                     record.tolerance, clearance=drive.clearance, **record.sampling) != key:
+            return None
+        return drive
@@ -0,0 +1,71 @@
+# Placement of the discs of a multi-disc drive. All discs of a drive share one profile, one
+# eccentric and one ring of roller pins, so every disc after the first is the first disc moved
+# by a rigid transform: a rotation about the drive axis and a shift along it.
+#
+# A disc set is disc_count phased discs. Further disc sets stack on the same eccentric to share
+# the load, they are not reduction stages in series: the reduction ratio of the drive stays
+# (pin_count - 1):1 whatever disc_set_count is.
+
+import math
+from typing import NamedTuple
+
+__all__ = [
+    'MAX_DISC_COUNT',
+    'MAX_DISC_SET_COUNT',
+    'DiscPlacement',
+    'disc_placements',
+    'stack_length',
+]
+
+# Largest number of discs per set and stacked disc sets per drive the generator builds.
+MAX_DISC_COUNT = 4
+MAX_DISC_SET_COUNT = 2
+
+
+class DiscPlacement(NamedTuple):
+    """Pose of one disc relative to the first disc of the drive.
+
+    angle is the rotation in radians about the drive axis, axial_offset the shift along it.
+    """
+    disc_set: int
+    index: int
+    angle: float
+    axial_offset: float
+
+    @property
+    def is_first(self) -> bool:
+        return self.disc_set == 0 and self.index == 0
+
+
+def _check_counts(disc_count: int, disc_set_count: int):
+    if not 1 <= disc_count <= MAX_DISC_COUNT:
+        raise ValueError(f'disc_count must be between 1 and {MAX_DISC_COUNT}, got {disc_count}')
+    if not 1 <= disc_set_count <= MAX_DISC_SET_COUNT:
+        raise ValueError(f'disc_set_count must be between 1 and {MAX_DISC_SET_COUNT}, got {disc_set_count}')
+
+
+def stack_length(disc_count: int, disc_set_count: int, thickness: float) -> float:
+    """Axial length of all discs of a drive, which the roller pins have to span."""
+    _check_counts(disc_count, disc_set_count)
+    return disc_count * disc_set_count * thickness
+
+
+def disc_placements(disc_count: int = 1, disc_set_count: int = 1, thickness: float = 0.0) -> list:
+    """Returns the DiscPlacement of every disc of a drive, the first disc first.
+
+    The discs of a set sit on the eccentric 360 / disc_count degrees out of phase, so two discs
+    are 180 degrees apart and balance each other. Discs are stacked along the drive axis in the
+    extrude direction of the first disc, set after set, and every set repeats the phases of the
+    first one on the same eccentric. No second reduction stage is modeled.
+
+    Arguments:
+    disc_count -- Number of discs per set.
+    disc_set_count -- Number of disc sets stacked along the drive axis.
+    thickness -- Thickness of one disc.
+    """
+    _check_counts(disc_count, disc_set_count)
+    return [
+        DiscPlacement(disc_set, index, 2 * math.pi * index / disc_count, (disc_set * disc_count + index) * thickness)
+        for disc_set in range(disc_set_count)
+        for index in range(disc_count)
+    ]
@@ -0,0 +1,131 @@
+# Complete 2D geometry of a cycloid drive: disc profile, disc outline, roller pin
+# positions and output holes. This mirrors the layout built by command_execute so
+# the same numbers can be used for previews, exports and batch runs.
+
+import math
+from typing import NamedTuple
+
+from .profile import np, _use_numpy
+from .sampling import DEFAULT_TOLERANCE, AdaptiveProfile, adaptive_profile
+from .offset import EquidistantProfile, equidistant_profile
+
+__all__ = [
+    'DEFAULT_PIN_CLEARANCE',
+    'OUTPUT_HOLE_RADIUS_RATIO',
+    'THROUGHHOLE_CLEARANCE',
+    'DriveGeometry',
+    'pin_centers',
+    'output_hole_count',
+    'output_hole_circle',
+    'output_hole_centers',
+    'compute_drive',
+]
+
+# Radial clearance added to the pin radius when offsetting the disc profile.
+DEFAULT_PIN_CLEARANCE = 0.4
+
+# The output holes are centered at cycloid_radius / OUTPUT_HOLE_RADIUS_RATIO.
+OUTPUT_HOLE_RADIUS_RATIO = 2.25
+
+# Radial clearance of the throughhole in the roller plate over the pin radius.
+THROUGHHOLE_CLEARANCE = 0.2
+
+
+class DriveGeometry(NamedTuple):
+    """All computed 2D geometry of one drive. Lengths are in Fusion internal units (cm)."""
+    pin_count: int
+    cycloid_radius: float
+    pin_radius: float
+    eccentricity: float
+    clearance: float
+    profile: AdaptiveProfile
+    outline: EquidistantProfile
+    pin_xs: object
+    pin_ys: object
+    hole_xs: object
+    hole_ys: object
+
+    @property
+    def reduction_ratio(self) -> int:
+        return self.pin_count - 1
+
+    @property
+    def hole_radius(self) -> float:
+        return self.pin_radius
+
+    @property
+    def output_pin_radius(self) -> float:
+        """Radius of the output pins, the holes are larger by the eccentricity."""
+        return self.hole_radius - self.eccentricity
+
+    @property
+    def bore_center(self):
+        return self.eccentricity, 0.0
+
+    @property
+    def bore_radius(self) -> float:
+        return self.pin_radius
+
+    @property
+    def plate_radius(self) -> float:
+        return self.cycloid_radius + self.pin_radius
+
+    @property
+    def throughhole_radius(self) -> float:
+        return self.pin_radius + THROUGHHOLE_CLEARANCE
+
+
+def _circle_points(count: int, radius: float, cx: float, cy: float, use_numpy: bool):
+    if _use_numpy(use_numpy):
+        angles = np.arange(count, dtype=float) * (2 * math.pi / count)
+        return cx + radius * np.cos(angles), cy + radius * np.sin(angles)
+    angles = [2 * math.pi * i / count for i in range(count)]
+    return [cx + radius * math.cos(a) for a in angles], [cy + radius * math.sin(a) for a in angles]
+
+
+def pin_centers(pin_count: int, cycloid_radius: float, eccentricity: float, *, use_numpy: bool = None):
+    """Returns (xs, ys) of the roller pin centers, patterned around the origin."""
+    return _circle_points(pin_count, cycloid_radius - eccentricity, 0.0, 0.0, use_numpy)
+
+
+def output_hole_count(pin_count: int) -> int:
+    """Number of output pin holes in the disc, half the reduction ratio."""
+    return max(int((pin_count - 1) / 2), 1)
+
+
+def output_hole_circle(cycloid_radius: float, eccentricity: float) -> float:
+    """Radius of the circle of output pin hole centers around the eccentric bore."""
+    return cycloid_radius / OUTPUT_HOLE_RADIUS_RATIO - eccentricity
+
+
+def output_hole_centers(pin_count: int, cycloid_radius: float, eccentricity: float, *, use_numpy: bool = None):
+    """Returns (xs, ys) of the output pin hole centers, patterned around the eccentric bore."""
+    radius = output_hole_circle(cycloid_radius, eccentricity)
+    return _circle_points(output_hole_count(pin_count), radius, eccentricity, 0.0, use_numpy)
+
+
+def compute_drive(pin_count: int, cycloid_radius: float, pin_radius: float, eccentricity: float,
+                  tolerance: float = DEFAULT_TOLERANCE, *, clearance: float = DEFAULT_PIN_CLEARANCE,
+                  profile: AdaptiveProfile = None, use_numpy: bool = None, **sampling) -> DriveGeometry:
+    """Computes the complete 2D geometry of a drive.
+
+    Arguments:
+    pin_count -- Number of roller pins.
+    cycloid_radius -- Radius of the cycloidal disc.
+    pin_radius -- Radius of the roller pins, output pins and eccentric shaft.
+    eccentricity -- Eccentricity of the input shaft.
+    tolerance -- Maximum chord deviation of the sampled curves.
+    clearance -- Radial clearance added to the pin radius for the disc outline.
+    profile -- The disc profile if it is already known, for example from a ProfileTable.
+    use_numpy -- Force (True) or disable (False) the NumPy code path.
+    sampling -- Extra keyword arguments passed on to adaptive_profile.
+    """
+    if profile is None:
+        profile = adaptive_profile(pin_count, cycloid_radius, eccentricity, tolerance,
+                                   use_numpy=use_numpy, **sampling)
+    outline = equidistant_profile(pin_count, cycloid_radius, eccentricity, pin_radius + clearance, tolerance,
+                                  use_numpy=use_numpy, **sampling)
+    pin_xs, pin_ys = pin_centers(pin_count, cycloid_radius, eccentricity, use_numpy=use_numpy)
+    hole_xs, hole_ys = output_hole_centers(pin_count, cycloid_radius, eccentricity, use_numpy=use_numpy)
+    return DriveGeometry(pin_count, cycloid_radius, pin_radius, eccentricity, clearance,
+                         profile, outline, pin_xs, pin_ys, hole_xs, hole_ys)
@@ -0,0 +1,294 @@
+# Streaming 2D export of a drive as DXF, SVG or point CSV.
+# The disc outline is generated and written chunk by chunk, so memory use does not depend on the
+# number of points. Runs without Fusion, from the add-in folder:
+#
+#   python -m lib.cycloidGeometry.export grid.json -f dxf -o exports
+#
+# Coordinates are written in millimetres by default (Fusion internal units are cm).
+
+import argparse
+import math
+import os
+import sys
+
+from .profile import np, _use_numpy, equidistant_points
+from .drive import DEFAULT_PIN_CLEARANCE, THROUGHHOLE_CLEARANCE, pin_centers, output_hole_centers
+from .metrics import design_metrics
+
+__all__ = [
+    'EXPORT_FORMATS',
+    'SAMPLES_PER_LOBE_EXPORT',
+    'stream_outline',
+    'drive_circles',
+    'export_drive',
+    'export_designs',
+]
+
+EXPORT_FORMATS = ('dxf', 'svg', 'csv')
+
+# Uniform outline samples per lobe when no explicit sample count is given.
+SAMPLES_PER_LOBE_EXPORT = 256
+
+# Number of points generated and written per chunk.
+_CHUNK_SIZE = 65536
+
+# Buffer size of the export files, large buffers keep the number of write calls low.
+_BUFFER_SIZE = 1 << 20
+
+# The scales that convert Fusion cm to a drawing unit, with the unit name and its DXF $INSUNITS
+# code. DXF files of any other scale are written as unitless (0), SVG sizes in converted mm.
+_UNITS = (
+    (10.0, 'mm', 4),
+    (1.0, 'cm', 5),
+    (0.01, 'm', 6),
+    (1 / 2.54, 'in', 1),
+)
+
+# Units SVG lengths can be given in.
+_SVG_UNITS = ('mm', 'cm', 'in')
+
+
+def _unit(scale: float):
+    # Returns (name, DXF code) of the unit a scale converts to, or (None, 0).
+    for unit_scale, name, code in _UNITS:
+        if math.isclose(scale, unit_scale, rel_tol=1e-9):
+            return name, code
+    return None, 0
+
+
+def stream_outline(pin_count: int, cycloid_radius: float, pin_radius: float, eccentricity: float, *,
+                   samples: int = None, clearance: float = DEFAULT_PIN_CLEARANCE,
+                   chunk_size: int = _CHUNK_SIZE, use_numpy: bool = None):
+    """Yields the disc outline as chunks of (xs, ys), uniformly sampled over the full profile.
+
+    The outline is not trimmed, so undercut designs are rejected with a ValueError up front.
+    The last point of the last chunk connects back to the first point.
+    """
+    if design_metrics(pin_count, cycloid_radius, pin_radius, eccentricity, clearance=clearance,
+                      use_numpy=use_numpy)['undercut']:
+        raise ValueError(f'The disc profile is undercut for pin_count={pin_count}, '
+                         f'cycloid_radius={cycloid_radius}, pin_radius={pin_radius}, eccentricity={eccentricity}')
+
+    use_numpy = _use_numpy(use_numpy)
+    samples = samples or SAMPLES_PER_LOBE_EXPORT * (pin_count - 1)
+    step = 2 * math.pi / samples
+    for start in range(0, samples, chunk_size):
+        stop = min(start + chunk_size, samples)
+        if use_numpy:
+            angles = np.arange(start, stop, dtype=float) * step
+        else:
+            angles = [i * step for i in range(start, stop)]
+        yield equidistant_points(pin_count, cycloid_radius, eccentricity, pin_radius + clearance, angles,
+                                 use_numpy=use_numpy)
+
+
+def drive_circles(pin_count: int, cycloid_radius: float, pin_radius: float, eccentricity: float):
+    """Returns every circle of the drive as (layer, x, y, radius) tuples.
+
+    Layers are PINS (roller pins), HOLES (output pin holes), BORE (eccentric bore in the disc),
+    PLATE (roller plate outline) and THROUGHHOLE (centre hole of the roller plate).
+    """
+    circles = []
+    pin_xs, pin_ys = pin_centers(pin_count, cycloid_radius, eccentricity, use_numpy=False)
+    circles.extend(('PINS', x, y, pin_radius) for x, y in zip(pin_xs, pin_ys))
+    hole_xs, hole_ys = output_hole_centers(pin_count, cycloid_radius, eccentricity, use_numpy=False)
+    circles.extend(('HOLES', x, y, pin_radius) for x, y in zip(hole_xs, hole_ys))
+    circles.append(('BORE', eccentricity, 0.0, pin_radius))
+    circles.append(('PLATE', 0.0, 0.0, cycloid_radius + pin_radius))
+    circles.append(('THROUGHHOLE', 0.0, 0.0, pin_radius + THROUGHHOLE_CLEARANCE))
+    return circles
+
+
+class _DxfWriter:
+    # Minimal AutoCAD R12 DXF. POLYLINE/VERTEX entities are used because, unlike LWPOLYLINE,
+    # they do not need the vertex count before the vertices.
+
+    def __init__(self, file, scale: float):
+        self.file = file
+        self.units = _unit(scale)[1]
+
+    def begin(self, extent: float):
+        self.file.write(f'0\nSECTION\n2\nHEADER\n9\n$INSUNITS\n70\n{self.units}\n0\nENDSEC\n'
+                        '0\nSECTION\n2\nENTITIES\n')
+
+    def begin_outline(self):
+        self.file.write('0\nPOLYLINE\n8\nDISC\n66\n1\n70\n1\n10\n0.0\n20\n0.0\n30\n0.0\n')
+
+    def outline_points(self, xs, ys):
+        self.file.write(''.join(f'0\nVERTEX\n8\nDISC\n10\n{x:.6f}\n20\n{y:.6f}\n30\n0.0\n' for x, y in zip(xs, ys)))
+
+    def end_outline(self):
+        self.file.write('0\nSEQEND\n8\nDISC\n')
+
+    def circle(self, layer: str, x: float, y: float, r: float):
+        self.file.write(f'0\nCIRCLE\n8\n{layer}\n10\n{x:.6f}\n20\n{y:.6f}\n30\n0.0\n40\n{r:.6f}\n')
+
+    def end(self):
+        self.file.write('0\nENDSEC\n0\nEOF\n')
+
+
+class _SvgWriter:
+    # The y axis is flipped with a group transform so the drawing matches the Fusion sketch.
+
+    def __init__(self, file, scale: float):
+        self.file = file
+        self.first = True
+        self.scale = scale
+
+    def begin(self, extent: float):
+        size = 2 * extent
+        unit = _unit(self.scale)[0]
+        if unit in _SVG_UNITS:
+            physical = f'{size:.3f}{unit}'
+        else:
+            physical = f'{size * 10 / self.scale:.3f}mm'
+        self.file.write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{physical}" height="{physical}" '
+            f'viewBox="{-extent:.3f} {-extent:.3f} {size:.3f} {size:.3f}">\n'
+            f'<g transform="scale(1,-1)" fill="none" stroke="black" stroke-width="{0.01 * self.scale:.6g}">\n')
+
+    def begin_outline(self):
+        self.file.write('<path id="DISC" d="')
+        self.first = True
+
+    def outline_points(self, xs, ys):
+        points = ' '.join(f'{x:.6f},{y:.6f}' for x, y in zip(xs, ys))
+        if self.first:
+            self.file.write('M' + points.replace(' ', ' L', 1))
+            self.first = False
+        else:
+            self.file.write(' ' + points)
+
+    def end_outline(self):
+        self.file.write(' Z"/>\n')
+
+    def circle(self, layer: str, x: float, y: float, r: float):
+        self.file.write(f'<circle class="{layer}" cx="{x:.6f}" cy="{y:.6f}" r="{r:.6f}"/>\n')
+
+    def end(self):
+        self.file.write('</g>\n</svg>\n')
+
+
+class _CsvWriter:
+    # One row per outline point or circle: feature,x,y,r
+
+    def __init__(self, file, scale: float):
+        self.file = file
+
+    def begin(self, extent: float):
+        self.file.write('feature,x,y,r\n')
+
+    def begin_outline(self):
+        pass
+
+    def outline_points(self, xs, ys):
+        self.file.write(''.join(f'DISC,{x:.6f},{y:.6f},\n' for x, y in zip(xs, ys)))
+
+    def end_outline(self):
+        pass
+
+    def circle(self, layer: str, x: float, y: float, r: float):
+        self.file.write(f'{layer},{x:.6f},{y:.6f},{r:.6f}\n')
+
+    def end(self):
+        pass
+
+
+_WRITERS = {
+    'dxf': _DxfWriter,
+    'svg': _SvgWriter,
+    'csv': _CsvWriter,
+}
+
+
+def export_drive(file, pin_count: int, cycloid_radius: float, pin_radius: float, eccentricity: float,
+                 fmt: str = 'dxf', *, samples: int = None, clearance: float = DEFAULT_PIN_CLEARANCE,
+                 scale: float = 10.0, use_numpy: bool = None):
+    """Writes the 2D outlines of one drive to an open text file.
+
+    Arguments:
+    file -- Text file object to write to.
+    pin_count, cycloid_radius, pin_radius, eccentricity -- The drive parameters, in cm.
+    fmt -- One of EXPORT_FORMATS.
+    samples -- Number of outline points, defaults to SAMPLES_PER_LOBE_EXPORT per lobe.
+    clearance -- Radial clearance added to the pin radius for the disc outline.
+    scale -- Factor applied to all coordinates, the default converts cm to mm. DXF files record
+        mm, cm, m or inches for the matching scale and are unitless otherwise. SVG files always
+        have the true physical size.
+    use_numpy -- Force (True) or disable (False) the NumPy code path.
+    """
+    if fmt not in _WRITERS:
+        raise ValueError(f'Unknown export format {fmt!r}, expected one of {EXPORT_FORMATS}')
+    writer = _WRITERS[fmt](file, scale)
+    use_numpy = _use_numpy(use_numpy)
+
+    writer.begin((cycloid_radius + pin_radius) * scale * 1.05)
+    writer.begin_outline()
+    for xs, ys in stream_outline(pin_count, cycloid_radius, pin_radius, eccentricity, samples=samples,
+                                 clearance=clearance, use_numpy=use_numpy):
+        if use_numpy:
+            # Formatting Python floats is much faster than formatting NumPy scalars.
+            xs, ys = (xs * scale).tolist(), (ys * scale).tolist()
+        elif scale != 1.0:
+            xs = [x * scale for x in xs]
+            ys = [y * scale for y in ys]
+        writer.outline_points(xs, ys)
+    writer.end_outline()
+    for layer, x, y, r in drive_circles(pin_count, cycloid_radius, pin_radius, eccentricity):
+        writer.circle(layer, x * scale, y * scale, r * scale)
+    writer.end()
+
+
+def export_designs(designs, folder: str, fmt: str = 'dxf', *,
+                   name: str = 'drive_{index:05d}_{pin_count}p', **options):
+    """Writes every design to its own file in `folder`.
+
+    Arguments:
+    designs -- Iterable of design dicts, for example from sweep.read_grid.
+    folder -- Output folder, created if needed.
+    fmt -- One of EXPORT_FORMATS.
+    name -- File name template without extension, formatted with index and the design values.
+    options -- Extra keyword arguments passed on to export_drive.
+
+    :returns:
+        A list of (path, error) tuples, error is None for designs that were written.
+    """
+    os.makedirs(folder, exist_ok=True)
+    written = []
+    for index, design in enumerate(designs):
+        path = os.path.join(folder, name.format(index=index, **design) + '.' + fmt)
+        try:
+            with open(path, 'w', newline='', buffering=_BUFFER_SIZE) as file:
+                export_drive(file, design['pin_count'], design['cycloid_radius'], design['pin_radius'],
+                             design['eccentricity'], fmt, **options)
+            written.append((path, None))
+        except ValueError as error:
+            if os.path.exists(path):
+                os.remove(path)
+            written.append((path, str(error)))
+    return written
+
+
+def main(argv=None):
+    from .sweep import read_grid
+
+    parser = argparse.ArgumentParser(description='Export cycloid drive outlines as DXF, SVG or CSV.')
+    parser.add_argument('grid', help='CSV or JSON grid file or design record folder, see sweep.py')
+    parser.add_argument('-o', '--output', default='.', help='output folder')
+    parser.add_argument('-f', '--format', choices=EXPORT_FORMATS, default='dxf')
+    parser.add_argument('--samples', type=int, default=None, help='outline points per design')
+    parser.add_argument('--clearance', type=float, default=DEFAULT_PIN_CLEARANCE)
+    parser.add_argument('--scale', type=float, default=10.0, help='coordinate scale, default cm to mm')
+    args = parser.parse_args(argv)
+
+    results = export_designs(read_grid(args.grid), args.output, args.format, samples=args.samples,
+                             clearance=args.clearance, scale=args.scale)
+    for path, error in results:
+        if error:
+            print(f'{path}: {error}', file=sys.stderr)
+    print(f'{sum(error is None for _, error in results)} of {len(results)} designs exported', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,494 @@
+# Layout of the roller pins and output holes of a drive, with clearance queries on a spatial index.
+# Pins, holes and a uniform sample of the disc profile are held as arrays of circles in a uniform
+# grid, so the walls between all of them are found with batched nearest neighbour queries instead
+# of pairwise loops. The disc outline is the profile offset inwards by pin radius plus clearance,
+# which makes it the envelope of circles of that radius centred on the profile: the wall between a
+# hole and the outline is the gap between the hole and the nearest of these circles.
+#
+# On top of the queries optimize_holes chooses the number and places the output holes for the
+# strongest output pins that keep every wall, quick enough to run for every design of a sweep.
+
+import math
+from typing import NamedTuple
+
+from .profile import np, _use_numpy, cycloid_points, sample_angles
+from .sampling import DEFAULT_TOLERANCE
+from .drive import DEFAULT_PIN_CLEARANCE, DriveGeometry, _circle_points, output_hole_circle, output_hole_count
+from .metrics import SAMPLES_PER_LOBE
+from .validation import MIN_WALL_THICKNESS, WALL_MESSAGES, DesignIssue
+
+__all__ = [
+    'CircleIndex',
+    'DriveLayout',
+    'compute_layout',
+    'layout_clearances',
+    'check_layout',
+    'optimize_holes',
+]
+
+# Most Newton steps optimize_holes takes before it settles for the best circle seen.
+_MAX_STEPS = 40
+
+# Fewest output holes optimize_holes tries. With fewer output pins the disc hangs on one or two
+# of them for part of every turn.
+_MIN_HOLE_COUNT = 3
+
+# Most (query, cell) pairs a batch of CircleIndex queries works on at once, bounds the memory used.
+_MAX_CELLS = 1 << 18
+
+# Walls thinner than min_wall by less than this are rounding errors, as in layouts sized to min_wall.
+_WALL_ROUNDING = 1e-9
+
+
+class CircleIndex:
+    """Uniform grid over a set of circles for batched gap queries.
+
+    The gap between two circles is the distance of their centres minus both radii, the wall
+    between them, negative if they overlap. A query only visits the grid cells around it, so its
+    cost depends on the local density of circles, not on their number.
+
+    Arguments:
+    xs, ys -- Circle centres.
+    radii -- Circle radii, a number or one per circle.
+    cell_size -- Side of the grid cells. Defaults to a size that puts about one circle in a cell
+                 of an evenly filled bounding box.
+    use_numpy -- Force (True) or disable (False) the NumPy code path.
+    """
+
+    def __init__(self, xs, ys, radii=0.0, cell_size: float = None, *, use_numpy: bool = None):
+        self.use_numpy = _use_numpy(use_numpy)
+        if self.use_numpy:
+            xs = np.asarray(xs, dtype=float)
+            ys = np.asarray(ys, dtype=float)
+            radii = np.broadcast_to(np.asarray(radii, dtype=float), xs.shape)
+        else:
+            xs = [float(x) for x in xs]
+            ys = [float(y) for y in ys]
+            radii = [float(r) for r in radii] if hasattr(radii, '__len__') else [float(radii)] * len(xs)
+        if len(xs) == 0:
+            raise ValueError('A CircleIndex needs at least one circle')
+        self.xs, self.ys, self.radii = xs, ys, radii
+        if self.use_numpy:
+            self.max_radius = float(radii.max())
+            self.bounds = (float(xs.min()), float(ys.min()), float(xs.max()), float(ys.max()))
+        else:
+            self.max_radius = max(radii)
+            self.bounds = (min(xs), min(ys), max(xs), max(ys))
+        width, height = self.bounds[2] - self.bounds[0], self.bounds[3] - self.bounds[1]
+        if cell_size is None:
+            cell_size = max(math.sqrt(width * height / len(xs)), max(width, height) / len(xs)) or 1.0
+        if not cell_size > 0:
+            raise ValueError(f'cell_size must be positive, got {cell_size}')
+        self.cell_size = cell_size
+        self.columns = int(height / cell_size) + 1
+        self.rows = int(width / cell_size) + 1
+
+        if self.use_numpy:
+            keys = self._cells(xs, ys)
+            self._order = np.argsort(keys, kind='stable')
+            self._keys = keys[self._order]
+        else:
+            self._cells_map = {}
+            for index, key in enumerate(self._cells(xs, ys)):
+                self._cells_map.setdefault(key, []).append(index)
+
+    def __len__(self) -> int:
+        return len(self.xs)
+
+    def _cells(self, xs, ys):
+        # Grid cell of every point, as (row, column) tuples or as row * columns + column keys.
+        x0, y0, _, _ = self.bounds
+        if self.use_numpy:
+            rows = np.floor((xs - x0) / self.cell_size).astype(np.int64)
+            columns = np.floor((ys - y0) / self.cell_size).astype(np.int64)
+            return rows * self.columns + columns
+        return [(math.floor((x - x0) / self.cell_size), math.floor((y - y0) / self.cell_size))
+                for x, y in zip(xs, ys)]
+
+    def nearest(self, xs, ys, radii=0.0, *, reach=None, exclude_self: bool = False):
+        """Finds the indexed circle with the smallest gap to every query circle.
+
+        The search starts within `reach` of each query centre and doubles the reach until the
+        nearest circle is certain, so the result does not depend on it, only the time taken.
+
+        Arguments:
+        xs, ys -- Query circle centres.
+        radii -- Query circle radii, a number or one per query.
+        reach -- First search distance around the query centres, a number or one per query.
+                 Defaults to the cell size. A good estimate of the nearest distance saves rounds.
+        exclude_self -- The queries are the indexed circles in index order, and no circle is
+                        compared with itself.
+
+        :returns:
+            A tuple (gaps, indices). indices is -1 and gaps is inf where nothing was found, which
+            only happens with exclude_self on an index of one circle.
+        """
+        if self.use_numpy:
+            xs = np.asarray(xs, dtype=float)
+            ys = np.asarray(ys, dtype=float)
+            count = len(xs)
+            radii = np.broadcast_to(np.asarray(radii, dtype=float), xs.shape)
+            reach = np.broadcast_to(np.asarray(self.cell_size if reach is None else reach, dtype=float), xs.shape)
+            x0, y0, x1, y1 = self.bounds
+            farthest = np.hypot(np.maximum(np.abs(xs - x0), np.abs(xs - x1)),
+                                np.maximum(np.abs(ys - y0), np.abs(ys - y1)))
+            gaps = np.full(count, np.inf)
+            indices = np.full(count, -1, dtype=np.int64)
+            pending = np.arange(count)
+            reach = np.maximum(reach, self.cell_size / 2)
+            while len(pending):
+                found_gaps, found = self._search_numpy(pending, xs, ys, radii, reach, exclude_self)
+                # Every circle closer than reach was seen, a gap below this bound cannot be beaten.
+                done = (found_gaps <= reach - radii[pending] - self.max_radius) | (reach >= farthest[pending])
+                gaps[pending[done]] = found_gaps[done]
+                indices[pending[done]] = found[done]
+                pending = pending[~done]
+                reach = 2 * reach[~done]
+            return gaps, indices
+
+        xs = [float(x) for x in xs]
+        ys = [float(y) for y in ys]
+        radii = [float(r) for r in radii] if hasattr(radii, '__len__') else [float(radii)] * len(xs)
+        reaches = reach if hasattr(reach, '__len__') else [self.cell_size if reach is None else reach] * len(xs)
+        x0, y0, x1, y1 = self.bounds
+        gaps = []
+        indices = []
+        for query, (x, y, radius, reach) in enumerate(zip(xs, ys, radii, reaches)):
+            farthest = math.hypot(max(abs(x - x0), abs(x - x1)), max(abs(y - y0), abs(y - y1)))
+            reach = max(float(reach), self.cell_size / 2)
+            while True:
+                gap, index = self._search_python(x, y, radius, reach, query if exclude_self else -1)
+                if gap <= reach - radius - self.max_radius or reach >= farthest:
+                    break
+                reach *= 2
+            gaps.append(gap)
+            indices.append(index)
+        return gaps, indices
+
+    def _search_numpy(self, queries, xs, ys, radii, reach, exclude_self: bool):
+        # Smallest gap of every query in `queries` to the circles whose centres are within its reach.
+        x0, y0, _, _ = self.bounds
+        rings = min(int(math.ceil(float(reach.max()) / self.cell_size)), max(self.rows, self.columns))
+        step = max(_MAX_CELLS // (2 * rings + 1) ** 2, 1)
+        if len(queries) > step:
+            parts = [self._search_numpy(queries[i:i + step], xs, ys, radii, reach[i:i + step], exclude_self)
+                     for i in range(0, len(queries), step)]
+            return np.concatenate([gaps for gaps, _ in parts]), np.concatenate([found for _, found in parts])
+
+        # Windows of cells around the query cells, moved into the grid for queries outside of it.
+        offsets = np.arange(-rings, rings + 1)
+        qx, qy, qr = xs[queries], ys[queries], radii[queries]
+        rows = np.clip(np.floor((qx - x0) / self.cell_size), -1, self.rows).astype(np.int64)
+        columns = np.clip(np.floor((qy - y0) / self.cell_size), -1, self.columns).astype(np.int64)
+        rows = rows[:, None, None] + offsets[None, :, None]
+        columns = columns[:, None, None] + offsets[None, None, :]
+        rows, columns = np.broadcast_arrays(rows, columns)
+        # Only cells in the grid that reach into the search disc of their query.
+        near_x = np.clip(qx[:, None, None], x0 + rows * self.cell_size, x0 + (rows + 1) * self.cell_size)
+        near_y = np.clip(qy[:, None, None], y0 + columns * self.cell_size, y0 + (columns + 1) * self.cell_size)
+        inside = ((rows >= 0) & (rows < self.rows) & (columns >= 0) & (columns < self.columns)
+                  & (np.hypot(near_x - qx[:, None, None], near_y - qy[:, None, None]) <= reach[:, None, None]))
+        keys = (rows * self.columns + columns).ravel()
+        starts = np.searchsorted(self._keys, keys, 'left')
+        counts = np.where(inside.ravel(), np.searchsorted(self._keys, keys, 'right') - starts, 0)
+
+        # One row per (query, candidate) pair, expanded from the cell ranges.
+        pair_query = np.repeat(np.repeat(np.arange(len(queries)), offsets.size ** 2), counts)
+        firsts = np.cumsum(counts) - counts
+        positions = np.arange(counts.sum()) - np.repeat(firsts - starts, counts)
+        candidates = self._order[positions]
+        distances = np.hypot(qx[pair_query] - self.xs[candidates], qy[pair_query] - self.ys[candidates])
+        keep = distances <= reach[pair_query]
+        if exclude_self:
+            keep &= candidates != queries[pair_query]
+        pair_query, candidates = pair_query[keep], candidates[keep]
+        pair_gaps = distances[keep] - qr[pair_query] - self.radii[candidates]
+
+        gaps = np.full(len(queries), np.inf)
+        found = np.full(len(queries), -1, dtype=np.int64)
+        if len(pair_gaps):
+            order = np.lexsort((pair_gaps, pair_query))
+            first = np.ones(len(order), dtype=bool)
+            first[1:] = pair_query[order][1:] != pair_query[order][:-1]
+            best = order[first]
+            gaps[pair_query[best]] = pair_gaps[best]
+            found[pair_query[best]] = candidates[best]
+        return gaps, found
+
+    def _search_python(self, x: float, y: float, radius: float, reach: float, skip: int):
+        x0, y0, _, _ = self.bounds
+        rings = min(int(math.ceil(reach / self.cell_size)), max(self.rows, self.columns))
+        row = min(max(math.floor((x - x0) / self.cell_size), -1), self.rows)
+        column = min(max(math.floor((y - y0) / self.cell_size), -1), self.columns)
+        best_gap, best = math.inf, -1
+        for r in range(row - rings, row + rings + 1):
+            near_x = min(max(x, x0 + r * self.cell_size), x0 + (r + 1) * self.cell_size)
+            for c in range(column - rings, column + rings + 1):
+                near_y = min(max(y, y0 + c * self.cell_size), y0 + (c + 1) * self.cell_size)
+                if math.hypot(near_x - x, near_y - y) > reach:
+                    continue
+                for index in self._cells_map.get((r, c), ()):
+                    distance = math.hypot(x - self.xs[index], y - self.ys[index])
+                    if index != skip and distance <= reach:
+                        gap = distance - radius - self.radii[index]
+                        if gap < best_gap:
+                            best_gap, best = gap, index
+        return best_gap, best
+
+
+class DriveLayout(NamedTuple):
+    """Positions of the roller pins and output holes of a drive and a uniform sample of its disc
+    profile. Lengths are in Fusion internal units (cm).
+
+    The output holes are centred on a circle of radius hole_circle around the bore.
+    """
+    pin_count: int
+    cycloid_radius: float
+    pin_radius: float
+    eccentricity: float
+    clearance: float
+    hole_count: int
+    hole_circle: float
+    hole_radius: float
+    pin_xs: object
+    pin_ys: object
+    hole_xs: object
+    hole_ys: object
+    profile_xs: object
+    profile_ys: object
+
+    # The same as for the built drive, from the fields both have.
+    bore_center = DriveGeometry.bore_center
+    bore_radius = DriveGeometry.bore_radius
+    output_pin_radius = DriveGeometry.output_pin_radius
+    throughhole_radius = DriveGeometry.throughhole_radius
+
+    @property
+    def offset(self) -> float:
+        """Distance of the disc outline from the profile."""
+        return self.pin_radius + self.clearance
+
+
+def compute_layout(pin_count: int, cycloid_radius: float, pin_radius: float, eccentricity: float, *,
+                   clearance: float = DEFAULT_PIN_CLEARANCE, hole_count: int = None, hole_circle: float = None,
+                   hole_radius: float = None, samples_per_lobe: int = SAMPLES_PER_LOBE,
+                   use_numpy: bool = None) -> DriveLayout:
+    """Computes the pin and hole positions and the profile sample of a drive.
+
+    Arguments:
+    pin_count -- Number of roller pins.
+    cycloid_radius -- Radius of the cycloidal disc.
+    pin_radius -- Radius of the roller pins and the eccentric shaft.
+    eccentricity -- Eccentricity of the input shaft.
+    clearance -- Radial clearance added to the pin radius for the disc outline.
+    hole_count -- Number of output holes, defaults to output_hole_count.
+    hole_circle -- Radius of the hole centres around the bore, defaults to the generator layout.
+    hole_radius -- Radius of the output holes, defaults to the pin radius.
+    samples_per_lobe -- Uniform profile samples per lobe. The outline walls are accurate to about
+                        the chord deviation of this sample.
+    use_numpy -- Force (True) or disable (False) the NumPy code path.
+    """
+    use_numpy = _use_numpy(use_numpy)
+    if hole_count is None:
+        hole_count = output_hole_count(pin_count)
+    if hole_circle is None:
+        hole_circle = output_hole_circle(cycloid_radius, eccentricity)
+    if hole_radius is None:
+        hole_radius = pin_radius
+    pin_xs, pin_ys = _circle_points(pin_count, cycloid_radius - eccentricity, 0.0, 0.0, use_numpy)
+    hole_xs, hole_ys = _circle_points(hole_count, hole_circle, eccentricity, 0.0, use_numpy)
+    angles = sample_angles(max(samples_per_lobe * (pin_count - 1), 64), use_numpy=use_numpy)
+    profile_xs, profile_ys = cycloid_points(pin_count, cycloid_radius, eccentricity, angles, use_numpy=use_numpy)
+    return DriveLayout(pin_count, cycloid_radius, pin_radius, eccentricity, clearance, hole_count,
+                       hole_circle, hole_radius, pin_xs, pin_ys, hole_xs, hole_ys, profile_xs, profile_ys)
+
+
+def _outline_index(layout: DriveLayout, use_numpy: bool) -> CircleIndex:
+    # Circles of the offset radius centred on the profile sample, their envelope is the outline.
+    # Queries reach far from the thin band of samples, so its cells are coarser than the default.
+    return CircleIndex(layout.profile_xs, layout.profile_ys, layout.offset, layout.cycloid_radius / 8,
+                       use_numpy=use_numpy)
+
+
+def _outline_reach(layout: DriveLayout, xs, ys, use_numpy: bool):
+    # Distance from the points to the profile point at their polar angle. It bounds the nearest
+    # distance from above and is close enough that the first search round usually finds it.
+    spacing = 2 * math.pi * layout.cycloid_radius / len(layout.profile_xs)
+    if use_numpy:
+        angles = np.arctan2(ys, xs)
+    else:
+        angles = [math.atan2(y, x) for x, y in zip(xs, ys)]
+    px, py = cycloid_points(layout.pin_count, layout.cycloid_radius, layout.eccentricity, angles, use_numpy=use_numpy)
+    if use_numpy:
+        return np.hypot(px - xs, py - ys) + spacing
+    return [math.hypot(x1 - x, y1 - y) + spacing for x, y, x1, y1 in zip(xs, ys, px, py)]
+
+
+def _circle_gaps(xs, ys, radius: float, cx: float, cy: float, other: float, use_numpy: bool):
+    # Gaps of equal circles to one other circle, too few to be worth an index.
+    if use_numpy:
+        return np.hypot(np.asarray(xs) - cx, np.asarray(ys) - cy) - radius - other
+    return [math.hypot(x - cx, y - cy) - radius - other for x, y in zip(xs, ys)]
+
+
+def layout_clearances(layout: DriveLayout, *, use_numpy: bool = None) -> dict:
+    """Measures the thinnest walls of a layout.
+
+    :returns:
+        A dict with the smallest gap in cm of each check: pin_spacing, throughhole (pins to the
+        roller plate throughhole), hole_spacing (only with more than one hole), hole_bore,
+        hole_outline and bore_outline. Negative values are overlaps.
+    """
+    use_numpy = _use_numpy(use_numpy)
+    bore_x, bore_y = layout.bore_center
+    pins = CircleIndex(layout.pin_xs, layout.pin_ys, layout.pin_radius, use_numpy=use_numpy)
+    outline = _outline_index(layout, use_numpy)
+    clearances = {
+        'pin_spacing': min(pins.nearest(layout.pin_xs, layout.pin_ys, layout.pin_radius, exclude_self=True)[0]),
+        'throughhole': min(_circle_gaps(layout.pin_xs, layout.pin_ys, layout.pin_radius, 0.0, 0.0,
+                                        layout.throughhole_radius, use_numpy)),
+    }
+    if layout.hole_count > 1:
+        holes = CircleIndex(layout.hole_xs, layout.hole_ys, layout.hole_radius, use_numpy=use_numpy)
+        clearances['hole_spacing'] = min(holes.nearest(layout.hole_xs, layout.hole_ys, layout.hole_radius,
+                                                       exclude_self=True)[0])
+    clearances['hole_bore'] = min(_circle_gaps(layout.hole_xs, layout.hole_ys, layout.hole_radius, bore_x, bore_y,
+                                               layout.bore_radius, use_numpy))
+    gaps = outline.nearest(layout.hole_xs, layout.hole_ys, layout.hole_radius,
+                           reach=_outline_reach(layout, layout.hole_xs, layout.hole_ys, use_numpy))[0]
+    clearances['hole_outline'] = min(gaps)
+    bore_xs, bore_ys = [bore_x], [bore_y]
+    if use_numpy:
+        bore_xs, bore_ys = np.array(bore_xs), np.array(bore_ys)
+    clearances['bore_outline'] = outline.nearest(bore_xs, bore_ys, layout.bore_radius,
+                                                 reach=_outline_reach(layout, bore_xs, bore_ys, use_numpy))[0][0]
+    return {name: float(value) for name, value in clearances.items()}
+
+
+def check_layout(layout: DriveLayout, *, min_wall: float = MIN_WALL_THICKNESS, use_numpy: bool = None) -> tuple:
+    """Checks the walls of a layout, see layout_clearances, and the size of the output pins.
+
+    :returns:
+        A tuple of DesignIssue as from check_design, empty if the layout is valid.
+    """
+    issues = []
+    if layout.output_pin_radius <= 0:
+        issues.append(DesignIssue(
+            'output_pin',
+            f'Output holes of radius {layout.hole_radius * 10:.3g} mm leave no material for the output pins '
+            f'with eccentricity {layout.eccentricity * 10:.3g} mm.',
+            layout.hole_radius, layout.eccentricity))
+    for name, value in layout_clearances(layout, use_numpy=use_numpy).items():
+        if value < min_wall - _WALL_ROUNDING:
+            issues.append(DesignIssue(name, WALL_MESSAGES[name].format(value=value * 10, limit=min_wall * 10),
+                                      value, min_wall))
+    return tuple(issues)
+
+
+def _best_hole_circle(layout: DriveLayout, outline: CircleIndex, hole_count: int, min_wall: float,
+                      tolerance: float, use_numpy: bool) -> tuple:
+    # Returns (hole_circle, hole_radius) of the largest holes of a count, see optimize_holes.
+    cycloid_radius, eccentricity = layout.cycloid_radius, layout.eccentricity
+    spread = math.sin(math.pi / hole_count) if hole_count > 1 else math.inf
+
+    def hole_limits(rho: float):
+        # Largest hole radius allowed by the neighbours and the bore, and by the outline.
+        xs, ys = _circle_points(hole_count, rho, eccentricity, 0.0, use_numpy)
+        gaps = outline.nearest(xs, ys, 0.0, reach=_outline_reach(layout, xs, ys, use_numpy))[0]
+        return min(rho * spread - min_wall / 2, rho - layout.bore_radius - min_wall), float(min(gaps)) - min_wall
+
+    # The best circle lies between low, where the holes touch the bore, and high, where their
+    # centres reach the outline. The first guess takes the outline as the circle through the lobe
+    # roots, whose distance shrinks exactly as fast as rho grows.
+    low = layout.bore_radius + min_wall
+    high = max(cycloid_radius - layout.offset, low)
+    roots = cycloid_radius - abs(cycloid_radius / layout.pin_count - eccentricity) - layout.offset - eccentricity
+    rho = min(max((roots - min_wall / 2) / (1.0 + min(spread, 1.0)), low), high)
+    best_rho, best_radius = low, -math.inf
+    for _ in range(_MAX_STEPS):
+        inner, outer = hole_limits(rho)
+        if min(inner, outer) > best_radius:
+            best_rho, best_radius = rho, min(inner, outer)
+        if inner < outer:
+            low = rho
+        else:
+            high = rho
+        growth = spread if rho * spread - min_wall / 2 < rho - layout.bore_radius - min_wall else 1.0
+        step = (outer - inner) / (1.0 + growth)
+        if abs(step) <= tolerance or high - low <= tolerance:
+            break
+        rho += step
+        if not low < rho < high:
+            rho = (low + high) / 2
+    return best_rho, best_radius
+
+
+def optimize_holes(pin_count: int, cycloid_radius: float, pin_radius: float, eccentricity: float, *,
+                   clearance: float = DEFAULT_PIN_CLEARANCE, hole_count: int = None,
+                   min_wall: float = MIN_WALL_THICKNESS, tolerance: float = DEFAULT_TOLERANCE,
+                   samples_per_lobe: int = SAMPLES_PER_LOBE, use_numpy: bool = None) -> DriveLayout:
+    """Chooses the number of output holes and places them for the strongest output pins that keep
+    min_wall to each other, the bore and the disc outline.
+
+    For a hole circle of radius rho the neighbouring holes and the bore allow holes up to
+    rho * sin(pi / hole_count) - min_wall / 2 and rho - bore radius - min_wall. Both grow with rho
+    while the room to the outline shrinks about as fast as rho grows, so the best circle is where
+    they meet. It is found by Newton steps kept inside a bisection bracket, every step being one
+    batched query of all hole centres against the outline index.
+
+    Fewer holes can be larger, so the pin count alone is not maximized. The output pins share the
+    load, and the load a pin carries against its hole grows with its radius, so the hole count
+    with the largest hole_count * output_pin_radius is chosen. Every count has an upper bound of
+    this where the neighbour limit meets the circle around the lobe tips of the outline, and counts
+    are tried from the highest bound down until no remaining one can beat the best found.
+
+    Arguments:
+    pin_count, cycloid_radius, pin_radius, eccentricity, clearance -- The drive, see compute_layout.
+    hole_count -- Number of output holes. If None every count from 3 to the reduction ratio is
+                  considered.
+    min_wall -- Thinnest allowed wall around the holes.
+    tolerance -- The hole circle is found to within this distance.
+    samples_per_lobe -- Uniform profile samples per lobe.
+    use_numpy -- Force (True) or disable (False) the NumPy code path.
+
+    :returns:
+        The DriveLayout with the best hole_count, hole_circle and hole_radius. Its output_pin_radius
+        is not positive if no output pins fit, see check_layout.
+    """
+    use_numpy = _use_numpy(use_numpy)
+    layout = compute_layout(pin_count, cycloid_radius, pin_radius, eccentricity, clearance=clearance,
+                            hole_count=hole_count, samples_per_lobe=samples_per_lobe, use_numpy=use_numpy)
+    outline = _outline_index(layout, use_numpy)
+    if hole_count is not None:
+        counts = [hole_count]
+    else:
+        counts = range(min(_MIN_HOLE_COUNT, layout.hole_count), max(pin_count - 1, layout.hole_count) + 1)
+
+    # Upper bound of the load per count. Holes on a circle of radius rho are at most
+    # rho * spread - min_wall / 2, the circle is at most high, and no hole reaches past the
+    # circle through the lobe tips of the outline.
+    if use_numpy:
+        tips = float(np.hypot(layout.profile_xs, layout.profile_ys).max())
+    else:
+        tips = max(math.hypot(x, y) for x, y in zip(layout.profile_xs, layout.profile_ys))
+    room = tips - layout.offset + eccentricity - min_wall
+    high = max(cycloid_radius - layout.offset, layout.bore_radius + min_wall)
+
+    def bound(count: int) -> float:
+        spread = math.sin(math.pi / count) if count > 1 else 1.0
+        radius = min(high * spread, (room - min_wall / 2) * spread / (1.0 + spread) + min_wall / 2)
+        return count * (radius - min_wall / 2 - eccentricity)
+
+    best = None
+    for count in sorted(counts, key=bound, reverse=True):
+        if best is not None and bound(count) <= best[0]:
+            break
+        hole_circle, hole_radius = _best_hole_circle(layout, outline, count, min_wall, tolerance, use_numpy)
+        # Without positive output pins the largest holes are best, they are the nearest to fitting.
+        load = count * (hole_radius - eccentricity) if hole_radius > eccentricity else -math.inf
+        if best is None or (load, hole_radius) > (best[0], best[3]):
+            best = load, count, hole_circle, hole_radius
+    _, hole_count, hole_circle, hole_radius = best
+    hole_xs, hole_ys = _circle_points(hole_count, hole_circle, eccentricity, 0.0, use_numpy)
+    return layout._replace(hole_count=hole_count, hole_circle=hole_circle, hole_radius=hole_radius,
+                           hole_xs=hole_xs, hole_ys=hole_ys)
@@ -0,0 +1,580 @@
+# Triangle meshes of a drive for 3D printing, made straight from the 2D geometry without Fusion.
+# Every part is a 2D region extruded along z, as in build.drive_plan: the disc (outline with the
+# eccentric bore and the output holes), the roller plate (annulus around the throughhole), the
+# roller pins and the output pins, each pin an instance of one cylinder. Runs without Fusion, from
+# the add-in folder:
+#
+#   python -m lib.cycloidGeometry.mesh grid.json -f stl -o meshes
+#
+# The regions are triangulated by stitching pairs of loops that are star shaped about a common
+# centre, so the work is linear in the number of points. The disc is split into rings around the
+# bore centre: bore to an inner circle, a cell around every output hole with plain sectors between
+# them, and an outer circle to the outline. Coordinates are written in millimetres by default.
+
+import argparse
+import math
+import os
+import struct
+import sys
+import zipfile
+from typing import NamedTuple
+
+from .profile import np, _use_numpy
+from .sampling import DEFAULT_TOLERANCE
+from .drive import DEFAULT_PIN_CLEARANCE, DriveGeometry, compute_drive
+from .discs import disc_placements, stack_length
+
+__all__ = [
+    'MESH_FORMATS',
+    'Mesh',
+    'MeshPart',
+    'disc_mesh',
+    'plate_mesh',
+    'pin_mesh',
+    'output_pin_mesh',
+    'drive_meshes',
+    'write_stl',
+    'write_3mf',
+    'export_meshes',
+    'mesh_designs',
+]
+
+MESH_FORMATS = ('stl', '3mf')
+
+# Fewest segments of a circle, however coarse the tolerance.
+_MIN_CIRCLE_SEGMENTS = 12
+
+# Triangles and vertices transformed and written per chunk.
+_CHUNK_SIZE = 65536
+
+# Buffer size of the mesh files, large buffers keep the number of write calls low.
+_BUFFER_SIZE = 1 << 20
+
+_MODEL_NAMESPACE = 'http://schemas.microsoft.com/3dmanufacturing/core/2015/02'
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="model" ContentType="application/vnd.ms-package.3dmanufacturing-3dmodel+xml"/>'
+    '</Types>\n'
+)
+
+_RELATIONSHIPS = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Target="/3D/3dmodel.model" Id="rel0" '
+    'Type="http://schemas.microsoft.com/3dmanufacturing/2013/01/3dmodel"/>'
+    '</Relationships>\n'
+)
+
+
+class Mesh(NamedTuple):
+    """A closed triangle mesh. Lengths are in Fusion internal units (cm).
+
+    vertices are (x, y, z) rows and faces (a, b, c) vertex index rows, counter clockwise seen from
+    outside. Both are NumPy arrays when NumPy is used, otherwise lists of tuples.
+    """
+    vertices: object
+    faces: object
+
+    @property
+    def vertex_count(self) -> int:
+        return len(self.vertices)
+
+    @property
+    def triangle_count(self) -> int:
+        return len(self.faces)
+
+
+class MeshPart(NamedTuple):
+    """A named mesh placed once per transform.
+
+    Every transform is (angle, x, y, z): a rotation in radians about the z axis followed by a shift.
+    """
+    name: str
+    mesh: Mesh
+    transforms: list
+
+    @property
+    def triangle_count(self) -> int:
+        return self.mesh.triangle_count * len(self.transforms)
+
+
+class _Region:
+    # A triangulated 2D region: its points, counter clockwise triangles and the boundary loops,
+    # each running with the region on its left.
+
+    def __init__(self):
+        self.xs = []
+        self.ys = []
+        self.triangles = []
+        self.loops = []
+
+    def add_points(self, xs, ys) -> list:
+        start = len(self.xs)
+        self.xs.extend(float(x) for x in xs)
+        self.ys.extend(float(y) for y in ys)
+        return list(range(start, len(self.xs)))
+
+    def add_circle(self, cx: float, cy: float, radius: float, tolerance: float, start: float = 0.0) -> list:
+        count = _circle_segments(radius, tolerance)
+        angles = [start + 2 * math.pi * i / count for i in range(count)]
+        return self.add_points([cx + radius * math.cos(a) for a in angles],
+                               [cy + radius * math.sin(a) for a in angles])
+
+    def angles(self, chain: list, cx: float, cy: float, closed: bool) -> list:
+        # Unwrapped angles of the chain about (cx, cy), which must increase along the chain.
+        angles = [math.atan2(self.ys[chain[0]] - cy, self.xs[chain[0]] - cx)]
+        for index in chain[1:] + (chain[:1] if closed else []):
+            step = math.atan2(self.ys[index] - cy, self.xs[index] - cx) - angles[-1]
+            step -= 2 * math.pi * math.floor((step + math.pi) / (2 * math.pi))
+            if step <= 0.0:
+                raise ValueError(f'The mesh loop around ({cx:.4f}, {cy:.4f}) is not star shaped about it')
+            angles.append(angles[-1] + step)
+        if closed and not math.isclose(angles[-1] - angles[0], 2 * math.pi, abs_tol=1e-6):
+            raise ValueError(f'The mesh loop does not run once around ({cx:.4f}, {cy:.4f})')
+        return angles
+
+    def stitch(self, inner: list, outer: list, cx: float, cy: float, closed: bool = True):
+        """Triangulates the band between two counter clockwise chains, both star shaped about
+        (cx, cy). Closed chains are loops, open chains must start and end at the same angles."""
+        inner_angles = self.angles(inner, cx, cy, closed)
+        outer_angles = self.angles(outer, cx, cy, closed)
+        if closed:
+            # Start the outer loop next to the start of the inner one, the seam is the first edge.
+            start = inner_angles[0]
+            k = min(range(len(outer)), key=lambda i: abs(math.remainder(outer_angles[i] - start, 2 * math.pi)))
+            shift = start + math.remainder(outer_angles[k] - start, 2 * math.pi) - outer_angles[k]
+            outer_angles = [a + shift for a in outer_angles[k:-1]] + [a + shift + 2 * math.pi
+                                                                      for a in outer_angles[:k + 1]]
+            outer = outer[k:] + outer[:k + 1]
+            inner = inner + inner[:1]
+
+        # Advance the chain whose next point comes first by angle, unless that triangle would be
+        # inverted, as when a long outer edge hides part of the inner chain from its first point.
+        i = j = 0
+        last_i, last_j = len(inner) - 1, len(outer) - 1
+        triangles = self.triangles
+        while i < last_i or j < last_j:
+            advance_inner = j == last_j or (i < last_i and inner_angles[i + 1] <= outer_angles[j + 1])
+            if i < last_i and j < last_j:
+                if advance_inner and self.turn(inner[i], outer[j], inner[i + 1]) <= 0.0:
+                    advance_inner = False
+                elif not advance_inner and self.turn(inner[i], outer[j], outer[j + 1]) <= 0.0:
+                    advance_inner = True
+            if advance_inner:
+                triangles.append((inner[i], outer[j], inner[i + 1]))
+                i += 1
+            else:
+                triangles.append((inner[i], outer[j], outer[j + 1]))
+                j += 1
+
+    def turn(self, a: int, b: int, c: int) -> float:
+        # Twice the signed area of the triangle, positive if counter clockwise.
+        xs, ys = self.xs, self.ys
+        return (xs[b] - xs[a]) * (ys[c] - ys[a]) - (ys[b] - ys[a]) * (xs[c] - xs[a])
+
+    def fan(self, loop: list):
+        # Triangulates a convex counter clockwise loop.
+        self.triangles.extend((loop[0], loop[i], loop[i + 1]) for i in range(1, len(loop) - 1))
+
+
+def _circle_segments(radius: float, tolerance: float) -> int:
+    # Fewest segments whose chords stay within the tolerance of the circle.
+    if tolerance >= radius:
+        return _MIN_CIRCLE_SEGMENTS
+    return max(math.ceil(math.pi / math.acos(1.0 - tolerance / radius)), _MIN_CIRCLE_SEGMENTS)
+
+
+def _outline_loop(region: _Region, xs, ys) -> list:
+    # Adds the outline counter clockwise and without repeated points.
+    points = []
+    for x, y in zip(xs, ys):
+        x, y = float(x), float(y)
+        if not points or math.hypot(x - points[-1][0], y - points[-1][1]) > 1e-12:
+            points.append((x, y))
+    if math.hypot(points[0][0] - points[-1][0], points[0][1] - points[-1][1]) <= 1e-12:
+        points.pop()
+    area = sum(points[i - 1][0] * points[i][1] - points[i][0] * points[i - 1][1] for i in range(len(points)))
+    if area < 0:
+        points.reverse()
+    return region.add_points([p[0] for p in points], [p[1] for p in points])
+
+
+def _disc_region(drive: DriveGeometry, tolerance: float) -> _Region:
+    region = _Region()
+    cx, cy = drive.bore_center
+    outline = _outline_loop(region, drive.outline.xs, drive.outline.ys)
+    bore = region.add_circle(cx, cy, drive.bore_radius, tolerance)
+
+    hole_angles = [math.atan2(y - cy, x - cx) for x, y in zip(drive.hole_xs, drive.hole_ys)]
+    hole_count = len(hole_angles)
+    ring = math.hypot(drive.hole_xs[0] - cx, drive.hole_ys[0] - cy)
+    hole_radius = drive.hole_radius
+    outline_radius = min(math.hypot(region.xs[i] - cx, region.ys[i] - cy) for i in outline)
+    if ring - hole_radius <= drive.bore_radius or ring + hole_radius >= outline_radius:
+        raise ValueError('The output holes overlap the bore or the disc outline, the disc cannot be meshed')
+
+    # Circles r1 and r2 run between the bore and the holes and between the holes and the outline.
+    # Every hole gets a cell from r1 to r2 that spans +-half_cell about it, which must hold the hole
+    # and see all of its r1 arc from the hole centre.
+    r1 = (drive.bore_radius + ring - hole_radius) / 2
+    r2 = (ring + hole_radius + outline_radius) / 2
+    lowest = math.asin(hole_radius / ring)
+    highest = min(math.acos(r1 / ring), math.pi / hole_count)
+    if lowest >= highest:
+        raise ValueError('The output holes are too close to each other, the disc cannot be meshed')
+    half_cell = (lowest + highest) / 2
+    gap = 2 * math.pi / hole_count - 2 * half_cell
+
+    step = 2 * math.pi / _circle_segments(r2, tolerance)
+    cell_steps = max(math.ceil(2 * half_cell / step), 2)
+    gap_steps = max(math.ceil(gap / step), 1)
+    angles = []
+    for angle in hole_angles:
+        start = angle - half_cell
+        angles.extend(start + 2 * half_cell * i / cell_steps for i in range(cell_steps))
+        angles.extend(start + 2 * half_cell + gap * i / gap_steps for i in range(gap_steps))
+    inner = region.add_points([cx + r1 * math.cos(a) for a in angles], [cy + r1 * math.sin(a) for a in angles])
+    outer = region.add_points([cx + r2 * math.cos(a) for a in angles], [cy + r2 * math.sin(a) for a in angles])
+
+    region.stitch(bore, inner, cx, cy)
+    region.stitch(outer, outline, cx, cy)
+    per_hole = cell_steps + gap_steps
+    count = len(angles)
+    holes = []
+    for k, (hx, hy) in enumerate(zip(drive.hole_xs, drive.hole_ys)):
+        first = k * per_hole
+        cell_outer = [outer[(first + i) % count] for i in range(cell_steps + 1)]
+        cell_inner = [inner[(first + i) % count] for i in range(cell_steps + 1)]
+        hole = region.add_circle(float(hx), float(hy), hole_radius, tolerance, hole_angles[k])
+        region.stitch(hole, cell_outer + cell_inner[::-1], float(hx), float(hy))
+        gap_inner = [inner[(first + cell_steps + i) % count] for i in range(gap_steps + 1)]
+        gap_outer = [outer[(first + cell_steps + i) % count] for i in range(gap_steps + 1)]
+        region.stitch(gap_inner, gap_outer, cx, cy, closed=False)
+        holes.append(hole)
+
+    region.loops = [outline, bore[::-1]] + [hole[::-1] for hole in holes]
+    return region
+
+
+def _extrude(region: _Region, bottom: float, top: float, use_numpy: bool) -> Mesh:
+    # Closed solid of the region between z = bottom and z = top. The bottom copy of the points
+    # comes first, the top copy second.
+    count = len(region.xs)
+    if use_numpy:
+        vertices = np.empty((2 * count, 3))
+        vertices[:count, 0] = vertices[count:, 0] = region.xs
+        vertices[:count, 1] = vertices[count:, 1] = region.ys
+        vertices[:count, 2] = bottom
+        vertices[count:, 2] = top
+        triangles = np.asarray(region.triangles, dtype=np.int32)
+        faces = [triangles[:, ::-1], triangles + count]
+        for loop in region.loops:
+            a = np.asarray(loop, dtype=np.int32)
+            b = np.roll(a, -1)
+            faces.append(np.column_stack([a, b, b + count]))
+            faces.append(np.column_stack([a, b + count, a + count]))
+        return Mesh(vertices, np.concatenate(faces))
+
+    vertices = [(x, y, bottom) for x, y in zip(region.xs, region.ys)]
+    vertices += [(x, y, top) for x, y in zip(region.xs, region.ys)]
+    faces = [(c, b, a) for a, b, c in region.triangles]
+    faces += [(a + count, b + count, c + count) for a, b, c in region.triangles]
+    for loop in region.loops:
+        for a, b in zip(loop, loop[1:] + loop[:1]):
+            faces.append((a, b, b + count))
+            faces.append((a, b + count, a + count))
+    return Mesh(vertices, faces)
+
+
+def disc_mesh(drive: DriveGeometry, thickness: float, tolerance: float = DEFAULT_TOLERANCE, *,
+              use_numpy: bool = None) -> Mesh:
+    """Returns the mesh of the disc: the outline with the eccentric bore and the output holes,
+    extruded from z = 0 to thickness. Circles are split into chords within the tolerance.
+
+    Raises a ValueError if the holes are too close to each other, the bore or the outline, or if
+    the outline is not star shaped about the bore centre.
+    """
+    return _extrude(_disc_region(drive, tolerance), 0.0, thickness, _use_numpy(use_numpy))
+
+
+def plate_mesh(drive: DriveGeometry, thickness: float, tolerance: float = DEFAULT_TOLERANCE, *,
+               use_numpy: bool = None) -> Mesh:
+    """Returns the mesh of the roller plate around the throughhole, from z = -thickness to 0."""
+    region = _Region()
+    outer = region.add_circle(0.0, 0.0, drive.plate_radius, tolerance)
+    inner = region.add_circle(0.0, 0.0, drive.throughhole_radius, tolerance)
+    region.stitch(inner, outer, 0.0, 0.0)
+    region.loops = [outer, inner[::-1]]
+    return _extrude(region, -thickness, 0.0, _use_numpy(use_numpy))
+
+
+def _cylinder(radius: float, length: float, tolerance: float, use_numpy: bool) -> Mesh:
+    region = _Region()
+    loop = region.add_circle(0.0, 0.0, radius, tolerance)
+    region.fan(loop)
+    region.loops = [loop]
+    return _extrude(region, 0.0, length, _use_numpy(use_numpy))
+
+
+def pin_mesh(drive: DriveGeometry, length: float, tolerance: float = DEFAULT_TOLERANCE, *,
+             use_numpy: bool = None) -> Mesh:
+    """Returns the mesh of one roller pin centred on the z axis, from z = 0 to length."""
+    return _cylinder(drive.pin_radius, length, tolerance, use_numpy)
+
+
+def output_pin_mesh(drive: DriveGeometry, length: float, tolerance: float = DEFAULT_TOLERANCE, *,
+                    use_numpy: bool = None) -> Mesh:
+    """Returns the mesh of one output pin centred on the z axis, from z = 0 to length.
+
+    Raises a ValueError if the output holes are not wider than the eccentric motion.
+    """
+    if not drive.output_pin_radius > 0:
+        raise ValueError('The output holes are too small for output pins')
+    return _cylinder(drive.output_pin_radius, length, tolerance, use_numpy)
+
+
+def drive_meshes(drive: DriveGeometry, disk_extent_length: float, roller_extent_length: float, *,
+                 disc_count: int = 1, disc_set_count: int = 1, tolerance: float = DEFAULT_TOLERANCE,
+                 use_numpy: bool = None) -> list:
+    """Returns the MeshParts of a printable drive, laid out as build.drive_plan builds it.
+
+    Arguments:
+    drive -- The computed drive geometry.
+    disk_extent_length -- Thickness of the discs and the roller plate.
+    roller_extent_length -- Length of the roller pins, extended to span every disc.
+    disc_count -- Number of discs per set, see cycloidGeometry.disc_placements.
+    disc_set_count -- Number of disc sets stacked on the same eccentric.
+    tolerance -- Chord tolerance of the circles.
+    use_numpy -- Force (True) or disable (False) the NumPy code path.
+
+    :returns:
+        A list with the 'disc', 'roller plate', 'roller pins' and 'output pins' MeshParts. Every
+        disc is an instance of the one disc mesh, every pin an instance of its pin mesh. The
+        output pins are left out while the output holes are not wider than the eccentric motion,
+        as in build.drive_plan.
+    """
+    pin_length = max(roller_extent_length, stack_length(disc_count, disc_set_count, disk_extent_length))
+    placements = disc_placements(disc_count, disc_set_count, disk_extent_length)
+    parts = [
+        MeshPart('disc', disc_mesh(drive, disk_extent_length, tolerance, use_numpy=use_numpy),
+                 [(p.angle, 0.0, 0.0, p.axial_offset) for p in placements]),
+        MeshPart('roller plate', plate_mesh(drive, disk_extent_length, tolerance, use_numpy=use_numpy),
+                 [(0.0, 0.0, 0.0, 0.0)]),
+        MeshPart('roller pins', pin_mesh(drive, pin_length, tolerance, use_numpy=use_numpy),
+                 [(0.0, float(x), float(y), 0.0) for x, y in zip(drive.pin_xs, drive.pin_ys)]),
+    ]
+    # The output pins sit on the output hole circle around the drive axis, the holes of the
+    # first disc are shifted by the eccentric.
+    if drive.output_pin_radius > 0:
+        bore_x, bore_y = drive.bore_center
+        parts.append(MeshPart('output pins', output_pin_mesh(drive, pin_length, tolerance, use_numpy=use_numpy),
+                              [(0.0, float(x) - bore_x, float(y) - bore_y, 0.0)
+                               for x, y in zip(drive.hole_xs, drive.hole_ys)]))
+    return parts
+
+
+def _placed_vertices(vertices, transform: tuple, scale: float, use_numpy: bool):
+    angle, x, y, z = transform
+    cos_a, sin_a = math.cos(angle), math.sin(angle)
+    if use_numpy:
+        placed = np.empty_like(vertices)
+        placed[:, 0] = (vertices[:, 0] * cos_a - vertices[:, 1] * sin_a + x) * scale
+        placed[:, 1] = (vertices[:, 0] * sin_a + vertices[:, 1] * cos_a + y) * scale
+        placed[:, 2] = (vertices[:, 2] + z) * scale
+        return placed
+    return [((vx * cos_a - vy * sin_a + x) * scale, (vx * sin_a + vy * cos_a + y) * scale, (vz + z) * scale)
+            for vx, vy, vz in vertices]
+
+
+def write_stl(file, parts: list, *, scale: float = 10.0, use_numpy: bool = None) -> int:
+    """Writes the parts as one binary STL to an open binary file.
+
+    Every instance is written as its own triangles, one instance at a time, so memory use only
+    depends on the size of the largest mesh.
+
+    Arguments:
+    file -- Binary file object to write to.
+    parts -- The MeshParts, see drive_meshes.
+    scale -- Factor applied to all coordinates, the default converts cm to mm.
+    use_numpy -- Force (True) or disable (False) the NumPy code path.
+
+    :returns:
+        The number of triangles written.
+    """
+    use_numpy = _use_numpy(use_numpy)
+    total = sum(part.triangle_count for part in parts)
+    file.write(b'cycloid drive'.ljust(80, b' '))
+    file.write(struct.pack('<I', total))
+    if use_numpy:
+        record = np.dtype([('normal', '<f4', 3), ('vertices', '<f4', (3, 3)), ('attribute', '<u2')])
+
+    for part in parts:
+        mesh = part.mesh
+        faces = np.asarray(mesh.faces) if use_numpy else mesh.faces
+        vertices = np.asarray(mesh.vertices, dtype=float) if use_numpy else mesh.vertices
+        for transform in part.transforms:
+            placed = _placed_vertices(vertices, transform, scale, use_numpy)
+            if use_numpy:
+                for start in range(0, len(faces), _CHUNK_SIZE):
+                    corners = placed[faces[start:start + _CHUNK_SIZE]]
+                    normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+                    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+                    chunk = np.zeros(len(corners), dtype=record)
+                    chunk['normal'] = np.divide(normals, lengths, out=np.zeros_like(normals), where=lengths > 0)
+                    chunk['vertices'] = corners
+                    file.write(chunk.tobytes())
+                continue
+            pack = struct.Struct('<12fH').pack
+            for a, b, c in faces:
+                (ax, ay, az), (bx, by, bz), (cx, cy, cz) = placed[a], placed[b], placed[c]
+                nx = (by - ay) * (cz - az) - (bz - az) * (cy - ay)
+                ny = (bz - az) * (cx - ax) - (bx - ax) * (cz - az)
+                nz = (bx - ax) * (cy - ay) - (by - ay) * (cx - ax)
+                length = math.sqrt(nx * nx + ny * ny + nz * nz) or 1.0
+                file.write(pack(nx / length, ny / length, nz / length, ax, ay, az, bx, by, bz, cx, cy, cz, 0))
+    return total
+
+
+def _rows(rows, use_numpy: bool):
+    # Rows as Python tuples, converted chunk by chunk.
+    for start in range(0, len(rows), _CHUNK_SIZE):
+        chunk = rows[start:start + _CHUNK_SIZE]
+        yield chunk.tolist() if use_numpy else chunk
+
+
+def write_3mf(file, parts: list, *, scale: float = 10.0, use_numpy: bool = None) -> int:
+    """Writes the parts as a 3MF package to an open binary file.
+
+    Every part is stored once as an object and placed by one build item per transform, so
+    repeated discs and pins do not add triangles to the file. Arguments as for write_stl.
+
+    :returns:
+        The number of triangles of the placed parts.
+    """
+    use_numpy = _use_numpy(use_numpy)
+    with zipfile.ZipFile(file, 'w', zipfile.ZIP_DEFLATED) as package:
+        package.writestr('[Content_Types].xml', _CONTENT_TYPES)
+        package.writestr('_rels/.rels', _RELATIONSHIPS)
+        with package.open('3D/3dmodel.model', 'w') as model:
+            model.write((f'<?xml version="1.0" encoding="UTF-8"?>\n<model unit="millimeter" xml:lang="en-US" '
+                         f'xmlns="{_MODEL_NAMESPACE}">\n<resources>\n').encode())
+            for index, part in enumerate(parts, 1):
+                vertices = part.mesh.vertices
+                if use_numpy:
+                    vertices = np.asarray(vertices, dtype=float) * scale
+                else:
+                    vertices = [(x * scale, y * scale, z * scale) for x, y, z in vertices]
+                model.write(f'<object id="{index}" name="{part.name}" type="model">\n<mesh>\n<vertices>\n'.encode())
+                for chunk in _rows(vertices, use_numpy):
+                    model.write(''.join(f'<vertex x="{x:.5f}" y="{y:.5f}" z="{z:.5f}"/>\n'
+                                        for x, y, z in chunk).encode())
+                model.write(b'</vertices>\n<triangles>\n')
+                for chunk in _rows(part.mesh.faces, use_numpy):
+                    model.write(''.join(f'<triangle v1="{a}" v2="{b}" v3="{c}"/>\n' for a, b, c in chunk).encode())
+                model.write(b'</triangles>\n</mesh>\n</object>\n')
+            model.write(b'</resources>\n<build>\n')
+            for index, part in enumerate(parts, 1):
+                for angle, x, y, z in part.transforms:
+                    # 3MF transforms row vectors, the rows are the images of the x, y and z axes.
+                    c, s = math.cos(angle), math.sin(angle)
+                    model.write(f'<item objectid="{index}" transform="{c:.9f} {s:.9f} 0 {-s:.9f} {c:.9f} 0 0 0 1 '
+                                f'{x * scale:.5f} {y * scale:.5f} {z * scale:.5f}"/>\n'.encode())
+            model.write(b'</build>\n</model>\n')
+    return sum(part.triangle_count for part in parts)
+
+
+_WRITERS = {
+    'stl': write_stl,
+    '3mf': write_3mf,
+}
+
+
+def export_meshes(path: str, drive: DriveGeometry, disk_extent_length: float, roller_extent_length: float,
+                  fmt: str = None, *, scale: float = 10.0, use_numpy: bool = None, **options) -> int:
+    """Writes the meshes of one drive to a file.
+
+    Arguments:
+    path -- File to write.
+    drive -- The computed drive geometry.
+    disk_extent_length, roller_extent_length -- Thickness of the discs and length of the pins.
+    fmt -- One of MESH_FORMATS, defaults to the extension of path.
+    scale -- Factor applied to all coordinates, the default converts cm to mm.
+    use_numpy -- Force (True) or disable (False) the NumPy code path.
+    options -- Extra keyword arguments passed on to drive_meshes.
+
+    :returns:
+        The number of triangles written.
+    """
+    fmt = fmt or os.path.splitext(path)[1][1:].lower()
+    if fmt not in _WRITERS:
+        raise ValueError(f'Unknown mesh format {fmt!r}, expected one of {MESH_FORMATS}')
+    parts = drive_meshes(drive, disk_extent_length, roller_extent_length, use_numpy=use_numpy, **options)
+    with open(path, 'wb', buffering=_BUFFER_SIZE) as file:
+        return _WRITERS[fmt](file, parts, scale=scale, use_numpy=use_numpy)
+
+
+def mesh_designs(designs, folder: str, fmt: str = 'stl', *, name: str = 'drive_{index:05d}_{pin_count}p',
+                 pin_length: float = None, tolerance: float = DEFAULT_TOLERANCE,
+                 clearance: float = DEFAULT_PIN_CLEARANCE, **options):
+    """Writes the meshes of every design to its own file in `folder`.
+
+    Arguments:
+    designs -- Iterable of design dicts, for example from sweep.read_grid. The design thickness is
+               used for the discs and the roller plate.
+    folder -- Output folder, created if needed.
+    fmt -- One of MESH_FORMATS.
+    name -- File name template without extension, formatted with index and the design values.
+    pin_length -- Length of the roller pins, defaults to twice the design thickness.
+    tolerance -- Chord tolerance of the disc outline and the circles.
+    clearance -- Radial clearance added to the pin radius for the disc outline.
+    options -- Extra keyword arguments passed on to export_meshes.
+
+    :returns:
+        A list of (path, error) tuples, error is None for designs that were written.
+    """
+    os.makedirs(folder, exist_ok=True)
+    written = []
+    for index, design in enumerate(designs):
+        path = os.path.join(folder, name.format(index=index, **design) + '.' + fmt)
+        thickness = design.get('thickness', 0.5)
+        try:
+            drive = compute_drive(design['pin_count'], design['cycloid_radius'], design['pin_radius'],
+                                  design['eccentricity'], tolerance, clearance=clearance)
+            export_meshes(path, drive, thickness, pin_length or 2 * thickness, fmt, tolerance=tolerance, **options)
+            written.append((path, None))
+        except ValueError as error:
+            if os.path.exists(path):
+                os.remove(path)
+            written.append((path, str(error)))
+    return written
+
+
+def main(argv=None):
+    from .sweep import read_grid
+
+    parser = argparse.ArgumentParser(description='Export printable cycloid drive meshes as STL or 3MF.')
+    parser.add_argument('grid', help='CSV or JSON grid file or design record folder, see sweep.py')
+    parser.add_argument('-o', '--output', default='.', help='output folder')
+    parser.add_argument('-f', '--format', choices=MESH_FORMATS, default='stl')
+    parser.add_argument('--pin-length', type=float, default=None, help='roller pin length, default 2 x thickness')
+    parser.add_argument('--discs', type=int, default=1, help='discs per set')
+    parser.add_argument('--disc-sets', type=int, default=1, help='disc sets stacked on the same eccentric')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE, help='chord tolerance in cm')
+    parser.add_argument('--clearance', type=float, default=DEFAULT_PIN_CLEARANCE)
+    parser.add_argument('--scale', type=float, default=10.0, help='coordinate scale, default cm to mm')
+    args = parser.parse_args(argv)
+
+    results = mesh_designs(read_grid(args.grid), args.output, args.format, pin_length=args.pin_length,
+                           tolerance=args.tolerance, clearance=args.clearance, scale=args.scale,
+                           disc_count=args.discs, disc_set_count=args.disc_sets)
+    for path, error in results:
+        if error:
+            print(f'{path}: {error}', file=sys.stderr)
+    print(f'{sum(error is None for _, error in results)} of {len(results)} designs meshed', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+# Analytic design metrics of a drive, cheap enough to evaluate for large parameter sweeps.
+# Everything is computed from one uniform sample of the profile derivatives. The profile is
+# periodic, so the trapezoidal integrals below converge very quickly with the sample count.
+
+import math
+
+from .profile import np, _use_numpy, cycloid_points, cycloid_derivatives, sample_angles
+from .drive import DEFAULT_PIN_CLEARANCE, output_hole_count
+
+__all__ = [
+    'DEFAULT_DENSITY',
+    'SAMPLES_PER_LOBE',
+    'profile_curvature',
+    'design_metrics',
+]
+
+# Density used for the mass estimate in g/cm^3, PLA.
+DEFAULT_DENSITY = 1.24
+
+# Uniform samples per lobe used for the metrics.
+SAMPLES_PER_LOBE = 64
+
+
+def profile_curvature(pin_count: int, cycloid_radius: float, eccentricity: float, angles, *,
+                      use_numpy: bool = None):
+    """Returns the signed curvature of the disc profile at the given angles.
+
+    Positive values are convex (bulging outwards), negative values concave.
+    """
+    dx, dy, ddx, ddy = cycloid_derivatives(pin_count, cycloid_radius, eccentricity, angles, use_numpy=use_numpy)
+    if _use_numpy(use_numpy):
+        speed = np.hypot(dx, dy)
+        return np.divide(dx * ddy - dy * ddx, speed ** 3, out=np.full_like(speed, np.inf), where=speed > 0)
+    curvature = []
+    for tx, ty, ax, ay in zip(dx, dy, ddx, ddy):
+        speed = math.hypot(tx, ty)
+        curvature.append((tx * ay - ty * ax) / speed ** 3 if speed > 0 else math.inf)
+    return curvature
+
+
+def design_metrics(pin_count: int, cycloid_radius: float, pin_radius: float, eccentricity: float,
+                   thickness: float = 0.5, *, clearance: float = DEFAULT_PIN_CLEARANCE,
+                   density: float = DEFAULT_DENSITY, samples_per_lobe: int = SAMPLES_PER_LOBE,
+                   use_numpy: bool = None) -> dict:
+    """Computes the sizing metrics of one drive.
+
+    Arguments:
+    pin_count -- Number of roller pins.
+    cycloid_radius -- Radius of the cycloidal disc.
+    pin_radius -- Radius of the roller pins, output pins and eccentric shaft.
+    eccentricity -- Eccentricity of the input shaft.
+    thickness -- Disc thickness used for the mass estimate.
+    clearance -- Radial clearance added to the pin radius for the disc outline.
+    density -- Material density in g/cm^3 used for the mass estimate.
+    samples_per_lobe -- Uniform samples per lobe used for the integrals.
+    use_numpy -- Force (True) or disable (False) the NumPy code path.
+
+    :returns:
+        A dict with reduction_ratio, min_radius_of_curvature (of the disc outline), undercut,
+        disc_area (outline minus bore and output holes) and mass.
+    """
+    if not thickness > 0:
+        raise ValueError(f'Thickness must be greater than zero, got {thickness}.')
+    use_numpy = _use_numpy(use_numpy)
+    offset = pin_radius + clearance
+    samples = max(samples_per_lobe * (pin_count - 1), 64)
+    angles = sample_angles(samples, use_numpy=use_numpy)
+    xs, ys = cycloid_points(pin_count, cycloid_radius, eccentricity, angles, use_numpy=use_numpy)
+    dx, dy, ddx, ddy = cycloid_derivatives(pin_count, cycloid_radius, eccentricity, angles, use_numpy=use_numpy)
+    step = 2 * math.pi / samples
+
+    if use_numpy:
+        speed = np.hypot(dx, dy)
+        area = 0.5 * float(np.sum(xs * dy - ys * dx)) * step
+        perimeter = float(np.sum(speed)) * step
+        cross = dx * ddy - dy * ddx
+        # Radius of curvature of the outline is |1/k - offset|, written to avoid dividing by k.
+        with np.errstate(divide='ignore', invalid='ignore'):
+            outline_radius = np.abs(speed ** 3 - offset * cross) / np.abs(cross)
+        undercut = bool(np.any(offset * cross >= speed ** 3))
+        min_radius = float(np.min(outline_radius))
+    else:
+        area = 0.0
+        perimeter = 0.0
+        undercut = False
+        min_radius = math.inf
+        for x, y, tx, ty, ax, ay in zip(xs, ys, dx, dy, ddx, ddy):
+            speed = math.hypot(tx, ty)
+            area += x * ty - y * tx
+            perimeter += speed
+            cross = tx * ay - ty * ax
+            if offset * cross >= speed ** 3:
+                undercut = True
+            if cross != 0:
+                min_radius = min(min_radius, abs(speed ** 3 - offset * cross) / abs(cross))
+        area *= 0.5 * step
+        perimeter *= step
+
+    # Steiner formula for the inner parallel curve. It is exact as long as there is no undercut.
+    outline_area = area - offset * perimeter + math.pi * offset ** 2
+    holes = 1 + output_hole_count(pin_count)
+    disc_area = outline_area - holes * math.pi * pin_radius ** 2
+
+    return {
+        'reduction_ratio': pin_count - 1,
+        'min_radius_of_curvature': min_radius,
+        'undercut': undercut,
+        'disc_area': disc_area,
+        'mass': disc_area * thickness * density,
+    }
@@ -0,0 +1,203 @@
+# Closed form equidistant (pin offset) curve of the disc profile.
+# The disc outline is the profile moved inwards by the roller pin radius plus clearance.
+# Where the offset is larger than the local radius of curvature at a lobe tip the raw
+# equidistant curve forms a small loop, these loops are detected and trimmed so the
+# result is a single simple closed outline. As for the profile, one lobe is computed and
+# trimmed, and the outline is made of its rotated copies.
+
+import math
+from typing import NamedTuple
+
+from .profile import np, _use_numpy, cycloid_derivatives, replicate_lobes
+from .sampling import DEFAULT_TOLERANCE, adaptive_lobe, adaptive_profile, lobe_budget, lobe_count, _lobe_points
+
+__all__ = [
+    'EquidistantProfile',
+    'equidistant_profile',
+    'trim_loops',
+]
+
+
+class EquidistantProfile(NamedTuple):
+    """Result of equidistant_profile.
+
+    The points are lobe_count rotated copies of one lobe, each with the same number of points,
+    see lobe_points. An outline with lobe_count 1 has no known symmetry.
+    """
+    xs: object
+    ys: object
+    max_error: float
+    converged: bool
+    loops_trimmed: int
+    lobe_count: int = 1
+
+    @property
+    def point_count(self) -> int:
+        return len(self.xs)
+
+    def lobe_points(self, closed: bool = True):
+        """Returns (xs, ys) of the first lobe. If closed, the first point of the next lobe is
+        appended, so rotated copies of the lobe join up."""
+        return _lobe_points(self.xs, self.ys, self.lobe_count, closed)
+
+
+def equidistant_profile(pin_count: int, cycloid_radius: float, eccentricity: float, offset: float,
+                        tolerance: float = DEFAULT_TOLERANCE, *, use_numpy: bool = None,
+                        **sampling) -> EquidistantProfile:
+    """Computes the trimmed equidistant curve of the disc profile.
+
+    Arguments:
+    pin_count -- Number of roller pins.
+    cycloid_radius -- Radius of the cycloidal disc.
+    eccentricity -- Eccentricity of the input shaft.
+    offset -- Distance to move the profile towards the disc centre, usually pin radius plus clearance.
+    tolerance -- Maximum chord deviation of the sampled curve, see adaptive_profile.
+    use_numpy -- Force (True) or disable (False) the NumPy code path.
+    sampling -- Extra keyword arguments passed on to adaptive_profile.
+
+    :returns:
+        An EquidistantProfile with the closed outline and the number of loops that were removed.
+    """
+    use_numpy = _use_numpy(use_numpy)
+    lobes = lobe_count(pin_count) if sampling.pop('lobe_symmetry', True) else 1
+    if lobes > 1:
+        # Loops form either at the tips or at the roots, depending on the sign of the offset. The
+        # lobe is centred on them, so each loop lies inside it and the lobe is trimmed on its own.
+        min_samples, max_samples = lobe_budget(pin_count, sampling.pop('min_samples', None),
+                                               sampling.pop('max_samples', 20000))
+        tip, root = _curvatures(pin_count, cycloid_radius, eccentricity, [0.0, math.pi / lobes])
+        centre = 0.0 if offset * tip >= offset * root else math.pi / lobes
+        sampled = adaptive_lobe(pin_count, cycloid_radius, eccentricity, tolerance, offset=offset,
+                                min_samples=min_samples, max_samples=max_samples, centre=centre,
+                                use_numpy=use_numpy, **sampling)
+        lobe = _trimmed(pin_count, cycloid_radius, eccentricity, offset, use_numpy, sampled)
+        xs, ys = replicate_lobes(lobe.xs, lobe.ys, lobes, use_numpy=use_numpy)
+        return EquidistantProfile(xs, ys, lobe.max_error, lobe.converged, lobe.loops_trimmed * lobes, lobes)
+
+    sampled = adaptive_profile(pin_count, cycloid_radius, eccentricity, tolerance,
+                               offset=offset, lobe_symmetry=False, use_numpy=use_numpy, **sampling)
+    return _trimmed(pin_count, cycloid_radius, eccentricity, offset, use_numpy, sampled)
+
+
+def _curvatures(pin_count, cycloid_radius, eccentricity, angles, use_numpy=False):
+    # Signed curvature of the profile at the given parameter angles.
+    dx, dy, ddx, ddy = cycloid_derivatives(pin_count, cycloid_radius, eccentricity, angles, use_numpy=use_numpy)
+    if use_numpy:
+        speed = np.hypot(dx, dy)
+        return np.divide(dx * ddy - dy * ddx, speed ** 3, out=np.zeros_like(speed), where=speed > 0)
+    curvatures = []
+    for tx, ty, ax, ay in zip(dx, dy, ddx, ddy):
+        speed = math.hypot(tx, ty)
+        curvatures.append((tx * ay - ty * ax) / speed ** 3 if speed > 0 else 0.0)
+    return curvatures
+
+
+def _trimmed(pin_count, cycloid_radius, eccentricity, offset, use_numpy, sampled) -> EquidistantProfile:
+    # The offset curve runs backwards wherever offset * curvature > 1, those stretches are the loops.
+    curvature = _curvatures(pin_count, cycloid_radius, eccentricity, sampled.angles, use_numpy)
+    if use_numpy:
+        reversed_mask = (offset * curvature > 1.0).tolist()
+    else:
+        reversed_mask = [offset * c > 1.0 for c in curvature]
+
+    xs, ys, loops = trim_loops(sampled.xs, sampled.ys, reversed_mask, use_numpy=use_numpy)
+    return EquidistantProfile(xs, ys, sampled.max_error, sampled.converged, loops)
+
+
+def _segment_intersection(xs, ys, i, j):
+    # Intersection of segments i -> i+1 and j -> j+1 of a closed polyline, or None.
+    n = len(xs)
+    ax, ay = xs[i], ys[i]
+    bx, by = xs[(i + 1) % n], ys[(i + 1) % n]
+    cx, cy = xs[j], ys[j]
+    dx, dy = xs[(j + 1) % n], ys[(j + 1) % n]
+    rx, ry = bx - ax, by - ay
+    sx, sy = dx - cx, dy - cy
+    denominator = rx * sy - ry * sx
+    if denominator == 0.0:
+        return None
+    u = ((cx - ax) * sy - (cy - ay) * sx) / denominator
+    v = ((cx - ax) * ry - (cy - ay) * rx) / denominator
+    if 0.0 <= u <= 1.0 and 0.0 <= v <= 1.0:
+        return ax + u * rx, ay + u * ry
+    return None
+
+
+def _runs(mask):
+    # Start and end index of every run of True values in a closed (circular) mask.
+    n = len(mask)
+    start = next((i for i in range(n) if not mask[i]), None)
+    if start is None:
+        raise ValueError('The offset is larger than the radius of curvature everywhere on the profile')
+    runs = []
+    run_start = None
+    for k in range(1, n + 1):
+        i = (start + k) % n
+        if mask[i] and run_start is None:
+            run_start = i
+        elif not mask[i] and run_start is not None:
+            runs.append((run_start, (i - 1) % n))
+            run_start = None
+    return runs
+
+
+def trim_loops(xs, ys, reversed_mask, *, use_numpy: bool = None):
+    """Removes the local loops of a closed equidistant polyline.
+
+    Arguments:
+    xs, ys -- The closed polyline, the last point connects back to the first.
+    reversed_mask -- One flag per point, True where the curve runs backwards inside a loop.
+    use_numpy -- Return NumPy arrays (True) or lists (False).
+
+    :returns:
+        A tuple (xs, ys, loops_trimmed).
+    """
+    n = len(xs)
+    # Work on plain floats, the number of loops is small and each is searched locally.
+    px = [float(x) for x in xs]
+    py = [float(y) for y in ys]
+
+    removed = [False] * n
+    inserts = {}
+    for run_start, run_end in _runs(reversed_mask):
+        run_length = (run_end - run_start) % n + 1
+        window = 2
+        hit = None
+        while hit is None and window < n // 2:
+            window = min(window * 2, n // 2)
+            for back in range(1, window + 1):
+                i = (run_start - back) % n
+                for ahead in range(window):
+                    j = (run_end + ahead) % n
+                    if (j - i) % n < 2:
+                        # Neighbouring segments always touch at their shared point.
+                        continue
+                    point = _segment_intersection(px, py, i, j)
+                    if point is not None:
+                        hit = (i, j, point, back + ahead + run_length)
+                        break
+                if hit is not None:
+                    break
+        if hit is None:
+            continue
+
+        i, j, point, span = hit
+        # Drop every point strictly inside the loop and replace them by the crossing point.
+        for k in range(1, span):
+            removed[(i + k) % n] = True
+        inserts[i] = point
+
+    loops = len(inserts)
+    out_xs = []
+    out_ys = []
+    for k in range(n):
+        if not removed[k]:
+            out_xs.append(px[k])
+            out_ys.append(py[k])
+        if k in inserts:
+            out_xs.append(inserts[k][0])
+            out_ys.append(inserts[k][1])
+
+    if _use_numpy(use_numpy):
+        return np.asarray(out_xs), np.asarray(out_ys), loops
+    return out_xs, out_ys, loops
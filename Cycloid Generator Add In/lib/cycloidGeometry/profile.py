@@ -0,0 +1,204 @@
+# Cycloidal disc profile math.
+# This module has no dependency on the Fusion API so it can be imported, tested and
+# benchmarked on any machine. NumPy is used when it is available, otherwise every
+# function falls back to plain Python lists with identical results.
+
+import math
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+__all__ = [
+    'DEFAULT_SAMPLES',
+    'has_numpy',
+    'profile_terms',
+    'sample_angles',
+    'cycloid_points',
+    'cycloid_profile',
+    'cycloid_derivatives',
+    'equidistant_points',
+    'replicate_lobes',
+]
+
+# Number of points used for the full 360 deg profile when nothing else is requested.
+# This matches the original 5 deg step of the generator.
+DEFAULT_SAMPLES = 72
+
+
+def has_numpy() -> bool:
+    """Returns True if the vectorized NumPy code path is available."""
+    return np is not None
+
+
+def _use_numpy(use_numpy: bool = None) -> bool:
+    if use_numpy is None:
+        return np is not None
+    if use_numpy and np is None:
+        raise ImportError('NumPy was requested but is not installed')
+    return use_numpy
+
+
+def profile_terms(pin_count: int, cycloid_radius: float, eccentricity: float):
+    """Returns the (base_radius, lobe_radius) terms of the disc epitrochoid.
+
+    The profile is x = base * cos(t) + lobe * cos(N * t), y = base * sin(t) + lobe * sin(N * t)
+    where N is the pin count. Using some code and math from RoTechnic's design of a cycloidal
+    drive in Python and Fusion 360 https://github.com/roTechnic/CycloidalDesign
+
+    Arguments:
+    pin_count -- Number of roller pins. The reduction ratio is pin_count - 1.
+    cycloid_radius -- Radius of the cycloidal disc.
+    eccentricity -- Eccentricity of the input shaft.
+    """
+    if pin_count < 2:
+        raise ValueError(f'pin_count must be at least 2, got {pin_count}')
+    if cycloid_radius <= 0:
+        raise ValueError(f'cycloid_radius must be positive, got {cycloid_radius}')
+
+    rolling_circle_radius = cycloid_radius / pin_count
+    reduction_ratio = pin_count - 1
+    cycloid_base_radius = rolling_circle_radius * reduction_ratio
+    return cycloid_base_radius + rolling_circle_radius, rolling_circle_radius - eccentricity
+
+
+def sample_angles(samples: int, *, use_numpy: bool = None):
+    """Returns `samples` evenly spaced parameter angles in radians covering [0, 2*pi).
+
+    The end point is not repeated, the profile is closed by connecting the last point to the first.
+    """
+    if samples < 3:
+        raise ValueError(f'samples must be at least 3, got {samples}')
+    step = 2 * math.pi / samples
+    if _use_numpy(use_numpy):
+        return np.arange(samples, dtype=float) * step
+    return [i * step for i in range(samples)]
+
+
+def cycloid_points(pin_count: int, cycloid_radius: float, eccentricity: float, angles, *, use_numpy: bool = None):
+    """Evaluates the disc profile at the given parameter angles (radians).
+
+    Returns a tuple (xs, ys). These are NumPy arrays when NumPy is used, otherwise lists.
+    """
+    base, lobe = profile_terms(pin_count, cycloid_radius, eccentricity)
+    if _use_numpy(use_numpy):
+        t = np.asarray(angles, dtype=float)
+        nt = pin_count * t
+        xs = base * np.cos(t) + lobe * np.cos(nt)
+        ys = base * np.sin(t) + lobe * np.sin(nt)
+        return xs, ys
+
+    xs = []
+    ys = []
+    for t in angles:
+        nt = pin_count * t
+        xs.append(base * math.cos(t) + lobe * math.cos(nt))
+        ys.append(base * math.sin(t) + lobe * math.sin(nt))
+    return xs, ys
+
+
+def cycloid_profile(pin_count: int, cycloid_radius: float, eccentricity: float,
+                    samples: int = DEFAULT_SAMPLES, *, use_numpy: bool = None):
+    """Computes the whole closed disc profile in one batched call.
+
+    Arguments:
+    pin_count -- Number of roller pins.
+    cycloid_radius -- Radius of the cycloidal disc.
+    eccentricity -- Eccentricity of the input shaft.
+    samples -- Number of points around the full profile.
+    use_numpy -- Force (True) or disable (False) the NumPy code path. By default NumPy
+                 is used if it is installed.
+
+    :returns:
+        A tuple (xs, ys) of `samples` points, the last point connects back to the first.
+    """
+    angles = sample_angles(samples, use_numpy=use_numpy)
+    return cycloid_points(pin_count, cycloid_radius, eccentricity, angles, use_numpy=use_numpy)
+
+
+def cycloid_derivatives(pin_count: int, cycloid_radius: float, eccentricity: float, angles, *, use_numpy: bool = None):
+    """Evaluates the first and second derivatives of the disc profile with respect to the angle.
+
+    Returns a tuple (dx, dy, ddx, ddy). These are NumPy arrays when NumPy is used, otherwise lists.
+    """
+    base, lobe = profile_terms(pin_count, cycloid_radius, eccentricity)
+    n_lobe = pin_count * lobe
+    nn_lobe = pin_count * n_lobe
+    if _use_numpy(use_numpy):
+        t = np.asarray(angles, dtype=float)
+        nt = pin_count * t
+        cos_t, sin_t = np.cos(t), np.sin(t)
+        cos_nt, sin_nt = np.cos(nt), np.sin(nt)
+        dx = -base * sin_t - n_lobe * sin_nt
+        dy = base * cos_t + n_lobe * cos_nt
+        ddx = -base * cos_t - nn_lobe * cos_nt
+        ddy = -base * sin_t - nn_lobe * sin_nt
+        return dx, dy, ddx, ddy
+
+    dx, dy, ddx, ddy = [], [], [], []
+    for t in angles:
+        nt = pin_count * t
+        cos_t, sin_t = math.cos(t), math.sin(t)
+        cos_nt, sin_nt = math.cos(nt), math.sin(nt)
+        dx.append(-base * sin_t - n_lobe * sin_nt)
+        dy.append(base * cos_t + n_lobe * cos_nt)
+        ddx.append(-base * cos_t - nn_lobe * cos_nt)
+        ddy.append(-base * sin_t - nn_lobe * sin_nt)
+    return dx, dy, ddx, ddy
+
+
+def equidistant_points(pin_count: int, cycloid_radius: float, eccentricity: float, offset: float, angles,
+                       *, use_numpy: bool = None):
+    """Evaluates the equidistant (offset) curve of the disc profile at the given angles.
+
+    Every point is moved by `offset` along the parametric normal of the profile. The profile
+    runs counter clockwise so a positive offset moves towards the disc centre, which gives the
+    contracted cycloid that meshes with roller pins of radius `offset`. Loops are not removed
+    here, see offset.equidistant_profile.
+
+    Returns a tuple (xs, ys). These are NumPy arrays when NumPy is used, otherwise lists.
+    """
+    use_numpy = _use_numpy(use_numpy)
+    xs, ys = cycloid_points(pin_count, cycloid_radius, eccentricity, angles, use_numpy=use_numpy)
+    dx, dy, _, _ = cycloid_derivatives(pin_count, cycloid_radius, eccentricity, angles, use_numpy=use_numpy)
+    if use_numpy:
+        speed = np.hypot(dx, dy)
+        # The tangent only vanishes on degenerate profiles, keep the point where it does.
+        scale = np.divide(offset, speed, out=np.zeros_like(speed), where=speed > 0)
+        return xs - scale * dy, ys + scale * dx
+
+    out_xs = []
+    out_ys = []
+    for x, y, tx, ty in zip(xs, ys, dx, dy):
+        speed = math.hypot(tx, ty)
+        scale = offset / speed if speed > 0 else 0.0
+        out_xs.append(x - scale * ty)
+        out_ys.append(y + scale * tx)
+    return out_xs, out_ys
+
+
+def replicate_lobes(xs, ys, lobe_count: int, *, use_numpy: bool = None):
+    """Returns the points of a whole profile made of `lobe_count` copies of one lobe.
+
+    The disc profile with N pins has N - 1 identical lobes: moving the parameter by
+    2*pi / (N - 1) rotates a point by the same angle about the disc centre. Copy k of the lobe
+    is rotated by 2*pi * k / lobe_count, so the lobe must end where the next one starts.
+
+    Returns a tuple (xs, ys). These are NumPy arrays when NumPy is used, otherwise lists.
+    """
+    step = 2 * math.pi / lobe_count
+    if _use_numpy(use_numpy):
+        xs = np.asarray(xs, dtype=float)
+        ys = np.asarray(ys, dtype=float)
+        angles = np.arange(lobe_count, dtype=float) * step
+        cos_a, sin_a = np.cos(angles)[:, None], np.sin(angles)[:, None]
+        return (cos_a * xs - sin_a * ys).ravel(), (sin_a * xs + cos_a * ys).ravel()
+
+    out_xs = []
+    out_ys = []
+    for k in range(lobe_count):
+        cos_a, sin_a = math.cos(k * step), math.sin(k * step)
+        out_xs.extend(cos_a * x - sin_a * y for x, y in zip(xs, ys))
+        out_ys.extend(sin_a * x + cos_a * y for x, y in zip(xs, ys))
+    return out_xs, out_ys
@@ -0,0 +1,317 @@
+# Compact binary design records of generated drives.
+# A record holds the inputs of a drive, its sampling settings and all computed geometry arrays,
+# so a drive can be rebuilt or analysed later without computing it again. Runs without Fusion,
+# from the add-in folder:
+#
+#   python -m lib.cycloidGeometry.record grid.json -o records    # compute a record per design
+#   python -m lib.cycloidGeometry.record --list records          # summarize stored records
+#
+# Layout of a record file, all little endian:
+#
+#   magic b'CYCR', version uint16, flags uint16, header length uint32
+#   JSON header, padded with spaces so the arrays start at a multiple of 8 bytes
+#   float64 arrays, at the offsets from the start of the array section listed in the header
+#
+# Every array is aligned to 8 bytes, so with NumPy a record is memory-mapped and its arrays are
+# read-only views of the file, nothing is copied however large the profile is.
+
+import argparse
+import array
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from typing import NamedTuple
+
+from .profile import np, _use_numpy
+from .sampling import DEFAULT_TOLERANCE, AdaptiveProfile
+from .offset import EquidistantProfile
+from .drive import DEFAULT_PIN_CLEARANCE, DriveGeometry, compute_drive
+
+__all__ = [
+    'RECORD_VERSION',
+    'RECORD_SUFFIX',
+    'DesignRecord',
+    'record_name',
+    'record_bytes',
+    'write_record',
+    'read_record_header',
+    'read_record',
+    'read_records',
+    'record_design',
+    'write_designs',
+]
+
+RECORD_VERSION = 1
+RECORD_SUFFIX = '.cyr'
+
+_MAGIC = b'CYCR'
+_PREFIX = struct.Struct('<HHI')
+_PREFIX_SIZE = len(_MAGIC) + _PREFIX.size
+_ALIGNMENT = 8
+
+# Arrays stored in a record, in file order: (name in the header, parent of the field, field).
+_ARRAY_FIELDS = (
+    ('profile_xs', 'profile', 'xs'), ('profile_ys', 'profile', 'ys'), ('profile_angles', 'profile', 'angles'),
+    ('outline_xs', 'outline', 'xs'), ('outline_ys', 'outline', 'ys'),
+    ('pin_xs', None, 'pin_xs'), ('pin_ys', None, 'pin_ys'),
+    ('hole_xs', None, 'hole_xs'), ('hole_ys', None, 'hole_ys'),
+)
+
+
+class DesignRecord(NamedTuple):
+    """A drive read from a design record.
+
+    parameters are the design inputs stored with it, such as the extrude lengths and disc count
+    of the add-in. tolerance and sampling are the settings the geometry was computed with.
+    """
+    drive: DriveGeometry
+    parameters: dict
+    tolerance: float
+    sampling: dict
+
+
+def record_name(parameters: dict) -> str:
+    """Returns a file name for the record of a design, the same for the same parameters."""
+    digest = hashlib.blake2b(json.dumps(parameters, sort_keys=True).encode('utf-8'), digest_size=6).hexdigest()
+    return f"drive_{parameters.get('pin_count', 0)}p_{digest}{RECORD_SUFFIX}"
+
+
+def _array_bytes(values) -> bytes:
+    if np is not None and isinstance(values, np.ndarray):
+        return np.ascontiguousarray(values, dtype='<f8').tobytes()
+    column = array.array('d', (float(v) for v in values))
+    if sys.byteorder != 'little':
+        column.byteswap()
+    return column.tobytes()
+
+
+def record_bytes(drive: DriveGeometry, parameters: dict = None, *, tolerance: float = DEFAULT_TOLERANCE,
+                 sampling: dict = None) -> bytes:
+    """Returns the design record of a drive as bytes.
+
+    Arguments:
+    drive -- The computed drive geometry.
+    parameters -- Design inputs stored with the drive, JSON serializable. The drive parameters
+                  (pin_count, cycloid_radius, pin_radius, eccentricity) are always included.
+    tolerance -- Chord tolerance the drive was computed with.
+    sampling -- Extra sampling keyword arguments the drive was computed with.
+    """
+    columns = [_array_bytes(getattr(getattr(drive, parent) if parent else drive, field))
+               for _, parent, field in _ARRAY_FIELDS]
+    arrays = {}
+    offset = 0
+    for (name, _, _), column in zip(_ARRAY_FIELDS, columns):
+        arrays[name] = [offset, len(column) // 8]
+        offset += len(column)
+
+    design = {'pin_count': drive.pin_count, 'cycloid_radius': drive.cycloid_radius,
+              'pin_radius': drive.pin_radius, 'eccentricity': drive.eccentricity}
+    design.update(parameters or {})
+    header = {
+        'parameters': design,
+        'drive': [drive.pin_count, drive.cycloid_radius, drive.pin_radius, drive.eccentricity, drive.clearance],
+        'tolerance': tolerance,
+        'sampling': dict(sampling or {}),
+        'profile': [drive.profile.max_error, drive.profile.iterations, drive.profile.converged,
+                    drive.profile.lobe_count],
+        'outline': [drive.outline.max_error, drive.outline.converged, drive.outline.loops_trimmed,
+                    drive.outline.lobe_count],
+        'arrays': arrays,
+    }
+    header_bytes = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    header_bytes += b' ' * (-(_PREFIX_SIZE + len(header_bytes)) % _ALIGNMENT)
+    return b''.join([_MAGIC, _PREFIX.pack(RECORD_VERSION, 0, len(header_bytes)), header_bytes] + columns)
+
+
+def write_record(path: str, drive: DriveGeometry, parameters: dict = None, *,
+                 tolerance: float = DEFAULT_TOLERANCE, sampling: dict = None):
+    """Writes the design record of a drive to path, see record_bytes for the arguments.
+
+    The record is written to a temporary file first, so a crash never leaves a truncated one.
+    """
+    data = record_bytes(drive, parameters, tolerance=tolerance, sampling=sampling)
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as file:
+        file.write(data)
+    os.replace(temp_path, path)
+
+
+def _parse_prefix(data: bytes, path: str) -> int:
+    if len(data) < _PREFIX_SIZE or data[:len(_MAGIC)] != _MAGIC:
+        raise ValueError(f'{path} is not a design record')
+    version, _, header_length = _PREFIX.unpack_from(data, len(_MAGIC))
+    if version != RECORD_VERSION:
+        raise ValueError(f'{path} is a version {version} design record, only version {RECORD_VERSION} is supported')
+    return header_length
+
+
+def _close_mapping(data, columns: list):
+    # Closes the mapping of a file that failed to parse. The arrays already made from it are
+    # dropped first, as a mapping with arrays backed by it cannot be closed.
+    columns.clear()
+    if isinstance(data, mmap.mmap):
+        data.close()
+
+
+def read_record_header(path: str) -> dict:
+    """Returns the JSON header of a design record without reading its arrays.
+
+    Reading the headers is enough to list or filter large numbers of records.
+    Raises a ValueError if the file is not a record of a supported version.
+    """
+    with open(path, 'rb') as file:
+        header_length = _parse_prefix(file.read(_PREFIX_SIZE), path)
+        return json.loads(file.read(header_length).decode('utf-8'))
+
+
+def read_record(path: str, *, use_numpy: bool = None, memory_map: bool = True) -> DesignRecord:
+    """Reads a design record.
+
+    Arguments:
+    path -- Path of the record file.
+    use_numpy -- Return NumPy arrays (True) or lists (False).
+    memory_map -- With NumPy, map the file and return read-only arrays backed by it instead of
+                  reading it. The file stays open as long as any of the arrays is referenced.
+
+    :returns:
+        A DesignRecord. Raises a ValueError if the file is not a record of a supported version.
+    """
+    use_numpy = _use_numpy(use_numpy)
+    with open(path, 'rb') as file:
+        if use_numpy and memory_map and os.fstat(file.fileno()).st_size >= _PREFIX_SIZE:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            data = file.read()
+    columns = []
+    try:
+        header_length = _parse_prefix(data[:_PREFIX_SIZE], path)
+        header = json.loads(bytes(data[_PREFIX_SIZE:_PREFIX_SIZE + header_length]).decode('utf-8'))
+        pin_count, cycloid_radius, pin_radius, eccentricity, clearance = header['drive']
+
+        start = _PREFIX_SIZE + header_length
+        for name, _, _ in _ARRAY_FIELDS:
+            offset, length = header['arrays'][name]
+            offset += start
+            if offset + length * 8 > len(data):
+                raise ValueError(f'{path} is truncated')
+            if use_numpy:
+                columns.append(np.frombuffer(data, dtype='<f8', count=length, offset=offset))
+            else:
+                column = array.array('d')
+                column.frombytes(data[offset:offset + length * 8])
+                if sys.byteorder != 'little':
+                    column.byteswap()
+                columns.append(column.tolist())
+    except Exception as error:
+        _close_mapping(data, columns)
+        if isinstance(error, (KeyError, IndexError, TypeError)):
+            raise ValueError(f'{path} has a corrupt header') from error
+        raise
+
+    profile = AdaptiveProfile(columns[0], columns[1], columns[2], *header['profile'])
+    outline = EquidistantProfile(columns[3], columns[4], *header['outline'])
+    drive = DriveGeometry(pin_count, cycloid_radius, pin_radius, eccentricity, clearance,
+                          profile, outline, *columns[5:])
+    return DesignRecord(drive, header['parameters'], header['tolerance'], header['sampling'])
+
+
+def _record_paths(paths):
+    if isinstance(paths, str):
+        paths = [paths]
+    for path in paths:
+        if os.path.isdir(path):
+            yield from sorted(entry.path for entry in os.scandir(path)
+                              if entry.is_file() and entry.name.endswith(RECORD_SUFFIX))
+        else:
+            yield path
+
+
+def read_records(paths, *, headers_only: bool = False, **options):
+    """Yields (path, record) for every record file, sorted by name within folders.
+
+    Arguments:
+    paths -- A record file or folder, or an iterable of them.
+    headers_only -- Yield the header dicts of read_record_header instead of DesignRecords.
+    options -- Extra keyword arguments passed on to read_record, such as use_numpy.
+    """
+    for path in _record_paths(paths):
+        yield path, read_record_header(path) if headers_only else read_record(path, **options)
+
+
+def record_design(header: dict) -> dict:
+    """Returns the design dict of a record header, in the form used by sweep.py and export.py."""
+    design = dict(header['parameters'])
+    design.setdefault('thickness', design.get('disk_extent_length'))
+    return design
+
+
+def write_designs(designs, folder: str, *, tolerance: float = DEFAULT_TOLERANCE,
+                  clearance: float = DEFAULT_PIN_CLEARANCE, name: str = 'drive_{index:05d}_{pin_count}p',
+                  use_numpy: bool = None, **sampling):
+    """Computes every design and writes its record to `folder`.
+
+    Arguments:
+    designs -- Iterable of design dicts, for example from sweep.read_grid.
+    folder -- Output folder, created if needed.
+    tolerance -- Maximum chord deviation of the sampled curves.
+    clearance -- Radial clearance added to the pin radius for the disc outline.
+    name -- File name template without extension, formatted with index and the design values.
+    use_numpy -- Force (True) or disable (False) the NumPy code path.
+    sampling -- Extra keyword arguments passed on to compute_drive.
+
+    :returns:
+        A list of (path, error) tuples, error is None for designs that were written.
+    """
+    os.makedirs(folder, exist_ok=True)
+    written = []
+    for index, design in enumerate(designs):
+        path = os.path.join(folder, name.format(index=index, **design) + RECORD_SUFFIX)
+        try:
+            drive = compute_drive(design['pin_count'], design['cycloid_radius'], design['pin_radius'],
+                                  design['eccentricity'], tolerance, clearance=clearance,
+                                  use_numpy=use_numpy, **sampling)
+            write_record(path, drive, design, tolerance=tolerance, sampling=sampling)
+            written.append((path, None))
+        except (ValueError, ZeroDivisionError) as error:
+            written.append((path, str(error)))
+    return written
+
+
+def main(argv=None):
+    from .sweep import read_grid
+
+    parser = argparse.ArgumentParser(description='Compute and store, or list, cycloid drive design records.')
+    parser.add_argument('source', help='CSV or JSON grid file, see sweep.py, or with --list a record file or folder')
+    parser.add_argument('-o', '--output', default='.', help='output folder')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument('--clearance', type=float, default=DEFAULT_PIN_CLEARANCE)
+    parser.add_argument('--list', action='store_true', help='print one line per stored record')
+    args = parser.parse_args(argv)
+
+    if args.list:
+        count = 0
+        for path, header in read_records(args.source, headers_only=True):
+            design = header['parameters']
+            points = header['arrays']['outline_xs'][1]
+            print(f"{os.path.basename(path)}: {design['pin_count']} pins, radius {design['cycloid_radius']:g}, "
+                  f"pin radius {design['pin_radius']:g}, eccentricity {design['eccentricity']:g}, "
+                  f"{points} outline points at tolerance {header['tolerance']:g}")
+            count += 1
+        print(f'{count} records', file=sys.stderr)
+        return
+
+    results = write_designs(read_grid(args.source), args.output, tolerance=args.tolerance, clearance=args.clearance)
+    for path, error in results:
+        if error:
+            print(f'{path}: {error}', file=sys.stderr)
+    print(f'{sum(error is None for _, error in results)} of {len(results)} records written', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
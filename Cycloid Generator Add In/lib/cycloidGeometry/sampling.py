@@ -0,0 +1,258 @@
+# Adaptive, curvature aware sampling of the disc profile.
+# Intervals of the profile parameter are split until the chord between two neighbouring
+# points stays within a tolerance of the true curve. Flat stretches of a lobe end up with
+# few points while the sharp lobe tips get as many as they need.
+# All lobes of the profile are identical, so only one lobe is sampled and the others are
+# rotated copies of it, see profile.replicate_lobes.
+
+import math
+from typing import NamedTuple
+
+from .profile import np, _use_numpy, cycloid_points, equidistant_points, replicate_lobes
+
+__all__ = [
+    'DEFAULT_TOLERANCE',
+    'AdaptiveProfile',
+    'lobe_count',
+    'lobe_budget',
+    'adaptive_lobe',
+    'adaptive_profile',
+]
+
+# Default maximum chord deviation in Fusion internal units (cm), i.e. 0.01 mm.
+DEFAULT_TOLERANCE = 0.001
+
+# Relative positions inside an interval where the chord deviation is measured.
+_PROBES = (0.25, 0.5, 0.75)
+
+
+class AdaptiveProfile(NamedTuple):
+    """Result of adaptive_profile.
+
+    The points are lobe_count rotated copies of one lobe, each with the same number of points,
+    see lobe_points. A profile with lobe_count 1 has no known symmetry.
+    """
+    xs: object
+    ys: object
+    angles: object
+    max_error: float
+    iterations: int
+    converged: bool
+    lobe_count: int = 1
+
+    @property
+    def point_count(self) -> int:
+        return len(self.xs)
+
+    def lobe_points(self, closed: bool = True):
+        """Returns (xs, ys) of the first lobe. If closed, the first point of the next lobe is
+        appended, so rotated copies of the lobe join up."""
+        return _lobe_points(self.xs, self.ys, self.lobe_count, closed)
+
+
+def _lobe_points(xs, ys, count: int, closed: bool):
+    # Shared with offset.EquidistantProfile.
+    n = len(xs) // count
+    if not closed or count == 1:
+        return xs[:n], ys[:n]
+    end = n % len(xs)
+    return list(xs[:n]) + [xs[end]], list(ys[:n]) + [ys[end]]
+
+
+def lobe_count(pin_count: int) -> int:
+    """Number of identical lobes of the disc profile, the reduction ratio."""
+    return max(pin_count - 1, 1)
+
+
+def _chord_deviation(ax, ay, bx, by, px, py):
+    # Distance of point p from the chord a-b, falls back to |p - a| for degenerate chords.
+    dx = bx - ax
+    dy = by - ay
+    length = math.hypot(dx, dy)
+    if length == 0.0:
+        return math.hypot(px - ax, py - ay)
+    return abs(dx * (py - ay) - dy * (px - ax)) / length
+
+
+def _evaluate(pin_count, cycloid_radius, eccentricity, offset, angles, use_numpy):
+    if offset:
+        return equidistant_points(pin_count, cycloid_radius, eccentricity, offset, angles, use_numpy=use_numpy)
+    return cycloid_points(pin_count, cycloid_radius, eccentricity, angles, use_numpy=use_numpy)
+
+
+def adaptive_profile(pin_count: int, cycloid_radius: float, eccentricity: float,
+                     tolerance: float = DEFAULT_TOLERANCE, *, offset: float = 0.0,
+                     min_samples: int = None, max_samples: int = 20000,
+                     max_iterations: int = 32, lobe_symmetry: bool = True,
+                     use_numpy: bool = None) -> AdaptiveProfile:
+    """Samples the closed disc profile with the fewest points for a given chord tolerance.
+
+    With lobe_symmetry one lobe is sampled, see adaptive_lobe, and the profile is made of its
+    rotated copies. The sample budgets are then shared evenly by the lobes. The first lobe is
+    centred on the lobe tip at angle 0, so the profile starts at the root before it.
+
+    Arguments:
+    pin_count -- Number of roller pins.
+    cycloid_radius -- Radius of the cycloidal disc.
+    eccentricity -- Eccentricity of the input shaft.
+    tolerance -- Maximum allowed distance between a chord and the true curve.
+    offset -- Sample the equidistant curve at this distance instead of the profile itself.
+    min_samples -- Size of the initial uniform grid. Defaults to 8 points per lobe so no lobe is skipped,
+                   limited to max_samples.
+    max_samples -- Hard limit on the number of points, refinement stops when it would be exceeded.
+    max_iterations -- Maximum number of refinement passes.
+    lobe_symmetry -- Sample one lobe and rotate it (True) or sample the whole profile (False).
+    use_numpy -- Force (True) or disable (False) the NumPy code path.
+
+    :returns:
+        An AdaptiveProfile with the points, their parameter angles, the maximum chord error
+        reached and whether the tolerance was met.
+    """
+    if tolerance <= 0:
+        raise ValueError(f'tolerance must be positive, got {tolerance}')
+    min_samples, max_samples = _sample_budget(pin_count, min_samples, max_samples)
+
+    use_numpy = _use_numpy(use_numpy)
+    lobes = lobe_count(pin_count) if lobe_symmetry else 1
+    if lobes > 1:
+        lobe_min, lobe_max = lobe_budget(pin_count, min_samples, max_samples)
+        lobe = adaptive_lobe(pin_count, cycloid_radius, eccentricity, tolerance, offset=offset,
+                             min_samples=lobe_min, max_samples=lobe_max,
+                             max_iterations=max_iterations, use_numpy=use_numpy)
+        xs, ys = replicate_lobes(lobe.xs, lobe.ys, lobes, use_numpy=use_numpy)
+        step = 2 * math.pi / lobes
+        if use_numpy:
+            angles = (lobe.angles[None, :] + step * np.arange(lobes)[:, None]).ravel()
+        else:
+            angles = [t + k * step for k in range(lobes) for t in lobe.angles]
+        return AdaptiveProfile(xs, ys, angles, lobe.max_error, lobe.iterations, lobe.converged, lobes)
+
+    if use_numpy:
+        return _adaptive_numpy(pin_count, cycloid_radius, eccentricity, offset, tolerance,
+                               min_samples, max_samples, max_iterations, 0.0, 2 * math.pi)
+    return _adaptive_python(pin_count, cycloid_radius, eccentricity, offset, tolerance,
+                            min_samples, max_samples, max_iterations, 0.0, 2 * math.pi)
+
+
+def _sample_budget(pin_count: int, min_samples: int, max_samples: int) -> tuple:
+    # The default initial grid has 8 points per lobe, so no lobe is skipped.
+    if min_samples is None:
+        min_samples = min(max(8 * (pin_count - 1), 16), max_samples)
+    if min_samples > max_samples:
+        raise ValueError(f'min_samples ({min_samples}) is larger than max_samples ({max_samples})')
+    return min_samples, max_samples
+
+
+def lobe_budget(pin_count: int, min_samples: int = None, max_samples: int = 20000) -> tuple:
+    """Returns (min_samples, max_samples) of one lobe for the budgets of a whole profile."""
+    min_samples, max_samples = _sample_budget(pin_count, min_samples, max_samples)
+    lobes = lobe_count(pin_count)
+    return max(-(-min_samples // lobes), 2), max(max_samples // lobes, 2)
+
+
+def adaptive_lobe(pin_count: int, cycloid_radius: float, eccentricity: float,
+                  tolerance: float = DEFAULT_TOLERANCE, *, offset: float = 0.0,
+                  min_samples: int = 8, max_samples: int = 20000,
+                  max_iterations: int = 32, centre: float = 0.0,
+                  use_numpy: bool = None) -> AdaptiveProfile:
+    """Samples one lobe of the disc profile with the fewest points for a given chord tolerance.
+
+    The lobe runs from angle centre - pi / (N - 1) to centre + pi / (N - 1), which is not included.
+    With the default centre 0 that is from a root over the tip to the next root. The chord to the
+    end is checked, so rotated copies of the lobe join up within the tolerance. Takes the same
+    arguments as adaptive_profile, with the sample budgets for the one lobe, and
+
+    centre -- Parameter angle at the middle of the lobe, pi / (N - 1) centres it on a root.
+    """
+    if tolerance <= 0:
+        raise ValueError(f'tolerance must be positive, got {tolerance}')
+    if min_samples > max_samples:
+        raise ValueError(f'min_samples ({min_samples}) is larger than max_samples ({max_samples})')
+
+    half = math.pi / lobe_count(pin_count)
+    if _use_numpy(use_numpy):
+        return _adaptive_numpy(pin_count, cycloid_radius, eccentricity, offset, tolerance,
+                               min_samples, max_samples, max_iterations, centre - half, centre + half)
+    return _adaptive_python(pin_count, cycloid_radius, eccentricity, offset, tolerance,
+                            min_samples, max_samples, max_iterations, centre - half, centre + half)
+
+
+def _adaptive_numpy(pin_count, cycloid_radius, eccentricity, offset, tolerance,
+                    min_samples, max_samples, max_iterations, start, stop):
+    # Knots include the closing angle so every interval has both end points.
+    t = np.linspace(start, stop, min_samples + 1)
+    xs, ys = _evaluate(pin_count, cycloid_radius, eccentricity, offset, t, True)
+
+    iterations = 0
+    converged = False
+    while True:
+        a = t[:-1]
+        span = t[1:] - a
+        probes = a[None, :] + np.asarray(_PROBES)[:, None] * span[None, :]
+        px, py = _evaluate(pin_count, cycloid_radius, eccentricity, offset, probes, True)
+
+        dx = (xs[1:] - xs[:-1])[None, :]
+        dy = (ys[1:] - ys[:-1])[None, :]
+        length = np.hypot(dx, dy)
+        cross = np.abs(dx * (py - ys[None, :-1]) - dy * (px - xs[None, :-1]))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            deviation = np.where(length > 0, cross / length, np.hypot(px - xs[None, :-1], py - ys[None, :-1]))
+        deviation = deviation.max(axis=0)
+
+        bad = np.nonzero(deviation > tolerance)[0]
+        if bad.size == 0:
+            converged = True
+            break
+        if iterations >= max_iterations or len(t) - 1 + bad.size > max_samples:
+            break
+
+        # Split the failing intervals at their midpoint, which was already evaluated as a probe.
+        mid = _PROBES.index(0.5)
+        insert_at = bad + 1
+        t = np.insert(t, insert_at, probes[mid, bad])
+        xs = np.insert(xs, insert_at, px[mid, bad])
+        ys = np.insert(ys, insert_at, py[mid, bad])
+        iterations += 1
+
+    return AdaptiveProfile(xs[:-1], ys[:-1], t[:-1], float(deviation.max()), iterations, converged)
+
+
+def _adaptive_python(pin_count, cycloid_radius, eccentricity, offset, tolerance,
+                     min_samples, max_samples, max_iterations, start, stop):
+    step = (stop - start) / min_samples
+    t = [start + i * step for i in range(min_samples)] + [stop]
+    xs, ys = _evaluate(pin_count, cycloid_radius, eccentricity, offset, t, False)
+
+    iterations = 0
+    converged = False
+    while True:
+        new_t = [t[0]]
+        new_xs = [xs[0]]
+        new_ys = [ys[0]]
+        max_error = 0.0
+        splits = 0
+        for i in range(len(t) - 1):
+            a, b = t[i], t[i + 1]
+            probes = [a + f * (b - a) for f in _PROBES]
+            px, py = _evaluate(pin_count, cycloid_radius, eccentricity, offset, probes, False)
+            error = max(_chord_deviation(xs[i], ys[i], xs[i + 1], ys[i + 1], x, y) for x, y in zip(px, py))
+            max_error = max(max_error, error)
+            if error > tolerance:
+                splits += 1
+                mid = _PROBES.index(0.5)
+                new_t.append(probes[mid])
+                new_xs.append(px[mid])
+                new_ys.append(py[mid])
+            new_t.append(b)
+            new_xs.append(xs[i + 1])
+            new_ys.append(ys[i + 1])
+
+        if splits == 0:
+            converged = True
+            break
+        if iterations >= max_iterations or len(t) - 1 + splits > max_samples:
+            break
+        t, xs, ys = new_t, new_xs, new_ys
+        iterations += 1
+
+    return AdaptiveProfile(xs[:-1], ys[:-1], t[:-1], max_error, iterations, converged)
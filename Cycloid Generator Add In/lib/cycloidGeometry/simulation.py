@@ -0,0 +1,356 @@
+# Contact and kinematics simulation of a drive over one input revolution.
+# The disc orbits the drive axis on the eccentric and turns backwards at 1 / reduction ratio of
+# the input speed. At every crank angle the signed gap between each roller pin and the disc
+# outline is solved for all pins at once, and the backlash, the loaded output angle and the
+# contact force on every pin follow from the gaps. With NumPy all crank angles x pins are
+# solved as one array, otherwise a plain Python loop gives the same results.
+#
+#   python -m lib.cycloidGeometry.simulation 11 5 0.5 0.25 --torque 100 -o simulation.csv
+
+import argparse
+import bisect
+import csv
+import json
+import math
+import sys
+from typing import NamedTuple
+
+from .profile import np, _use_numpy, profile_terms
+from .drive import DEFAULT_PIN_CLEARANCE, pin_centers
+
+__all__ = [
+    'DEFAULT_STEPS',
+    'DEFAULT_TORQUE',
+    'DEFAULT_CONTACT_STIFFNESS',
+    'SimulationResult',
+    'simulate_drive',
+    'write_simulation_csv',
+]
+
+# Crank angle steps per input revolution.
+DEFAULT_STEPS = 3600
+
+# Output torque in N*cm and linearized contact stiffness of one pin in N/cm. Lengths are in cm.
+DEFAULT_TORQUE = 100.0
+DEFAULT_CONTACT_STIFFNESS = 1e5
+
+# Newton steps that refine the closest profile point to each pin after the initial guess.
+# A step never moves further than a quarter lobe, so a pin near a sharp lobe tip cannot jump
+# to a far away part of the profile.
+NEWTON_ITERATIONS = 4
+
+# Samples per lobe of the table that maps polar angles to profile parameters for the initial guess.
+GUESS_SAMPLES_PER_LOBE = 32
+
+_ARCMIN = 180 * 60 / math.pi
+
+
+class SimulationResult(NamedTuple):
+    """Time series of a simulated revolution. Angles are in radians, gaps in cm, forces in N.
+
+    crank_angles, output_angles, transmission_error and backlash have one value per step,
+    gaps and forces one row per step with one value per pin. These are NumPy arrays when NumPy
+    is used, otherwise lists.
+    output_angles -- Loaded disc (output) angle, the ideal angle plus the transmission error.
+    transmission_error -- Lag of the loaded output behind the ideal -crank / reduction ratio.
+    backlash -- Free rotation of the output between the contacts on either side.
+    gaps -- Clearance between each pin and the disc outline, negative where they interfere.
+    forces -- Contact force on each pin under the output torque.
+    """
+    crank_angles: object
+    output_angles: object
+    transmission_error: object
+    backlash: object
+    gaps: object
+    forces: object
+
+    @property
+    def steps(self) -> int:
+        return len(self.crank_angles)
+
+    def summary(self) -> dict:
+        """Returns the summary statistics of the run as a dict.
+
+        min_gap is negative if a pin interferes with the disc. Backlash and transmission error
+        are in arc minutes of the output, transmission_error_pp is its peak to peak value.
+        mean_contact_pins is the average number of pins carrying load.
+        """
+        if np is not None and isinstance(self.gaps, np.ndarray):
+            min_gap = float(self.gaps.min())
+            backlash = self.backlash[np.isfinite(self.backlash)]
+            error = self.transmission_error[np.isfinite(self.transmission_error)]
+            max_force = float(self.forces.max())
+            contacts = float(np.count_nonzero(self.forces > 0, axis=1).mean())
+            backlash = (float(backlash.min()), float(backlash.max()), float(backlash.mean())) if backlash.size else None
+            error = (float(error.min()), float(error.max())) if error.size else None
+        else:
+            min_gap = min(min(row) for row in self.gaps)
+            finite = [value for value in self.backlash if math.isfinite(value)]
+            backlash = (min(finite), max(finite), sum(finite) / len(finite)) if finite else None
+            finite = [value for value in self.transmission_error if math.isfinite(value)]
+            error = (min(finite), max(finite)) if finite else None
+            max_force = max(max(row) for row in self.forces)
+            contacts = sum(sum(force > 0 for force in row) for row in self.forces) / len(self.forces)
+        return {
+            'steps': self.steps,
+            'min_gap': min_gap,
+            'min_backlash_arcmin': backlash[0] * _ARCMIN if backlash else math.nan,
+            'max_backlash_arcmin': backlash[1] * _ARCMIN if backlash else math.nan,
+            'mean_backlash_arcmin': backlash[2] * _ARCMIN if backlash else math.nan,
+            'transmission_error_pp_arcmin': (error[1] - error[0]) * _ARCMIN if error else math.nan,
+            'max_pin_force': max_force,
+            'mean_contact_pins': contacts,
+        }
+
+
+def _guess_table(pin_count: int, base: float, lobe: float):
+    # Profile parameters and their polar angles, made monotone so they can be interpolated.
+    samples = GUESS_SAMPLES_PER_LOBE * (pin_count - 1)
+    ts = [2 * math.pi * i / samples for i in range(samples + 1)]
+    thetas = []
+    previous = None
+    for t in ts:
+        theta = math.atan2(base * math.sin(t) + lobe * math.sin(pin_count * t),
+                           base * math.cos(t) + lobe * math.cos(pin_count * t))
+        if previous is not None:
+            theta = previous + (theta - previous + math.pi) % (2 * math.pi) - math.pi
+            theta = max(theta, previous)
+        thetas.append(theta)
+        previous = theta
+    thetas[-1] = thetas[0] + 2 * math.pi
+    return ts, thetas
+
+
+def _simulate_numpy(pin_count, base, lobe, clearance, pin_xs, pin_ys, crank, eccentricity, torque, stiffness):
+    reduction_ratio = pin_count - 1
+    crank = np.asarray(crank, dtype=float)
+    # The disc turns backwards, half a lobe out of phase with the pins at crank angle 0.
+    psi = (math.pi - crank) / reduction_ratio
+    dx = np.asarray(pin_xs, dtype=float)[None, :] - (eccentricity * np.cos(crank))[:, None]
+    dy = np.asarray(pin_ys, dtype=float)[None, :] - (eccentricity * np.sin(crank))[:, None]
+    cos_psi = np.cos(psi)[:, None]
+    sin_psi = np.sin(psi)[:, None]
+    # Pin centers in the disc frame.
+    qx = cos_psi * dx + sin_psi * dy
+    qy = cos_psi * dy - sin_psi * dx
+
+    ts, thetas = _guess_table(pin_count, base, lobe)
+    theta = np.mod(np.arctan2(qy, qx) - thetas[0], 2 * math.pi) + thetas[0]
+    t = np.interp(theta, thetas, ts)
+
+    # Newton iterations on (p(t) - q) . p'(t) = 0 give the closest profile point.
+    n = pin_count
+    max_step = math.pi / (2 * (n - 1))
+    for iteration in range(NEWTON_ITERATIONS + 1):
+        cos_t, sin_t = np.cos(t), np.sin(t)
+        cos_nt, sin_nt = np.cos(n * t), np.sin(n * t)
+        ex = base * cos_t + lobe * cos_nt - qx
+        ey = base * sin_t + lobe * sin_nt - qy
+        tx = -base * sin_t - n * lobe * sin_nt
+        ty = base * cos_t + n * lobe * cos_nt
+        if iteration == NEWTON_ITERATIONS:
+            break
+        ax = -base * cos_t - n * n * lobe * cos_nt
+        ay = -base * sin_t - n * n * lobe * sin_nt
+        speed2 = tx * tx + ty * ty
+        # Fall back to a Gauss-Newton step where the curve bends away from the pin.
+        slope = np.maximum(speed2 + ex * ax + ey * ay, 0.1 * speed2)
+        t = t - np.clip((ex * tx + ey * ty) / slope, -max_step, max_step)
+
+    # Outward normal of the counter clockwise profile, and the change of each gap per radian
+    # of disc rotation. Pins with a negative lever close their gap when the disc turns forward.
+    speed = np.hypot(tx, ty)
+    nx = ty / speed
+    ny = -tx / speed
+    gaps = clearance - (ex * nx + ey * ny)
+    lever = nx * qy - ny * qx
+
+    closing = lever < 0
+    opening = lever > 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        onset = np.where(closing, gaps / -lever, np.inf)
+        release = np.where(opening, gaps / lever, np.inf)
+    backlash = onset.min(axis=1) + release.min(axis=1)
+
+    # The output torque turns the disc forward until the stiffness of the touching pins balances
+    # it. The torque is piecewise linear in the rotation, with a kink where each pin touches.
+    order = np.argsort(onset, axis=1)
+    sorted_onset = np.take_along_axis(onset, order, axis=1)
+    weights = np.take_along_axis(np.where(closing, lever * lever, 0.0), order, axis=1)
+    finite = np.isfinite(sorted_onset)
+    weight_sum = np.cumsum(weights, axis=1)
+    weighted_onset = np.cumsum(weights * np.where(finite, sorted_onset, 0.0), axis=1)
+    next_onset = np.concatenate([sorted_onset[:, 1:], np.full((len(crank), 1), np.inf)], axis=1)
+    with np.errstate(invalid='ignore'):
+        reached = stiffness * (next_onset * weight_sum - weighted_onset) >= torque
+    active = np.argmax(reached, axis=1)[:, None]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        delta = ((torque / stiffness + np.take_along_axis(weighted_onset, active, axis=1))
+                 / np.take_along_axis(weight_sum, active, axis=1))[:, 0]
+    forces = np.where(closing, stiffness * np.maximum(-(gaps + lever * delta[:, None]), 0.0), 0.0)
+    forces = np.nan_to_num(forces)
+
+    output_angles = -crank / reduction_ratio + delta
+    return SimulationResult(crank, output_angles, delta, backlash, gaps, forces)
+
+
+def _simulate_python(pin_count, base, lobe, clearance, pin_xs, pin_ys, crank, eccentricity, torque, stiffness):
+    reduction_ratio = pin_count - 1
+    n = pin_count
+    ts, thetas = _guess_table(pin_count, base, lobe)
+    max_step = math.pi / (2 * (n - 1))
+    result = ([], [], [], [], [], [])
+    for phi in crank:
+        psi = (math.pi - phi) / reduction_ratio
+        cos_psi, sin_psi = math.cos(psi), math.sin(psi)
+        cx, cy = eccentricity * math.cos(phi), eccentricity * math.sin(phi)
+        gaps = []
+        levers = []
+        for pin_x, pin_y in zip(pin_xs, pin_ys):
+            dx, dy = pin_x - cx, pin_y - cy
+            qx = cos_psi * dx + sin_psi * dy
+            qy = cos_psi * dy - sin_psi * dx
+
+            theta = (math.atan2(qy, qx) - thetas[0]) % (2 * math.pi) + thetas[0]
+            i = min(max(bisect.bisect_right(thetas, theta), 1), len(thetas) - 1)
+            span = thetas[i] - thetas[i - 1]
+            t = ts[i - 1] + ((theta - thetas[i - 1]) / span * (ts[i] - ts[i - 1]) if span > 0 else 0.0)
+
+            for iteration in range(NEWTON_ITERATIONS + 1):
+                cos_t, sin_t = math.cos(t), math.sin(t)
+                cos_nt, sin_nt = math.cos(n * t), math.sin(n * t)
+                ex = base * cos_t + lobe * cos_nt - qx
+                ey = base * sin_t + lobe * sin_nt - qy
+                tx = -base * sin_t - n * lobe * sin_nt
+                ty = base * cos_t + n * lobe * cos_nt
+                if iteration == NEWTON_ITERATIONS:
+                    break
+                ax = -base * cos_t - n * n * lobe * cos_nt
+                ay = -base * sin_t - n * n * lobe * sin_nt
+                speed2 = tx * tx + ty * ty
+                slope = max(speed2 + ex * ax + ey * ay, 0.1 * speed2)
+                t -= min(max((ex * tx + ey * ty) / slope, -max_step), max_step)
+
+            speed = math.hypot(tx, ty)
+            nx, ny = ty / speed, -tx / speed
+            gaps.append(clearance - (ex * nx + ey * ny))
+            levers.append(nx * qy - ny * qx)
+
+        onsets = [gap / -lever if lever < 0 else math.inf for gap, lever in zip(gaps, levers)]
+        releases = [gap / lever if lever > 0 else math.inf for gap, lever in zip(gaps, levers)]
+        backlash = min(onsets) + min(releases)
+
+        delta = math.nan
+        weight_sum = weighted_onset = 0.0
+        touching = sorted((onset, lever * lever) for onset, lever in zip(onsets, levers) if lever < 0)
+        for k, (onset, weight) in enumerate(touching):
+            weight_sum += weight
+            weighted_onset += weight * onset
+            next_onset = touching[k + 1][0] if k + 1 < len(touching) else math.inf
+            if stiffness * (next_onset * weight_sum - weighted_onset) >= torque:
+                delta = (torque / stiffness + weighted_onset) / weight_sum
+                break
+        forces = [stiffness * max(-(gap + lever * delta), 0.0) if lever < 0 and math.isfinite(delta) else 0.0
+                  for gap, lever in zip(gaps, levers)]
+
+        for values, value in zip(result, (phi, -phi / reduction_ratio + delta, delta, backlash, gaps, forces)):
+            values.append(value)
+    return SimulationResult(*result)
+
+
+def simulate_drive(pin_count: int, cycloid_radius: float, pin_radius: float, eccentricity: float, *,
+                   clearance: float = DEFAULT_PIN_CLEARANCE, steps: int = DEFAULT_STEPS,
+                   torque: float = DEFAULT_TORQUE, stiffness: float = DEFAULT_CONTACT_STIFFNESS,
+                   use_numpy: bool = None) -> SimulationResult:
+    """Simulates one input revolution of a drive.
+
+    The disc is the epitrochoid of profile.profile_terms offset by pin_radius + clearance, the
+    pins sit where drive.pin_centers puts them, the same geometry command_execute builds.
+    Pin contacts are linear springs, which is enough to share the torque between the pins and
+    find the transmission error, but not a full Hertzian contact model.
+
+    Arguments:
+    pin_count -- Number of roller pins.
+    cycloid_radius -- Radius of the cycloidal disc.
+    pin_radius -- Radius of the roller pins. The outline is offset by it, so the gaps only
+                  depend on the clearance as long as the outline has no trimmed loops.
+    eccentricity -- Eccentricity of the input shaft.
+    clearance -- Radial clearance added to the pin radius for the disc outline.
+    steps -- Number of crank angle steps over the revolution.
+    torque -- Output torque in N*cm that loads the pins.
+    stiffness -- Contact stiffness of one pin in N/cm.
+    use_numpy -- Force (True) or disable (False) the NumPy code path.
+    """
+    if steps < 1:
+        raise ValueError(f'steps must be at least 1, got {steps}')
+    if torque <= 0 or stiffness <= 0:
+        raise ValueError('torque and stiffness must be positive')
+    use_numpy = _use_numpy(use_numpy)
+    base, lobe = profile_terms(pin_count, cycloid_radius, eccentricity)
+    pin_xs, pin_ys = pin_centers(pin_count, cycloid_radius, eccentricity, use_numpy=use_numpy)
+    if use_numpy:
+        crank = np.arange(steps, dtype=float) * (2 * math.pi / steps)
+        return _simulate_numpy(pin_count, base, lobe, clearance, pin_xs, pin_ys, crank, eccentricity,
+                               torque, stiffness)
+    crank = [2 * math.pi * i / steps for i in range(steps)]
+    return _simulate_python(pin_count, base, lobe, clearance, pin_xs, pin_ys, crank, eccentricity,
+                            torque, stiffness)
+
+
+def write_simulation_csv(result: SimulationResult, file, *, per_pin: bool = False):
+    """Writes the time series of a simulation as CSV, one row per crank angle.
+
+    Angles are written in degrees, backlash and transmission error in arc minutes.
+
+    Arguments:
+    result -- The SimulationResult to write.
+    file -- A path or a text file object.
+    per_pin -- Also write the gap and force of every pin.
+    """
+    if isinstance(file, str):
+        with open(file, 'w', newline='', encoding='utf-8') as stream:
+            return write_simulation_csv(result, stream, per_pin=per_pin)
+
+    pin_count = len(result.gaps[0]) if result.steps else 0
+    header = ['crank_angle', 'output_angle', 'transmission_error', 'backlash', 'min_gap', 'max_force', 'contacts']
+    if per_pin:
+        header += [f'gap_{i}' for i in range(pin_count)] + [f'force_{i}' for i in range(pin_count)]
+    writer = csv.writer(file)
+    writer.writerow(header)
+    degrees = 180 / math.pi
+    for crank, output, error, backlash, gaps, forces in zip(*result):
+        gaps = list(map(float, gaps))
+        forces = list(map(float, forces))
+        row = [crank * degrees, output * degrees, error * _ARCMIN, backlash * _ARCMIN,
+               min(gaps), max(forces), sum(force > 0 for force in forces)]
+        if per_pin:
+            row += gaps + forces
+        writer.writerow([f'{float(value):.9g}' for value in row])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Simulate pin contact, backlash and transmission error '
+                                                 'over one input revolution of a cycloid drive.')
+    parser.add_argument('pin_count', type=int)
+    parser.add_argument('cycloid_radius', type=float, help='in cm')
+    parser.add_argument('pin_radius', type=float, help='in cm')
+    parser.add_argument('eccentricity', type=float, help='in cm')
+    parser.add_argument('--clearance', type=float, default=DEFAULT_PIN_CLEARANCE)
+    parser.add_argument('--steps', type=int, default=DEFAULT_STEPS)
+    parser.add_argument('--torque', type=float, default=DEFAULT_TORQUE, help='output torque in N*cm')
+    parser.add_argument('--stiffness', type=float, default=DEFAULT_CONTACT_STIFFNESS, help='pin stiffness in N/cm')
+    parser.add_argument('-o', '--output', help='write the time series to this CSV file')
+    parser.add_argument('--per-pin', action='store_true', help='include the gap and force of every pin in the CSV')
+    args = parser.parse_args(argv)
+
+    result = simulate_drive(args.pin_count, args.cycloid_radius, args.pin_radius, args.eccentricity,
+                            clearance=args.clearance, steps=args.steps, torque=args.torque,
+                            stiffness=args.stiffness)
+    if args.output:
+        write_simulation_csv(result, args.output, per_pin=args.per_pin)
+    json.dump(result.summary(), sys.stdout, indent=2)
+    print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,196 @@
+# Headless design space sweep.
+# Evaluates design_metrics for every design of a parameter grid on a process pool and streams the
+# results out in input order. Runs without Fusion, from the add-in folder:
+#
+#   python -m lib.cycloidGeometry.sweep grid.json -o results.csv
+#
+# A grid is either a CSV file with one design per row, a JSON list of designs, a JSON object
+# mapping each parameter to a list of values, which is expanded to every combination, or a
+# folder of design records, see record.py. With --layout the output holes of every design are
+# also counted and sized by optimize_holes, see layout.py.
+
+import argparse
+import csv
+import itertools
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from .drive import DEFAULT_PIN_CLEARANCE
+from .metrics import DEFAULT_DENSITY, SAMPLES_PER_LOBE, design_metrics
+from .validation import MIN_WALL_THICKNESS
+from .layout import optimize_holes
+
+__all__ = [
+    'PARAMETER_FIELDS',
+    'METRIC_FIELDS',
+    'LAYOUT_FIELDS',
+    'expand_grid',
+    'read_grid',
+    'evaluate_design',
+    'run_sweep',
+    'write_results',
+]
+
+# Parameters of a design, in column order. thickness is optional and defaults to 0.5.
+PARAMETER_FIELDS = ('pin_count', 'cycloid_radius', 'pin_radius', 'eccentricity', 'thickness')
+METRIC_FIELDS = ('reduction_ratio', 'min_radius_of_curvature', 'undercut', 'disc_area', 'mass', 'error')
+# Output hole fields added by evaluate_design with layout.
+LAYOUT_FIELDS = ('hole_count', 'hole_circle', 'hole_radius', 'output_pin_radius')
+
+_DEFAULT_THICKNESS = 0.5
+
+
+def _normalize_design(design: dict) -> dict:
+    missing = [name for name in PARAMETER_FIELDS[:4] if name not in design]
+    if missing:
+        raise ValueError(f'Design {design} is missing {", ".join(missing)}')
+    # An empty CSV cell means the default, an explicit 0 is kept for design_metrics to reject.
+    thickness = design.get('thickness')
+    return {
+        'pin_count': int(design['pin_count']),
+        'cycloid_radius': float(design['cycloid_radius']),
+        'pin_radius': float(design['pin_radius']),
+        'eccentricity': float(design['eccentricity']),
+        'thickness': _DEFAULT_THICKNESS if thickness is None or thickness == '' else float(thickness),
+    }
+
+
+def expand_grid(grid: dict):
+    """Yields one design for every combination of the parameter value lists in `grid`.
+
+    Scalars are treated as single value lists.
+    """
+    names = list(grid)
+    values = [value if isinstance(value, (list, tuple)) else [value] for value in grid.values()]
+    for combination in itertools.product(*values):
+        yield _normalize_design(dict(zip(names, combination)))
+
+
+def read_grid(path: str):
+    """Yields the designs described by a CSV or JSON grid file or a record folder, see the module comment."""
+    if os.path.isdir(path):
+        from .record import read_records, record_design
+        for _, header in read_records(path, headers_only=True):
+            yield _normalize_design(record_design(header))
+        return
+
+    if path.lower().endswith('.csv'):
+        with open(path, newline='') as file:
+            for row in csv.DictReader(file):
+                yield _normalize_design(row)
+        return
+
+    with open(path) as file:
+        data = json.load(file)
+    if isinstance(data, dict):
+        yield from expand_grid(data)
+    else:
+        for design in data:
+            yield _normalize_design(design)
+
+
+def evaluate_design(design: dict, *, layout: bool = False, min_wall: float = MIN_WALL_THICKNESS, **options) -> dict:
+    """Returns the design merged with its metrics. Invalid designs get an error message instead.
+
+    With layout the output holes are counted and placed by optimize_holes for the strongest output
+    pins that keep min_wall, and the LAYOUT_FIELDS are added.
+    """
+    result = dict(design)
+    try:
+        result.update(design_metrics(design['pin_count'], design['cycloid_radius'], design['pin_radius'],
+                                     design['eccentricity'], design['thickness'], **options))
+        if layout:
+            holes = optimize_holes(design['pin_count'], design['cycloid_radius'], design['pin_radius'],
+                                   design['eccentricity'], min_wall=min_wall,
+                                   clearance=options.get('clearance', DEFAULT_PIN_CLEARANCE),
+                                   samples_per_lobe=options.get('samples_per_lobe', SAMPLES_PER_LOBE))
+            result.update({name: getattr(holes, name) for name in LAYOUT_FIELDS})
+        result['error'] = ''
+    except (ValueError, ZeroDivisionError) as error:
+        result['error'] = str(error)
+    return result
+
+
+def _evaluate_chunk(chunk, options):
+    # Runs in a worker process, a whole chunk per task keeps the pickling overhead low.
+    return [evaluate_design(design, **options) for design in chunk]
+
+
+def _chunks(designs, size: int):
+    iterator = iter(designs)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def run_sweep(designs, *, workers: int = None, chunk_size: int = 256, **options):
+    """Evaluates designs on a process pool and yields the results in input order.
+
+    Only a bounded number of chunks is in flight at any time, so designs can be a generator
+    of any length and memory use stays constant.
+
+    Arguments:
+    designs -- Iterable of design dicts with the PARAMETER_FIELDS keys.
+    workers -- Number of worker processes, defaults to all cores. 0 evaluates in this process.
+    chunk_size -- Number of designs sent to a worker per task.
+    options -- Extra keyword arguments passed on to evaluate_design, such as density or layout.
+    """
+    if workers == 0:
+        for chunk in _chunks(designs, chunk_size):
+            yield from _evaluate_chunk(chunk, options)
+        return
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for chunk in _chunks(designs, chunk_size):
+            pending.append(executor.submit(_evaluate_chunk, chunk, options))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def write_results(results, file, fields: tuple = PARAMETER_FIELDS + METRIC_FIELDS) -> int:
+    """Streams results to a CSV file object as they arrive. Returns the number of rows written."""
+    writer = csv.DictWriter(file, fieldnames=fields, extrasaction='ignore')
+    writer.writeheader()
+    count = 0
+    for result in results:
+        writer.writerow(result)
+        count += 1
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Evaluate a grid of cycloid drive designs.')
+    parser.add_argument('grid', help='CSV or JSON grid file')
+    parser.add_argument('-o', '--output', help='CSV file to write, defaults to stdout')
+    parser.add_argument('-j', '--workers', type=int, default=None, help='worker processes, 0 to run inline')
+    parser.add_argument('--chunk-size', type=int, default=256)
+    parser.add_argument('--clearance', type=float, default=DEFAULT_PIN_CLEARANCE)
+    parser.add_argument('--density', type=float, default=DEFAULT_DENSITY)
+    parser.add_argument('--samples-per-lobe', type=int, default=SAMPLES_PER_LOBE)
+    parser.add_argument('--layout', action='store_true', help='size the output holes of every design')
+    parser.add_argument('--min-wall', type=float, default=MIN_WALL_THICKNESS, help='thinnest wall for --layout')
+    args = parser.parse_args(argv)
+
+    results = run_sweep(read_grid(args.grid), workers=args.workers, chunk_size=args.chunk_size,
+                        clearance=args.clearance, density=args.density, samples_per_lobe=args.samples_per_lobe,
+                        layout=args.layout, min_wall=args.min_wall)
+    fields = PARAMETER_FIELDS + METRIC_FIELDS + (LAYOUT_FIELDS if args.layout else ())
+    if args.output:
+        with open(args.output, 'w', newline='', buffering=1 << 20) as file:
+            count = write_results(results, file, fields)
+    else:
+        count = write_results(results, sys.stdout, fields)
+    print(f'{count} designs evaluated', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,371 @@
+# Precomputed lookup table of unit radius disc profiles for the standard designs.
+# The disc profile only depends on the pin count and the ratio of eccentricity to cycloid radius:
+# the profile of radius R is R times the profile of radius 1 with eccentricity e / R, and it
+# meets a chord tolerance tol wherever the unit profile meets tol / R. A table stores the
+# sampled lobe of such unit profiles, keyed by pin count and eccentricity ratio, so the profile
+# of a standard design is scaled from the table instead of sampled. The disc outline depends on
+# the absolute pin radius and clearance and is always computed live from the closed form offset,
+# see offset.py. Other designs are computed live as before. Runs without Fusion, from the add-in
+# folder:
+#
+#   python -m lib.cycloidGeometry.table build tables/standard.cyt          # standard designs
+#   python -m lib.cycloidGeometry.table build tables/custom.cyt grid.json  # designs of a grid
+#   python -m lib.cycloidGeometry.table check tables/standard.cyt          # compare with live ones
+#
+# A table file has the layout of a design record, see record.py, with magic b'CYCT' and a JSON
+# header listing the entries. Only the parameter angles of one lobe are stored per entry, the
+# points are evaluated from them at the requested radius.
+
+import argparse
+import array
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+
+from .profile import np, _use_numpy, cycloid_points, replicate_lobes
+from .sampling import DEFAULT_TOLERANCE, AdaptiveProfile, adaptive_lobe, adaptive_profile, lobe_budget, lobe_count
+from .drive import DEFAULT_PIN_CLEARANCE, compute_drive
+from .record import _close_mapping
+
+__all__ = [
+    'TABLE_VERSION',
+    'STANDARD_PIN_COUNTS',
+    'STANDARD_CYCLOID_RADII',
+    'STANDARD_ECCENTRICITY_STEP',
+    'TABLE_TOLERANCE',
+    'ProfileTable',
+    'table_key',
+    'standard_keys',
+    'build_table',
+    'check_table',
+]
+
+TABLE_VERSION = 2
+
+# Pin counts of the standard 10:1, 20:1, 30:1 and 50:1 reductions, and the standard disc radii in cm.
+STANDARD_PIN_COUNTS = (11, 21, 31, 51)
+STANDARD_CYCLOID_RADII = (2.5, 5.0, 10.0)
+
+# The standard eccentricity ratios are the multiples of this step below the lobe limit 1 / N.
+# The dialog default, 2.5 mm on a 50 mm disc, is 0.05.
+STANDARD_ECCENTRICITY_STEP = 0.0025
+
+# Chord tolerance of the unit profiles. A profile is scaled from the table if the requested
+# tolerance is at least TABLE_TOLERANCE times the radius, which covers the default tolerance up
+# to the largest standard radius.
+TABLE_TOLERANCE = DEFAULT_TOLERANCE / max(STANDARD_CYCLOID_RADII)
+
+_MAGIC = b'CYCT'
+_PREFIX = struct.Struct('<HHI')
+_PREFIX_SIZE = len(_MAGIC) + _PREFIX.size
+_ALIGNMENT = 8
+
+# Ratios are rounded to this many significant digits before they are used in a key.
+_KEY_DIGITS = 9
+
+
+def table_key(pin_count: int, cycloid_radius: float, eccentricity: float) -> tuple:
+    """Returns the radius independent table key of a disc profile: the pin count and the
+    eccentricity divided by the cycloid radius."""
+    return int(pin_count), float(f'{eccentricity / cycloid_radius:.{_KEY_DIGITS}g}')
+
+
+class ProfileTable:
+    """Lookup table of unit radius disc profiles, see the module comment.
+
+    Arguments:
+    entries -- Dict of the entries by table key, as read by load. An entry is a tuple
+               (angles, max_error, iterations, converged) of one lobe of the unit profile.
+    tolerance -- Chord tolerance of the unit profiles.
+    use_numpy -- Return NumPy arrays (True) or lists (False) from lookup.
+    """
+
+    def __init__(self, entries: dict = None, *, tolerance: float = TABLE_TOLERANCE, use_numpy: bool = None):
+        self._entries = entries or {}
+        self.tolerance = tolerance
+        self.use_numpy = use_numpy
+        self.path = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key: tuple):
+        return key in self._entries
+
+    def keys(self):
+        """Returns the (pin_count, eccentricity ratio) keys of the entries."""
+        return self._entries.keys()
+
+    @classmethod
+    def load(cls, path: str, *, use_numpy: bool = None, memory_map: bool = True) -> 'ProfileTable':
+        """Reads a table file. With NumPy it is memory-mapped, entries are only read when used.
+
+        Raises a ValueError if the file is not a table of a supported version.
+        """
+        use_numpy = _use_numpy(use_numpy)
+        with open(path, 'rb') as file:
+            if use_numpy and memory_map and os.fstat(file.fileno()).st_size >= _PREFIX_SIZE:
+                data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                data = file.read()
+        entries = {}
+        try:
+            if len(data) < _PREFIX_SIZE or data[:len(_MAGIC)] != _MAGIC:
+                raise ValueError(f'{path} is not a profile table')
+            version, _, header_length = _PREFIX.unpack_from(data, len(_MAGIC))
+            if version != TABLE_VERSION:
+                raise ValueError(f'{path} is a version {version} profile table, '
+                                 f'only version {TABLE_VERSION} is supported')
+            header = json.loads(bytes(data[_PREFIX_SIZE:_PREFIX_SIZE + header_length]).decode('utf-8'))
+            tolerance = header['tolerance']
+
+            start = _PREFIX_SIZE + header_length
+            for entry in header['entries']:
+                offset, length = entry['angles']
+                offset += start
+                if offset + length * 8 > len(data):
+                    raise ValueError(f'{path} is truncated')
+                if use_numpy:
+                    angles = np.frombuffer(data, dtype='<f8', count=length, offset=offset)
+                else:
+                    angles = array.array('d')
+                    angles.frombytes(data[offset:offset + length * 8])
+                    if sys.byteorder != 'little':
+                        angles.byteswap()
+                pin_count, ratio = entry['key']
+                entries[pin_count, ratio] = (angles, *entry['profile'])
+        except Exception as error:
+            angles = None
+            entries.clear()
+            _close_mapping(data, [])
+            if isinstance(error, (KeyError, IndexError, TypeError)):
+                raise ValueError(f'{path} has a corrupt header') from error
+            raise
+        table = cls(entries, tolerance=tolerance, use_numpy=use_numpy)
+        table.path = path
+        return table
+
+    def add(self, pin_count: int, eccentricity_ratio: float):
+        """Samples one lobe of the unit profile and adds it to the table.
+
+        Raises a ValueError if the profile does not meet the table tolerance within the sample budget.
+        """
+        key = table_key(pin_count, 1.0, eccentricity_ratio)
+        min_samples, max_samples = lobe_budget(pin_count)
+        lobe = adaptive_lobe(pin_count, 1.0, key[1], self.tolerance, min_samples=min_samples,
+                             max_samples=max_samples, use_numpy=False)
+        if not lobe.converged:
+            raise ValueError(f'The profile of {pin_count} pins with eccentricity ratio {key[1]} does not '
+                             f'reach the tolerance {self.tolerance}')
+        self._entries[key] = (array.array('d', lobe.angles), lobe.max_error, lobe.iterations, lobe.converged)
+
+    def profile(self, pin_count: int, cycloid_radius: float, eccentricity: float,
+                tolerance: float = DEFAULT_TOLERANCE):
+        """Returns the disc profile scaled from the table, or None if the table has no entry for
+        it or its entry is not accurate enough at this radius.
+
+        The profile has the layout of adaptive_profile with lobe symmetry and default sample budgets.
+        """
+        if not cycloid_radius > 0 or self.tolerance * cycloid_radius > tolerance:
+            return None
+        entry = self._entries.get(table_key(pin_count, cycloid_radius, eccentricity))
+        if entry is None:
+            return None
+
+        lobe_angles, max_error, iterations, converged = entry
+        use_numpy = _use_numpy(self.use_numpy)
+        lobes = lobe_count(pin_count)
+        step = 2 * math.pi / lobes
+        if use_numpy:
+            lobe_angles = np.asarray(lobe_angles, dtype=float)
+            angles = (lobe_angles[None, :] + step * np.arange(lobes)[:, None]).ravel()
+        else:
+            lobe_angles = list(lobe_angles)
+            angles = [t + k * step for k in range(lobes) for t in lobe_angles]
+        xs, ys = cycloid_points(pin_count, cycloid_radius, eccentricity, lobe_angles, use_numpy=use_numpy)
+        xs, ys = replicate_lobes(xs, ys, lobes, use_numpy=use_numpy)
+        return AdaptiveProfile(xs, ys, angles, max_error * cycloid_radius, iterations, converged, lobes)
+
+    def lookup(self, pin_count: int, cycloid_radius: float, pin_radius: float, eccentricity: float,
+               tolerance: float = DEFAULT_TOLERANCE, *, clearance: float = DEFAULT_PIN_CLEARANCE,
+               **sampling):
+        """Returns the drive with its profile scaled from the table, or None if the table does not
+        cover it, see profile.
+
+        Takes the same arguments as compute_drive. The outline is computed for the pin radius and
+        clearance. Drives with sample settings other than the defaults are not covered.
+        """
+        if sampling:
+            return None
+        profile = self.profile(pin_count, cycloid_radius, eccentricity, tolerance)
+        if profile is None:
+            return None
+        return compute_drive(pin_count, cycloid_radius, pin_radius, eccentricity, tolerance, clearance=clearance,
+                             profile=profile, use_numpy=_use_numpy(self.use_numpy))
+
+    def save(self, path: str):
+        """Writes the table to path, through a temporary file."""
+        entries = []
+        blobs = []
+        offset = 0
+        for (pin_count, ratio), (angles, max_error, iterations, converged) in self._entries.items():
+            column = array.array('d', angles)
+            if sys.byteorder != 'little':
+                column.byteswap()
+            blob = column.tobytes()
+            entries.append({'key': [pin_count, ratio], 'profile': [max_error, iterations, converged],
+                            'angles': [offset, len(column)]})
+            blobs.append(blob)
+            offset += len(blob)
+
+        header = {'tolerance': self.tolerance, 'entries': entries}
+        header_bytes = json.dumps(header, separators=(',', ':')).encode('utf-8')
+        header_bytes += b' ' * (-(_PREFIX_SIZE + len(header_bytes)) % _ALIGNMENT)
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        temp_path = path + '.tmp'
+        with open(temp_path, 'wb') as file:
+            file.write(_MAGIC + _PREFIX.pack(TABLE_VERSION, 0, len(header_bytes)))
+            file.write(header_bytes)
+            for blob in blobs:
+                file.write(blob)
+        os.replace(temp_path, path)
+
+
+def standard_keys(pin_counts=STANDARD_PIN_COUNTS, step: float = STANDARD_ECCENTRICITY_STEP):
+    """Yields the (pin_count, eccentricity ratio) keys of the standard profiles: every multiple
+    of step below the lobe limit 1 / pin_count, where the profile starts to intersect itself."""
+    for pin_count in pin_counts:
+        index = 1
+        while index * step < 1 / pin_count:
+            yield table_key(pin_count, 1.0, index * step)
+            index += 1
+
+
+def build_table(keys, *, tolerance: float = TABLE_TOLERANCE):
+    """Samples the unit profile of every key and returns them as a ProfileTable.
+
+    Arguments:
+    keys -- Iterable of (pin_count, eccentricity ratio), see table_key and standard_keys.
+    tolerance -- Chord tolerance of the unit profiles.
+
+    :returns:
+        A tuple (table, errors), errors is a list of (key, message) of the keys that were skipped.
+    """
+    table = ProfileTable(tolerance=tolerance)
+    errors = []
+    for pin_count, ratio in keys:
+        if (pin_count, ratio) in table:
+            continue
+        try:
+            table.add(pin_count, ratio)
+        except (ValueError, ZeroDivisionError) as error:
+            errors.append(((pin_count, ratio), str(error)))
+    return table, errors
+
+
+def _polyline_distance(xs, ys, qx, qy) -> float:
+    # Largest distance of the query points from the closed polyline xs, ys.
+    if np is not None:
+        ax, ay = np.asarray(xs, dtype=float), np.asarray(ys, dtype=float)
+        bx, by = np.roll(ax, -1), np.roll(ay, -1)
+        dx, dy = bx - ax, by - ay
+        length2 = np.maximum(dx * dx + dy * dy, 1e-300)
+        worst = 0.0
+        qx, qy = np.asarray(qx, dtype=float), np.asarray(qy, dtype=float)
+        # A chunk of query points at a time keeps the distance matrix small.
+        for start in range(0, len(qx), 256):
+            px = qx[start:start + 256, None]
+            py = qy[start:start + 256, None]
+            u = np.clip(((px - ax) * dx + (py - ay) * dy) / length2, 0.0, 1.0)
+            distance = np.hypot(ax + u * dx - px, ay + u * dy - py).min(axis=1)
+            worst = max(worst, float(distance.max()))
+        return worst
+
+    n = len(xs)
+    worst = 0.0
+    for px, py in zip(qx, qy):
+        best = math.inf
+        for i in range(n):
+            ax, ay, bx, by = xs[i], ys[i], xs[(i + 1) % n], ys[(i + 1) % n]
+            dx, dy = bx - ax, by - ay
+            length2 = max(dx * dx + dy * dy, 1e-300)
+            u = min(max(((px - ax) * dx + (py - ay) * dy) / length2, 0.0), 1.0)
+            best = min(best, math.hypot(ax + u * dx - px, ay + u * dy - py))
+        worst = max(worst, best)
+    return worst
+
+
+def check_table(table: ProfileTable, *, cycloid_radii=STANDARD_CYCLOID_RADII, tolerance: float = DEFAULT_TOLERANCE):
+    """Compares profiles scaled from the table with live sampled ones.
+
+    Every entry is checked at each of cycloid_radii where the table covers the tolerance. The
+    profiles must be within the tolerance of each other, both ways.
+
+    :returns:
+        A list of dicts, one per checked profile, with the design, the tolerance, the largest
+        deviation found and whether it is within the tolerance.
+    """
+    results = []
+    for pin_count, ratio in table.keys():
+        for cycloid_radius in cycloid_radii:
+            eccentricity = ratio * cycloid_radius
+            scaled = table.profile(pin_count, cycloid_radius, eccentricity, tolerance)
+            if scaled is None:
+                continue
+            live = adaptive_profile(pin_count, cycloid_radius, eccentricity, tolerance)
+            deviation = max(_polyline_distance(live.xs, live.ys, scaled.xs, scaled.ys),
+                            _polyline_distance(scaled.xs, scaled.ys, live.xs, live.ys))
+            results.append({
+                'pin_count': pin_count, 'cycloid_radius': cycloid_radius, 'eccentricity': eccentricity,
+                'tolerance': tolerance, 'deviation': deviation, 'ok': deviation <= tolerance,
+            })
+    return results
+
+
+def main(argv=None):
+    from .sweep import read_grid
+
+    parser = argparse.ArgumentParser(description='Build or check a table of precomputed cycloid disc profiles.')
+    parser.add_argument('action', choices=('build', 'check'))
+    parser.add_argument('table', help='table file')
+    parser.add_argument('grid', nargs='?', help='CSV or JSON grid file of the designs to build, see sweep.py. '
+                                                'Defaults to the standard profiles')
+    parser.add_argument('--tolerance', type=float, default=None,
+                        help=f'with build, chord tolerance of the unit profiles, default {TABLE_TOLERANCE:g}. '
+                             f'With check, the tolerance checked at every radius, default {DEFAULT_TOLERANCE:g}')
+    parser.add_argument('--radii', type=float, nargs='+', default=list(STANDARD_CYCLOID_RADII),
+                        help='with check, the cycloid radii every entry is checked at')
+    args = parser.parse_args(argv)
+
+    if args.action == 'build':
+        if args.grid:
+            keys = [table_key(design['pin_count'], design['cycloid_radius'], design['eccentricity'])
+                    for design in read_grid(args.grid)]
+        else:
+            keys = standard_keys()
+        table, errors = build_table(keys, tolerance=args.tolerance or TABLE_TOLERANCE)
+        for key, error in errors:
+            print(f'{key}: {error}', file=sys.stderr)
+        table.save(args.table)
+        print(f'{len(table)} entries written to {args.table} ({os.path.getsize(args.table) / 1024:.0f} KiB)',
+              file=sys.stderr)
+        return 0
+
+    results = check_table(ProfileTable.load(args.table), cycloid_radii=args.radii,
+                          tolerance=args.tolerance or DEFAULT_TOLERANCE)
+    for result in results:
+        print(f"{result['pin_count']:4d} pins, radius {result['cycloid_radius']:g}, eccentricity "
+              f"{result['eccentricity']:.4g}: deviation {result['deviation']:.3g} of tolerance "
+              f"{result['tolerance']:.3g}  {'ok' if result['ok'] else 'FAILED'}")
+    failed = sum(not result['ok'] for result in results)
+    print(f'{len(results) - failed} of {len(results)} profiles within tolerance', file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,161 @@
+# Analytic design rule checks of a drive, run before any geometry is computed or built.
+# Every check is a closed form expression of the parameters, so a full check takes a few
+# microseconds and can run on every keystroke. Results are memoized per parameter tuple.
+
+import math
+from functools import lru_cache
+from typing import NamedTuple
+
+from .drive import (DEFAULT_PIN_CLEARANCE, OUTPUT_HOLE_RADIUS_RATIO, THROUGHHOLE_CLEARANCE,
+                    output_hole_count)
+
+__all__ = [
+    'MIN_WALL_THICKNESS',
+    'WALL_MESSAGES',
+    'DesignIssue',
+    'min_radius_of_curvature',
+    'check_design',
+]
+
+# Thinnest wall in cm allowed between two holes, or between a hole and the disc outline.
+MIN_WALL_THICKNESS = 0.1
+
+# Parameter tuples whose check results are kept.
+_CACHE_SIZE = 256
+
+# Messages of the wall checks, by check name. value and limit are formatted in mm.
+WALL_MESSAGES = {
+    'pin_spacing': 'Roller pins are {value:.3g} mm apart, at least {limit:.3g} mm are needed.',
+    'throughhole': 'The roller pins are {value:.3g} mm from the roller plate throughhole, '
+                   'at least {limit:.3g} mm are needed.',
+    'hole_bore': 'The wall between the output holes and the bore is {value:.3g} mm, '
+                 'at least {limit:.3g} mm are needed.',
+    'hole_outline': 'The wall between the output holes and the disc outline is {value:.3g} mm, '
+                    'at least {limit:.3g} mm are needed.',
+    'hole_spacing': 'The wall between neighbouring output holes is {value:.3g} mm, '
+                    'at least {limit:.3g} mm are needed.',
+    'bore_outline': 'The wall between the bore and the disc outline is {value:.3g} mm, '
+                    'at least {limit:.3g} mm are needed.',
+}
+
+
+class DesignIssue(NamedTuple):
+    """A violated design rule. value is the measured quantity and limit the bound it violates, in cm."""
+    check: str
+    message: str
+    value: float
+    limit: float
+
+
+def min_radius_of_curvature(pin_count: int, cycloid_radius: float, eccentricity: float) -> float:
+    """Returns the smallest radius of curvature of the convex parts of the disc profile.
+
+    The curvature of the profile only depends on c = cos((N - 1) * t), so the minimum is at a
+    lobe tip (c = 1), a lobe root (c = -1) or the single stationary point between them.
+    Offsetting the profile inwards by more than this undercuts the lobe tips.
+    Returns inf if the profile has no convex part.
+    """
+    n = pin_count
+    base = cycloid_radius
+    lobe = cycloid_radius / n - eccentricity
+    # speed^2 = a + 2 * b * c and cross(p', p'') = d + g * c
+    a = base * base + n * n * lobe * lobe
+    b = base * n * lobe
+    d = base * base + n ** 3 * lobe * lobe
+    g = b * (n + 1)
+
+    candidates = [1.0, -1.0]
+    if b != 0:
+        candidates.append((g * a - 3 * b * d) / (b * g))
+    radius = math.inf
+    for c in candidates:
+        cross = d + g * c
+        if -1.0 <= c <= 1.0 and cross > 0:
+            radius = min(radius, max(a + 2 * b * c, 0.0) ** 1.5 / cross)
+    return radius
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def _check(pin_count: int, cycloid_radius: float, pin_radius: float, eccentricity: float,
+           clearance: float, min_wall: float) -> tuple:
+    if pin_count < 3:
+        return DesignIssue('pin_count', f'At least 3 roller pins are needed, got {pin_count}.', pin_count, 3),
+    for name, value in (('cycloid_radius', cycloid_radius), ('pin_radius', pin_radius),
+                        ('eccentricity', eccentricity)):
+        if not value > 0:
+            label = name.replace('_', ' ').capitalize()
+            return DesignIssue(name, f'{label} must be greater than zero.', value, 0.0),
+
+    issues = []
+    lobe_limit = cycloid_radius / pin_count
+    if eccentricity >= lobe_limit:
+        issues.append(DesignIssue(
+            'eccentricity',
+            f'Eccentricity {eccentricity * 10:.3g} mm must be less than cycloid radius / pin count '
+            f'({lobe_limit * 10:.3g} mm). At that value the profile has cusps, above it the profile '
+            f'loops back on itself and intersects itself.',
+            eccentricity, lobe_limit))
+        return tuple(issues)
+
+    # The output pins are smaller than their holes by the eccentricity.
+    if eccentricity >= pin_radius:
+        issues.append(DesignIssue(
+            'output_pin',
+            f'Eccentricity {eccentricity * 10:.3g} mm must be less than the pin radius {pin_radius * 10:.3g} mm, '
+            f'otherwise the output pins have no material.',
+            eccentricity, pin_radius))
+
+    offset = pin_radius + clearance
+    curvature_radius = min_radius_of_curvature(pin_count, cycloid_radius, eccentricity)
+    if offset >= curvature_radius:
+        issues.append(DesignIssue(
+            'undercut',
+            f'Pin radius plus clearance {offset * 10:.3g} mm exceeds the smallest lobe radius of curvature '
+            f'{curvature_radius * 10:.3g} mm, the disc outline would be undercut. '
+            f'Use fewer pins, a smaller pin radius or a smaller eccentricity.',
+            offset, curvature_radius))
+
+    # Roller pins sit on a circle of radius R - e and must not touch each other or the throughhole.
+    # Output holes sit on a circle around the bore, both with the pin radius. The disc outline
+    # is closest to the centre at a lobe root, R - lobe - offset, and the first hole reaches
+    # furthest out at R / OUTPUT_HOLE_RADIUS_RATIO + pin_radius.
+    pin_circle = cycloid_radius - eccentricity
+    hole_circle = cycloid_radius / OUTPUT_HOLE_RADIUS_RATIO - eccentricity
+    hole_count = output_hole_count(pin_count)
+    lobe = lobe_limit - eccentricity
+    walls = [
+        ('pin_spacing', 2 * pin_circle * math.sin(math.pi / pin_count) - 2 * pin_radius),
+        ('throughhole', pin_circle - 2 * pin_radius - THROUGHHOLE_CLEARANCE),
+        ('hole_bore', hole_circle - 2 * pin_radius),
+        ('hole_outline', cycloid_radius - lobe - offset - cycloid_radius / OUTPUT_HOLE_RADIUS_RATIO - pin_radius),
+    ]
+    if hole_count > 1:
+        walls.append(('hole_spacing', 2 * hole_circle * math.sin(math.pi / hole_count) - 2 * pin_radius))
+    for name, value in walls:
+        if value < min_wall:
+            issues.append(DesignIssue(name, WALL_MESSAGES[name].format(value=value * 10, limit=min_wall * 10),
+                                      value, min_wall))
+    return tuple(issues)
+
+
+def check_design(pin_count: int, cycloid_radius: float, pin_radius: float, eccentricity: float, *,
+                 clearance: float = DEFAULT_PIN_CLEARANCE, min_wall: float = MIN_WALL_THICKNESS) -> tuple:
+    """Checks a drive against the design rules without computing its geometry.
+
+    Covers the lobe and undercut limits of the profile, the spacing of the roller pins and the
+    walls between the output holes, the bore and the disc outline. Lengths in messages are in mm.
+    The walls are closed form estimates, check_layout measures them on the actual geometry.
+
+    Arguments:
+    pin_count -- Number of roller pins.
+    cycloid_radius -- Radius of the cycloidal disc.
+    pin_radius -- Radius of the roller pins, output pins and eccentric shaft.
+    eccentricity -- Eccentricity of the input shaft.
+    clearance -- Radial clearance added to the pin radius for the disc outline.
+    min_wall -- Thinnest allowed wall between holes and outlines.
+
+    :returns:
+        A tuple of DesignIssue, empty if the design is valid. The most basic problems come first.
+    """
+    return _check(int(pin_count), float(cycloid_radius), float(pin_radius), float(eccentricity),
+                  float(clearance), float(min_wall))
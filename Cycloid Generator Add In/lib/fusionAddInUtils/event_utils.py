@@ -9,23 +9,220 @@
 #  AUTODESK, INC. DOES NOT WARRANT THAT THE OPERATION OF THE PROGRAM WILL BE
 #  UNINTERRUPTED OR ERROR FREE.
 
+import itertools
 import sys
+import threading
+import time
 from typing import Callable
 
 import adsk.core
-from .general_utils import handle_error
+from .general_utils import handle_error, log
 
 
 # Global Variable to hold Event Handlers
 _handlers = []
 
+# Handler classes by event handler type. A class is defined once per type and shared by every
+# handler of that type, the callback and its settings are held by the handler instance.
+_handler_classes = {}
+
+# Upper bounds in milliseconds of the latency histogram buckets of HandlerStats.
+# The last bucket holds every call slower than the last bound.
+LATENCY_BUCKETS = (0.1, 0.3, 1, 3, 10, 30, 100, 300, 1000)
+
+# Custom events of coalescing handlers are named with this prefix and a running number.
+_COALESCE_EVENT_PREFIX = 'fusionAddInUtils_coalesce_'
+_coalesce_ids = itertools.count(1)
+
+
+class HandlerStats:
+    """Call counts and latency histogram of one event handler, see handler_stats."""
+    __slots__ = ('name', 'calls', 'errors', 'dropped', 'coalesced', 'total_time', 'max_time', 'histogram')
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.errors = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def record(self, elapsed: float):
+        self.calls += 1
+        self.total_time += elapsed
+        self.max_time = max(self.max_time, elapsed)
+        milliseconds = elapsed * 1000
+        bucket = 0
+        while bucket < len(LATENCY_BUCKETS) and milliseconds > LATENCY_BUCKETS[bucket]:
+            bucket += 1
+        self.histogram[bucket] += 1
+
+    @property
+    def mean_time(self) -> float:
+        return self.total_time / self.calls if self.calls else 0.0
+
+    def percentile(self, fraction: float) -> float:
+        """Returns the upper bound in ms of the bucket holding the given fraction of the calls,
+        or infinity if it is the last bucket."""
+        needed = fraction * self.calls
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS + (float('inf'),), self.histogram):
+            seen += count
+            if seen >= needed:
+                return bound
+        return float('inf')
+
+    def summary(self) -> str:
+        return (f'{self.name}: {self.calls} calls, {self.errors} errors, {self.dropped} dropped, '
+                f'{self.coalesced} coalesced, mean {self.mean_time * 1000:.2f} ms, '
+                f'p95 <= {self.percentile(0.95):g} ms, max {self.max_time * 1000:.2f} ms')
+
+
+class InputChanges:
+    """A burst of inputChanged notifications, passed to a callback added with coalesce.
+
+    inputs -- The command inputs of the dialog.
+    changed -- The inputs that changed, each once, in the order of their last change.
+    count -- Number of notifications in the burst.
+    duration -- Seconds from the first to the last notification.
+    """
+
+    def __init__(self, inputs: adsk.core.CommandInputs, start: float):
+        self.inputs = inputs
+        self.count = 0
+        self._changed = {}
+        self._start = start
+        self._end = start
+
+    def add(self, changed_input: adsk.core.CommandInput, now: float):
+        self._changed.pop(changed_input.id, None)
+        self._changed[changed_input.id] = changed_input
+        self.count += 1
+        self._end = now
+
+    @property
+    def changed(self) -> list:
+        return list(self._changed.values())
+
+    @property
+    def command(self) -> adsk.core.Command:
+        return self.inputs.command
+
+    @property
+    def duration(self) -> float:
+        return self._end - self._start
+
+
+class _Dispatcher:
+    # Runs the callback of one handler with its logging, rate limit and statistics.
+
+    def __init__(self, callback: Callable, name: str, log_level, log_interval: float, min_interval: float):
+        self.callback = callback
+        self.name = name
+        self.log_level = log_level
+        self.log_interval = log_interval
+        self.min_interval = min_interval
+        self.stats = HandlerStats(name)
+        self._last_call = float('-inf')
+        self._last_log = float('-inf')
+        self._unlogged = 0
+
+    def __call__(self, args):
+        now = time.perf_counter()
+        if self.log_level is not None:
+            self._log(now)
+        if now - self._last_call < self.min_interval:
+            self.stats.dropped += 1
+            return
+        self._last_call = now
+        self._run(args, now)
+
+    def _run(self, args, start: float):
+        try:
+            self.callback(args)
+        except Exception:
+            self.stats.errors += 1
+            handle_error(self.name)
+        self.stats.record(time.perf_counter() - start)
+
+    def _log(self, now: float):
+        # Notifications within log_interval of the last logged one are only counted.
+        if now - self._last_log < self.log_interval:
+            self._unlogged += 1
+            return
+        message = f'{self.name} ({self._unlogged} more not logged)' if self._unlogged else self.name
+        self._last_log = now
+        self._unlogged = 0
+        log(message, self.log_level)
+
+    def close(self):
+        pass
+
+
+class _Coalescer(_Dispatcher):
+    # Collects inputChanged notifications and calls the callback with an InputChanges once none
+    # arrived for `window` seconds. A timer thread fires a custom event, so the callback runs on
+    # the main thread like any other handler.
+
+    def __init__(self, callback: Callable, name: str, log_level, log_interval: float, window: float):
+        super().__init__(callback, name, log_level, log_interval, 0.0)
+        self.window = window
+        self.event_id = f'{_COALESCE_EVENT_PREFIX}{next(_coalesce_ids)}'
+        self._app = adsk.core.Application.get()
+        self._changes = None
+        self._last_change = 0.0
+        self._timer = None
+
+    def __call__(self, args: adsk.core.InputChangedEventArgs):
+        now = time.perf_counter()
+        if self.log_level is not None:
+            self._log(now)
+        if self._changes is None:
+            self._changes = InputChanges(args.inputs, now)
+        else:
+            self.stats.coalesced += 1
+        self._changes.add(args.input, now)
+        self._last_change = now
+        if self._timer is None:
+            self._start_timer(self.window)
+
+    def flush(self, args: adsk.core.CustomEventArgs):
+        # Called from the custom event, the timer is only touched on the main thread.
+        self._timer = None
+        if self._changes is None:
+            return
+        quiet = time.perf_counter() - self._last_change
+        if quiet < self.window:
+            self._start_timer(self.window - quiet)
+            return
+        changes, self._changes = self._changes, None
+        self._run(changes, time.perf_counter())
+
+    def _start_timer(self, delay: float):
+        self._timer = threading.Timer(delay, self._app.fireCustomEvent, (self.event_id,))
+        self._timer.daemon = True
+        self._timer.start()
+
+    def close(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._changes = None
+        self._app.unregisterCustomEvent(self.event_id)
+
 
 def add_handler(
         event: adsk.core.Event,
         callback: Callable,
         *,
         name: str = None,
-        local_handlers: list = None
+        local_handlers: list = None,
+        log_level: adsk.core.LogLevels = None,
+        log_interval: float = 0.0,
+        min_interval: float = 0.0,
+        coalesce: float = 0.0
 ):
     """Adds an event handler to the specified event.
 
@@ -40,49 +237,92 @@ def add_handler(
                       This argument must be specified by its keyword. If not
                       specified the handler is added to a global list and can
                       be cleared using the clear_handlers function. You may want
-                      to maintain your own handler list so it can be managed 
+                      to maintain your own handler list so it can be managed
                       independently for each command.
+    log_level -- If specified every notification is logged with the name at this level.
+    log_interval -- Log at most one notification per this many seconds, the others are counted
+                    and the count is added to the next message. Useful for events that fire
+                    continuously, like inputChanged while a spinner is dragged.
+    min_interval -- Skip notifications that arrive within this many seconds of the last one the
+                    callback ran for. Skipped notifications are lost, see coalesce.
+    coalesce -- Only for inputChanged events. If greater than 0 the callback is not called for
+                every notification, but once no further change arrived for this many seconds,
+                with an InputChanges instead of the event arguments.
 
     :returns:
         The event handler that was created.  You don't often need this reference, but it can be useful in some cases.
-    """   
+    """
     module = sys.modules[event.__module__]
     handler_type = module.__dict__[event.add.__annotations__['handler']]
-    handler = _create_handler(handler_type, callback, event, name, local_handlers)
+    name = name or handler_type.__name__
+    handlers = local_handlers if local_handlers is not None else _handlers
+
+    if coalesce > 0:
+        if handler_type.__name__ != 'InputChangedEventHandler':
+            raise ValueError(f'Only inputChanged events can be coalesced, not {handler_type.__name__}')
+        dispatcher = _Coalescer(callback, name, log_level, log_interval, coalesce)
+        custom_event = adsk.core.Application.get().registerCustomEvent(dispatcher.event_id)
+        flush_handler = _handler_class(adsk.core.CustomEventHandler)(custom_event, dispatcher.flush)
+        custom_event.add(flush_handler)
+        handlers.append(flush_handler)
+    else:
+        dispatcher = _Dispatcher(callback, name, log_level, log_interval, min_interval)
+
+    handler = _handler_class(handler_type)(event, dispatcher, dispatcher.stats)
     event.add(handler)
+    handlers.append(handler)
     return handler
 
 
-def clear_handlers():
-    """Clears the global list of handlers.
+def clear_handlers(handlers: list = None):
+    """Disconnects handlers from their events and empties the list.
+
+    Pending coalesced callbacks are cancelled.
+
+    Arguments:
+    handlers -- A list of handlers passed as local_handlers to add_handler.
+                If not specified the global list of handlers is cleared.
     """
-    global _handlers
-    _handlers = []
+    for handler in handlers if handlers is not None else _handlers:
+        handler.close()
+    if handlers is not None:
+        handlers.clear()
+    else:
+        _handlers.clear()
 
 
-def _create_handler(
-        handler_type,
-        callback: Callable,
-        event: adsk.core.Event,
-        name: str = None,
-        local_handlers: list = None
-):
-    handler = _define_handler(handler_type, callback, name)()
-    (local_handlers if local_handlers is not None else _handlers).append(handler)
-    return handler
+def handler_stats(handlers: list = None) -> list:
+    """Returns the HandlerStats of every handler in the list, or of the global list if not specified."""
+    return [handler.stats for handler in (handlers if handlers is not None else _handlers)
+            if handler.stats is not None]
 
 
-def _define_handler(handler_type, callback, name: str = None):
-    name = name or handler_type.__name__
+def handler_report(handlers: list = None) -> str:
+    """Returns one summary line per handler, see HandlerStats.summary."""
+    return '\n'.join(stats.summary() for stats in handler_stats(handlers))
+
+
+def _handler_class(handler_type):
+    handler_class = _handler_classes.get(handler_type)
+    if handler_class is None:
+        class Handler(handler_type):
+            def __init__(self, event, dispatch: Callable, stats: HandlerStats = None):
+                super().__init__()
+                self.event = event
+                self.dispatch = dispatch
+                self.stats = stats
 
-    class Handler(handler_type):
-        def __init__(self):
-            super().__init__()
+            def notify(self, args):
+                self.dispatch(args)
 
-        def notify(self, args):
-            try:
-                callback(args)
-            except:
-                handle_error(name)
+            def close(self):
+                # The event may already be gone, for example with its command.
+                try:
+                    self.event.remove(self)
+                except Exception:
+                    pass
+                if self.stats is not None:
+                    self.dispatch.close()
 
-    return Handler
+        handler_class = _handler_classes[handler_type] = Handler
+    return handler_class
@@ -0,0 +1,236 @@
+import functools
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable
+
+# Attempt to read the profiling settings from parent config.
+try:
+    from ... import config
+    PROFILING = getattr(config, 'PROFILING', False)
+    PROFILE_LOG_FILE = getattr(config, 'PROFILE_LOG_FILE', None)
+except:
+    PROFILING = False
+    PROFILE_LOG_FILE = None
+
+# Size of one profile log file and number of rotated files that are kept.
+PROFILE_LOG_MAX_BYTES = 1024 * 1024
+PROFILE_LOG_BACKUPS = 3
+
+_logger = None
+
+
+class _State(threading.local):
+    # The current run and the stack of entered stages, per thread. Stages entered on a thread
+    # without a run, such as the generator's compute thread, are not recorded.
+    def __init__(self):
+        self.run = None
+        self.stack = []
+
+
+_state = _State()
+
+
+class _Stage:
+    __slots__ = ('name', 'elapsed', 'calls')
+
+    def __init__(self, name: str):
+        self.name = name
+        self.elapsed = 0.0
+        self.calls = 0
+
+
+class _Run:
+    def __init__(self, name: str, details: dict):
+        self.name = name
+        self.details = details
+        self.started = datetime.now(timezone.utc)
+        self.start = time.perf_counter()
+        self.stages = {}
+
+    def stage(self, name: str) -> _Stage:
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = _Stage(name)
+        return stage
+
+    def summary(self) -> dict:
+        return {
+            'run': self.name,
+            'started': self.started.isoformat(),
+            'elapsed': time.perf_counter() - self.start,
+            'details': self.details,
+            'stages': [
+                {'name': s.name, 'elapsed': s.elapsed, 'calls': s.calls}
+                for s in self.stages.values()
+            ],
+        }
+
+
+class _NullContext:
+    # Shared do-nothing context manager returned while profiling is disabled.
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL = _NullContext()
+
+
+class _StageContext:
+    __slots__ = ('stage', 'start')
+
+    def __init__(self, stage: _Stage):
+        self.stage = stage
+
+    def __enter__(self):
+        _state.stack.append(self.stage)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stage.elapsed += time.perf_counter() - self.start
+        self.stage.calls += 1
+        _state.stack.pop()
+        return False
+
+
+class _RunContext:
+    def __init__(self, name: str, details: dict):
+        self.name = name
+        self.details = details
+
+    def __enter__(self):
+        _state.run = _Run(self.name, self.details)
+        return _state.run
+
+    def __exit__(self, *exc_info):
+        run, _state.run = _state.run, None
+        _state.stack.clear()
+        if exc_info[0] is not None:
+            run.details['error'] = exc_info[0].__name__
+        _write_summary(run.summary())
+        return False
+
+
+class _ResumeContext:
+    # Makes a run started with begin_run the current run, and restores the outer run after.
+    def __init__(self, run: _Run):
+        self.run = run
+
+    def __enter__(self):
+        self.outer = _state.run, _state.stack
+        _state.run = self.run
+        _state.stack = []
+        return self.run
+
+    def __exit__(self, *exc_info):
+        _state.run, _state.stack = self.outer
+        return False
+
+
+def set_profiling(enabled: bool):
+    """Turns profiling on or off at runtime, overriding config.PROFILING."""
+    global PROFILING
+    PROFILING = enabled
+
+
+def profile_run(name: str, **details):
+    """Context manager that profiles one run, for example one command execution.
+
+    Stages entered inside the run are collected and a JSON summary is appended to the rotating
+    profile log when the run ends. Keyword arguments are stored in the summary as details.
+    Returns a no-op context manager if profiling is disabled.
+    """
+    if not PROFILING:
+        return _NULL
+    return _RunContext(name, details)
+
+
+def begin_run(name: str, **details):
+    """Starts a run whose work is split over several events, for example a background build.
+
+    Stages are only collected inside resume_run blocks, and the summary is written by end_run.
+    Returns None if profiling is disabled, which resume_run and end_run accept.
+    """
+    if not PROFILING:
+        return None
+    return _Run(name, details)
+
+
+def resume_run(run):
+    """Context manager that makes a run from begin_run the current run, so its stages are recorded."""
+    if run is None:
+        return _NULL
+    return _ResumeContext(run)
+
+
+def end_run(run, error: str = None):
+    """Appends the summary of a run from begin_run to the profile log.
+
+    Arguments:
+    run -- The run returned by begin_run, or None.
+    error -- Stored in the summary details if the run did not finish normally.
+    """
+    if run is None:
+        return
+    if error is not None:
+        run.details['error'] = error
+    _write_summary(run.summary())
+
+
+def stage(name: str):
+    """Context manager that times a named stage of the current run.
+
+    Nested stages are recorded with their parent names, e.g. 'build/extrude disc'.
+    Returns a no-op context manager if profiling is disabled or no run is active on this thread.
+    """
+    run = _state.run
+    if run is None:
+        return _NULL
+    if _state.stack:
+        name = f'{_state.stack[-1].name}/{name}'
+    return _StageContext(run.stage(name))
+
+
+def timed(name: str = None):
+    """Decorator that runs the function as a stage of the current run.
+
+    Arguments:
+    name -- The stage name, defaults to the function name.
+    """
+    def decorator(func: Callable):
+        stage_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _state.run is None:
+                return func(*args, **kwargs)
+            with stage(stage_name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _write_summary(summary: dict):
+    global _logger
+    if not PROFILE_LOG_FILE:
+        return
+    if _logger is None:
+        os.makedirs(os.path.dirname(PROFILE_LOG_FILE), exist_ok=True)
+        handler = logging.handlers.RotatingFileHandler(
+            PROFILE_LOG_FILE, maxBytes=PROFILE_LOG_MAX_BYTES, backupCount=PROFILE_LOG_BACKUPS, encoding='utf-8')
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        _logger = logging.getLogger(f'{__name__}.profile')
+        _logger.setLevel(logging.INFO)
+        _logger.propagate = False
+        _logger.addHandler(handler)
+    _logger.info(json.dumps(summary))
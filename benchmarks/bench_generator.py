@@ -0,0 +1,357 @@
+"""Headless benchmark of the Cycloid Generator command.
+
+Runs command_execute of the add-in against the recording adsk stand-in in benchmarks/fakeadsk,
+so no Fusion installation is needed. For every pin count, profile tolerance and number of discs
+in the matrix it measures the Python time of one execution (best of --repeat runs), the peak
+traced memory and allocated blocks, and the number of Fusion API calls made.
+
+    python benchmarks/bench_generator.py                      # compare against baselines.json
+    python benchmarks/bench_generator.py --update-baselines   # store the current results
+
+With --updates every case is also re-run after changing one input, which updates the drive
+built by the first run in place: '+thickness' changes the disc thickness, '+pins' adds two
+roller pins. Only the update is measured, and its bodies and occurrences must match a fresh build.
+
+With --async every command runs the way Fusion runs it by default, computing on a worker
+thread and building in chunks from a custom event, see generation.py. Case names get '~async'
+and the longest chunk is printed, it should stay near generation.CHUNK_TIME.
+
+It also measures starting the add-in, which must not import NumPy or the geometry engine.
+The exit code is 1 if anything is imported too early, if starting got slower, or if any case makes
+more API calls than its baseline, or is slower or uses more memory than its baseline by more than
+--slack. Times depend on the machine, so refresh the
+baselines with --update-baselines when moving to a different one.
+
+baselines.json also keeps feature_plan_report, which --update-baselines leaves alone: the build
+time and API calls of 11, 31 and 101 pin drives before and after the drive was built from one
+feature plan, see its description.
+"""
+
+import argparse
+import contextlib
+import gc
+import importlib
+import importlib.util
+import io
+import itertools
+import json
+import os
+import sys
+import time
+import tracemalloc
+import types
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ADDIN_FOLDER = os.path.join(os.path.dirname(HERE), 'Cycloid Generator Add In')
+BASELINE_FILE = os.path.join(HERE, 'baselines.json')
+
+PIN_COUNTS = (11, 31, 51, 101)
+# Profile tolerances in cm, the add-in's default is 0.001 cm (0.01 mm).
+TOLERANCES = (0.01, 0.001, 0.0001)
+# Discs per set, a two disc drive should cost little more than one disc.
+DISC_COUNTS = (1, 2)
+
+# Drive parameters in cm, scaled with the pin count so every case builds. From about 41 pins on
+# the lobe tips are undercut, which the dialog rejects, but command_execute trims the loops.
+CYCLOID_RADIUS = 5.0
+DISK_EXTENT_LENGTH = 0.5
+ROLLER_EXTENT_LENGTH = 1.0
+
+# Input changes measured with --updates, as (name, input, function of the old value).
+UPDATES = (
+    ('thickness', 'disk_extent_length', lambda value: value * 1.5),
+    ('pins', 'pin_count', lambda value: value + 2),
+)
+
+# Modules that must not be imported before the command is first opened.
+LAZY_MODULES = ('numpy', 'cycloid_addin.lib.cycloidGeometry', 'cycloid_addin.commands.cycloidGenerator.build')
+
+# Differences below these are treated as noise when comparing with the baselines.
+MIN_TIME_DIFFERENCE = 0.005
+MIN_MEMORY_DIFFERENCE = 64
+
+sys.path.insert(0, os.path.join(HERE, 'fakeadsk'))
+import adsk  # noqa: E402  The recording stand-in, not the Fusion API.
+import adsk.core  # noqa: E402
+
+
+def load_addin():
+    """Loads and starts the add-in the way Fusion does, as the package 'cycloid_addin'.
+
+    :returns:
+        A tuple (entry, startup). entry is the command module with its geometry engine loaded,
+        startup is a dict with the time to import and start the add-in, the time to load the
+        geometry engine on first use, and the lazily loaded modules that were imported at startup.
+    """
+    package = types.ModuleType('cycloid_addin')
+    package.__path__ = [ADDIN_FOLDER]
+    sys.modules['cycloid_addin'] = package
+
+    start = time.perf_counter()
+    spec = importlib.util.spec_from_file_location(
+        'cycloid_addin.addin', os.path.join(ADDIN_FOLDER, 'Cycloid Generator Add In.py'))
+    addin = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = addin
+    with contextlib.redirect_stdout(io.StringIO()):
+        spec.loader.exec_module(addin)
+        addin.run(None)
+    startup_time = time.perf_counter() - start
+    eager = sorted(name for name in LAZY_MODULES if name in sys.modules)
+
+    entry = sys.modules['cycloid_addin.commands.cycloidGenerator.entry']
+    futil = sys.modules['cycloid_addin.lib.fusionAddInUtils']
+    futil.set_profiling(False)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        entry.initialize_engine()
+    first_use_time = time.perf_counter() - start
+
+    # Design records are not saved, writing files would make the times depend on the disk.
+    sys.modules['cycloid_addin.config'].SAVE_DESIGN_RECORDS = False
+    # Build synchronously unless --async is given, so times include the whole build.
+    entry.ASYNC_GENERATION = False
+    # Compute every case from scratch, never from the on-disk cache.
+    entry.profile_cache = entry.geometry.ProfileCache(1)
+    return entry, {'time': startup_time, 'first_use_time': first_use_time, 'eager_modules': eager}
+
+
+class _Input:
+    def __init__(self, value):
+        self.value = value
+
+
+class _Inputs:
+    def __init__(self, values: dict):
+        self._inputs = {key: _Input(value) for key, value in values.items()}
+
+    def itemById(self, input_id: str):
+        return self._inputs.get(input_id)
+
+
+class _Args:
+    def __init__(self, values: dict):
+        self.command = types.SimpleNamespace(commandInputs=_Inputs(values))
+        self.inputs = self.command.commandInputs
+
+
+def case_inputs(pin_count: int, tolerance: float, disc_count: int = 1, build_components: bool = True) -> dict:
+    pin_radius = CYCLOID_RADIUS * 0.5 / pin_count
+    return {
+        'pin_count': pin_count,
+        'cycloid_radius': CYCLOID_RADIUS,
+        'pin_radius': pin_radius,
+        'eccentricity': pin_radius / 2,
+        'disk_extent_length': DISK_EXTENT_LENGTH,
+        'roller_extent_length': ROLLER_EXTENT_LENGTH,
+        'profile_tolerance': tolerance,
+        'disc_count': disc_count,
+        'disc_set_count': 1,
+        'build_components': build_components,
+        'update_existing': True,
+    }
+
+
+def _execute(entry, args):
+    entry.profile_cache.clear()
+    adsk.core.Application.get().reset()
+    adsk.reset()
+    with contextlib.redirect_stdout(io.StringIO()):
+        run_command(entry, args)
+
+
+def run_command(entry, args):
+    """Executes the command and, for a background build, handles its events until it has ended."""
+    entry.command_execute(args)
+    job = entry._job
+    while job is not None and job.is_running:
+        adsk.doEvents()
+        if job.state == 'computing':
+            time.sleep(0.001)
+
+
+def count_bodies(component) -> tuple:
+    """Returns (bodies, occurrences): the modeled bodies of every component once, and all occurrences."""
+    components = {id(component): component}
+    occurrences = 0
+    pending = [component]
+    while pending:
+        for occurrence in pending.pop().occurrences:
+            occurrences += 1
+            if id(occurrence.component) not in components:
+                components[id(occurrence.component)] = occurrence.component
+                pending.append(occurrence.component)
+    return sum(c.bRepBodies.count for c in components.values()), occurrences
+
+
+def run_case(entry, pin_count: int, tolerance: float, disc_count: int, repeat: int,
+             build_components: bool = True) -> dict:
+    """Executes the command for one case and returns its measurements."""
+    args = _Args(case_inputs(pin_count, tolerance, disc_count, build_components))
+
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        _execute(entry, args)
+        times.append(time.perf_counter() - start)
+    api_calls = dict(adsk.calls)
+    bodies, occurrences = count_bodies(adsk.core.Application.get().activeProduct.rootComponent)
+
+    gc.collect()
+    tracemalloc.start()
+    _execute(entry, args)
+    _, peak = tracemalloc.get_traced_memory()
+    blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics('filename'))
+    tracemalloc.stop()
+
+    return {
+        'pin_count': pin_count,
+        'tolerance': tolerance,
+        'disc_count': disc_count,
+        'time': min(times),
+        'peak_kib': peak / 1024,
+        'blocks': blocks,
+        'api_calls': sum(api_calls.values()),
+        'bodies': bodies,
+        'occurrences': occurrences,
+        'calls_by_name': api_calls,
+    }
+
+
+def run_update(entry, pin_count: int, tolerance: float, disc_count: int, repeat: int,
+               build_components: bool, update: tuple) -> dict:
+    """Builds a case, changes one input and measures the run that updates the drive in place."""
+    name, input_id, change = update
+    values = case_inputs(pin_count, tolerance, disc_count, build_components)
+    changed = dict(values, **{input_id: change(values[input_id])})
+
+    # The bodies and occurrences a fresh build of the changed inputs has.
+    _execute(entry, _Args(changed))
+    expected = count_bodies(adsk.core.Application.get().activeProduct.rootComponent)
+
+    times = []
+    for _ in range(repeat):
+        # Geometry cached by the first run is reused, as in the add-in.
+        _execute(entry, _Args(values))
+        adsk.reset()
+        gc.collect()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            run_command(entry, _Args(changed))
+        times.append(time.perf_counter() - start)
+    api_calls = dict(adsk.calls)
+    bodies, occurrences = count_bodies(adsk.core.Application.get().activeProduct.rootComponent)
+    if (bodies, occurrences) != expected:
+        raise AssertionError(f'{name} update left {bodies} bodies and {occurrences} occurrences, '
+                             f'a fresh build has {expected[0]} and {expected[1]}')
+    return {
+        'pin_count': pin_count,
+        'tolerance': tolerance,
+        'disc_count': disc_count,
+        'time': min(times),
+        'peak_kib': 0.0,
+        'blocks': 0,
+        'api_calls': sum(api_calls.values()),
+        'bodies': bodies,
+        'occurrences': occurrences,
+        'calls_by_name': api_calls,
+    }
+
+
+def case_name(pin_count: int, tolerance: float, disc_count: int = 1, build_components: bool = True) -> str:
+    name = f'{pin_count}p@{tolerance:g}'
+    if disc_count > 1:
+        name = f'{name}x{disc_count}'
+    return name if build_components else f'{name}-bodies'
+
+
+def compare(result: dict, baseline: dict, slack: float) -> list:
+    """Returns a list of regressions of a result against its baseline."""
+    regressions = []
+    if result['api_calls'] > baseline['api_calls']:
+        regressions.append(f"API calls {baseline['api_calls']} -> {result['api_calls']}")
+    if result['time'] > baseline['time'] * (1 + slack) + MIN_TIME_DIFFERENCE:
+        regressions.append(f"time {baseline['time'] * 1000:.1f} -> {result['time'] * 1000:.1f} ms")
+    if result['peak_kib'] > baseline['peak_kib'] * (1 + slack) + MIN_MEMORY_DIFFERENCE:
+        regressions.append(f"peak memory {baseline['peak_kib']:.0f} -> {result['peak_kib']:.0f} KiB")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pin-counts', type=int, nargs='+', default=PIN_COUNTS)
+    parser.add_argument('--tolerances', type=float, nargs='+', default=TOLERANCES)
+    parser.add_argument('--disc-counts', type=int, nargs='+', default=DISC_COUNTS)
+    parser.add_argument('--bodies', action='store_true',
+                        help='build all bodies in the root component instead of components')
+    parser.add_argument('--updates', action='store_true',
+                        help='also measure updating each drive in place after an input change')
+    parser.add_argument('--async', dest='async_generation', action='store_true',
+                        help='build in the background with progress events, as in Fusion')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per case, the fastest is kept')
+    parser.add_argument('--slack', type=float, default=0.5,
+                        help='allowed relative increase of time and memory over the baseline')
+    parser.add_argument('--baselines', default=BASELINE_FILE)
+    parser.add_argument('--update-baselines', action='store_true')
+    parser.add_argument('--verbose', action='store_true', help='print the API calls per function')
+    options = parser.parse_args(argv)
+
+    entry, startup = load_addin()
+    entry.ASYNC_GENERATION = options.async_generation
+    baselines = {}
+    if os.path.exists(options.baselines):
+        with open(options.baselines, encoding='utf-8') as file:
+            baselines = json.load(file)
+
+    failed = bool(startup['eager_modules'])
+    status = 'REGRESSION: imported at startup ' + ', '.join(startup['eager_modules']) if failed else 'ok'
+    baseline = baselines.get('startup')
+    if baseline and startup['time'] > baseline['time'] * (1 + options.slack) + MIN_TIME_DIFFERENCE:
+        failed = True
+        status = f"REGRESSION: startup {baseline['time'] * 1000:.1f} -> {startup['time'] * 1000:.1f} ms"
+    print(f"startup {startup['time'] * 1000:.1f} ms, geometry engine on first use "
+          f"{startup['first_use_time'] * 1000:.1f} ms  {status}")
+    print()
+
+    print(f"{'case':>20} {'time ms':>9} {'peak KiB':>9} {'blocks':>8} {'API calls':>10} {'bodies':>7} {'occurrences':>12}  status")
+    results = {'startup': {'time': startup['time']}}
+    updates = (None,) + UPDATES if options.updates else (None,)
+    cases = itertools.product(options.pin_counts, options.tolerances, options.disc_counts, updates)
+    for pin_count, tolerance, disc_count, update in cases:
+        name = case_name(pin_count, tolerance, disc_count, not options.bodies)
+        if update is None:
+            result = run_case(entry, pin_count, tolerance, disc_count, options.repeat, not options.bodies)
+        else:
+            name = f'{name}+{update[0]}'
+            result = run_update(entry, pin_count, tolerance, disc_count, options.repeat, not options.bodies, update)
+        if options.async_generation:
+            name = f'{name}~async'
+        results[name] = result
+        baseline = baselines.get(name)
+        if options.update_baselines:
+            status = 'stored'
+        elif baseline is None:
+            status = 'no baseline'
+        else:
+            regressions = compare(result, baseline, options.slack)
+            failed = failed or bool(regressions)
+            status = 'REGRESSION: ' + ', '.join(regressions) if regressions else 'ok'
+        print(f"{name:>20} {result['time'] * 1000:9.1f} {result['peak_kib']:9.0f} {result['blocks']:8d} "
+              f"{result['api_calls']:10d} {result['bodies']:7d} {result['occurrences']:12d}  {status}")
+        if options.async_generation and entry._job is not None:
+            print(f"{'':>22}longest chunk {entry._job.max_chunk_time * 1000:.1f} ms")
+        if options.verbose:
+            for call, count in sorted(result['calls_by_name'].items()):
+                print(f'{"":>22}{call}: {count}')
+
+    if options.update_baselines:
+        baselines.update(results)
+        with open(options.baselines, 'w', encoding='utf-8') as file:
+            json.dump(baselines, file, indent=2, sort_keys=True)
+            file.write('\n')
+        print(f'Baselines written to {options.baselines}')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
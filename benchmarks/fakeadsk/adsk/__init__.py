@@ -0,0 +1,37 @@
+# Recording stand-in for the subset of the Fusion API used by the Cycloid Generator Add-In.
+# Put the benchmarks/fakeadsk folder first on sys.path to import it as `adsk`. Every API call
+# made through the fake is counted in `calls`, so benchmarks can measure API usage headless.
+
+from collections import Counter
+
+calls = Counter()
+
+
+def record(name: str, count: int = 1):
+    calls[name] += count
+
+
+def reset():
+    """Clears the recorded API calls."""
+    calls.clear()
+
+
+def total_calls() -> int:
+    return sum(calls.values())
+
+
+def terminate():
+    pass
+
+
+def autoTerminate(value: bool):
+    pass
+
+
+def doEvents():
+    # Fired custom events are handled here, see core.Application.do_events.
+    record('doEvents')
+    core.Application.get().do_events()
+
+
+from . import core, fusion
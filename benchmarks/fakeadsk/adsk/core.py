@@ -0,0 +1,409 @@
+import itertools
+import math
+import queue
+from enum import IntEnum
+
+from . import record
+
+_tokens = itertools.count()
+
+
+def _token(kind: str) -> str:
+    return f'{kind}:{next(_tokens)}'
+
+
+class LogLevels(IntEnum):
+    InfoLogLevel = 0
+    WarningLogLevel = 1
+    ErrorLogLevel = 2
+
+
+class LogTypes(IntEnum):
+    ConsoleLogType = 0
+    FileLogType = 1
+
+
+class Point3D:
+    __slots__ = ('x', 'y', 'z')
+
+    def __init__(self, x: float = 0.0, y: float = 0.0, z: float = 0.0):
+        self.x = x
+        self.y = y
+        self.z = z
+
+    @staticmethod
+    def create(x: float = 0.0, y: float = 0.0, z: float = 0.0) -> 'Point3D':
+        record('Point3D.create')
+        return Point3D(x, y, z)
+
+
+class Vector3D:
+    __slots__ = ('x', 'y', 'z')
+
+    def __init__(self, x: float = 0.0, y: float = 0.0, z: float = 0.0):
+        self.x = x
+        self.y = y
+        self.z = z
+
+    @staticmethod
+    def create(x: float = 0.0, y: float = 0.0, z: float = 0.0) -> 'Vector3D':
+        record('Vector3D.create')
+        return Vector3D(x, y, z)
+
+    def copy(self) -> 'Vector3D':
+        record('Vector3D.copy')
+        return Vector3D(self.x, self.y, self.z)
+
+    def crossProduct(self, other: 'Vector3D') -> 'Vector3D':
+        record('Vector3D.crossProduct')
+        return Vector3D(self.y * other.z - self.z * other.y,
+                        self.z * other.x - self.x * other.z,
+                        self.x * other.y - self.y * other.x)
+
+    def scaleBy(self, scale: float) -> bool:
+        record('Vector3D.scaleBy')
+        self.x *= scale
+        self.y *= scale
+        self.z *= scale
+        return True
+
+
+class Matrix3D:
+    # Rotation and translation only, stored as a 3x3 rotation and a translation vector.
+
+    def __init__(self):
+        self._rotation = [[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]]
+        self._translation = [0.0, 0.0, 0.0]
+
+    @staticmethod
+    def create() -> 'Matrix3D':
+        record('Matrix3D.create')
+        return Matrix3D()
+
+    @property
+    def translation(self) -> Vector3D:
+        return Vector3D(*self._translation)
+
+    @translation.setter
+    def translation(self, vector: Vector3D):
+        record('Matrix3D.translation')
+        self._translation = [vector.x, vector.y, vector.z]
+
+    def setToRotation(self, angle: float, axis: Vector3D, origin: Point3D) -> bool:
+        record('Matrix3D.setToRotation')
+        length = math.sqrt(axis.x ** 2 + axis.y ** 2 + axis.z ** 2)
+        x, y, z = axis.x / length, axis.y / length, axis.z / length
+        c, s = math.cos(angle), math.sin(angle)
+        t = 1 - c
+        self._rotation = [
+            [t * x * x + c, t * x * y - s * z, t * x * z + s * y],
+            [t * x * y + s * z, t * y * y + c, t * y * z - s * x],
+            [t * x * z - s * y, t * y * z + s * x, t * z * z + c],
+        ]
+        center = (origin.x, origin.y, origin.z)
+        self._translation = [center[i] - sum(self._rotation[i][j] * center[j] for j in range(3)) for i in range(3)]
+        return True
+
+    def transformBy(self, matrix: 'Matrix3D') -> bool:
+        # self = matrix * self, as in the Fusion API.
+        record('Matrix3D.transformBy')
+        rotation = [[sum(matrix._rotation[i][k] * self._rotation[k][j] for k in range(3)) for j in range(3)]
+                    for i in range(3)]
+        translation = [sum(matrix._rotation[i][k] * self._translation[k] for k in range(3)) + matrix._translation[i]
+                       for i in range(3)]
+        self._rotation, self._translation = rotation, translation
+        return True
+
+    def apply(self, x: float, y: float, z: float) -> tuple:
+        """Transforms a point, for checks in benchmarks. Not part of the Fusion API."""
+        return tuple(sum(self._rotation[i][j] * (x, y, z)[j] for j in range(3)) + self._translation[i]
+                     for i in range(3))
+
+
+class ObjectCollection:
+    def __init__(self):
+        self._items = []
+
+    @staticmethod
+    def create() -> 'ObjectCollection':
+        record('ObjectCollection.create')
+        return ObjectCollection()
+
+    def add(self, item) -> bool:
+        record('ObjectCollection.add')
+        self._items.append(item)
+        return True
+
+    @property
+    def count(self) -> int:
+        return len(self._items)
+
+    def item(self, index: int):
+        return self._items[index]
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __len__(self):
+        return len(self._items)
+
+
+class ValueInput:
+    def __init__(self, real_value: float = None, string_value: str = None):
+        self.realValue = real_value
+        self.stringValue = string_value
+
+    @staticmethod
+    def createByReal(value: float) -> 'ValueInput':
+        record('ValueInput.createByReal')
+        return ValueInput(real_value=value)
+
+    @staticmethod
+    def createByString(value: str) -> 'ValueInput':
+        record('ValueInput.createByString')
+        return ValueInput(string_value=value)
+
+
+class Viewport:
+    def refresh(self):
+        record('Viewport.refresh')
+
+
+class CommandCreatedEventHandler:
+    def notify(self, args):
+        pass
+
+
+class CommandCreatedEvent:
+    def __init__(self):
+        self.handlers = []
+
+    def add(self, handler: 'CommandCreatedEventHandler') -> bool:
+        record('CommandCreatedEvent.add')
+        self.handlers.append(handler)
+        return True
+
+    def remove(self, handler: 'CommandCreatedEventHandler') -> bool:
+        record('CommandCreatedEvent.remove')
+        if handler not in self.handlers:
+            return False
+        self.handlers.remove(handler)
+        return True
+
+
+class CommandDefinition:
+    def __init__(self, command_id: str, name: str):
+        self.id = command_id
+        self.name = name
+        self.commandCreated = CommandCreatedEvent()
+
+    def deleteMe(self) -> bool:
+        record('CommandDefinition.deleteMe')
+        return True
+
+
+class CommandDefinitions:
+    def __init__(self):
+        self._items = {}
+
+    def addButtonDefinition(self, command_id: str, name: str, tooltip: str, resource_folder: str = ''):
+        record('CommandDefinitions.addButtonDefinition')
+        definition = self._items[command_id] = CommandDefinition(command_id, name)
+        return definition
+
+    def itemById(self, command_id: str):
+        record('CommandDefinitions.itemById')
+        return self._items.get(command_id)
+
+
+class CommandControl:
+    def __init__(self, definition: CommandDefinition):
+        self.id = definition.id
+        self.commandDefinition = definition
+        self.isPromoted = False
+
+    def deleteMe(self) -> bool:
+        record('CommandControl.deleteMe')
+        return True
+
+
+class ToolbarControls:
+    def __init__(self):
+        self._items = {}
+
+    def addCommand(self, definition: CommandDefinition, position_id: str = '', is_before: bool = True):
+        record('ToolbarControls.addCommand')
+        control = self._items[definition.id] = CommandControl(definition)
+        return control
+
+    def itemById(self, control_id: str):
+        record('ToolbarControls.itemById')
+        return self._items.get(control_id)
+
+
+class _ById:
+    # Workspaces and toolbar panels, every id exists.
+    def __init__(self, factory):
+        self._factory = factory
+        self._items = {}
+
+    def itemById(self, item_id: str):
+        record(f'{type(self).__name__}.itemById')
+        if item_id not in self._items:
+            self._items[item_id] = self._factory()
+        return self._items[item_id]
+
+
+class ToolbarPanels(_ById):
+    pass
+
+
+class Workspaces(_ById):
+    pass
+
+
+class ToolbarPanel:
+    def __init__(self):
+        self.controls = ToolbarControls()
+
+
+class Workspace:
+    def __init__(self):
+        self.toolbarPanels = ToolbarPanels(ToolbarPanel)
+
+
+class ProgressDialog:
+    def __init__(self):
+        self.isShowing = False
+        self.isCancelButtonShown = True
+        self.cancelButtonText = 'Cancel'
+        self.isBackgroundTranslucent = True
+        self.title = ''
+        self.message = ''
+        self.minimumValue = 0
+        self.maximumValue = 100
+        self.progressValue = 0
+        # Set by a benchmark to simulate pressing the cancel button.
+        self.wasCancelled = False
+
+    def show(self, title: str, message: str, minimum: int, maximum: int, delay: int = 0) -> bool:
+        record('ProgressDialog.show')
+        self.title, self.message = title, message
+        self.minimumValue, self.maximumValue = minimum, maximum
+        self.isShowing = True
+        return True
+
+    def hide(self) -> bool:
+        record('ProgressDialog.hide')
+        self.isShowing = False
+        return True
+
+
+class UserInterface:
+    def __init__(self):
+        self.commandDefinitions = CommandDefinitions()
+        self.workspaces = Workspaces(Workspace)
+        self.progressDialogs = []
+
+    def messageBox(self, text: str, *args):
+        record('UserInterface.messageBox')
+
+    def createProgressDialog(self) -> ProgressDialog:
+        record('UserInterface.createProgressDialog')
+        dialog = ProgressDialog()
+        self.progressDialogs.append(dialog)
+        return dialog
+
+
+class CustomEventHandler:
+    def notify(self, args):
+        pass
+
+
+class CustomEventArgs:
+    def __init__(self, event_id: str, additional_info: str):
+        self.firingEvent = event_id
+        self.additionalInfo = additional_info
+
+
+class CustomEvent:
+    def __init__(self, event_id: str):
+        self.eventId = event_id
+        self.handlers = []
+
+    def add(self, handler: 'CustomEventHandler') -> bool:
+        record('CustomEvent.add')
+        self.handlers.append(handler)
+        return True
+
+    def remove(self, handler: 'CustomEventHandler') -> bool:
+        record('CustomEvent.remove')
+        if handler not in self.handlers:
+            return False
+        self.handlers.remove(handler)
+        return True
+
+
+class Application:
+    _instance = None
+
+    def __init__(self):
+        from . import fusion
+        self.userInterface = UserInterface()
+        self.activeProduct = fusion.Design()
+        self.activeViewport = Viewport()
+        self.messages = []
+        self._custom_events = {}
+        # Fired custom events waiting for do_events, fireCustomEvent may be called from any thread.
+        self._pending = queue.Queue()
+
+    @staticmethod
+    def get() -> 'Application':
+        if Application._instance is None:
+            Application._instance = Application()
+        return Application._instance
+
+    def log(self, message: str, level=LogLevels.InfoLogLevel, log_type=LogTypes.ConsoleLogType):
+        self.messages.append(message)
+
+    def registerCustomEvent(self, event_id: str) -> CustomEvent:
+        record('Application.registerCustomEvent')
+        event = self._custom_events[event_id] = CustomEvent(event_id)
+        return event
+
+    def unregisterCustomEvent(self, event_id: str) -> bool:
+        record('Application.unregisterCustomEvent')
+        return self._custom_events.pop(event_id, None) is not None
+
+    def fireCustomEvent(self, event_id: str, additional_info: str = '') -> bool:
+        # No record, this is the one call that is allowed from worker threads.
+        self._pending.put((event_id, additional_info))
+        return True
+
+    def do_events(self) -> int:
+        """Runs the handlers of the custom events fired so far, as one pass of Fusion's event loop would.
+
+        Events fired by the handlers wait for the next pass. Not part of the Fusion API.
+        Returns the number of events handled.
+        """
+        handled = 0
+        for _ in range(self._pending.qsize()):
+            event_id, additional_info = self._pending.get_nowait()
+            event = self._custom_events.get(event_id)
+            for handler in event.handlers if event else ():
+                handler.notify(CustomEventArgs(event_id, additional_info))
+            handled += 1
+        return handled
+
+    def reset(self):
+        """Starts a new, empty design."""
+        from . import fusion
+        self.activeProduct = fusion.Design()
+        self.messages = []
+
+
+def __getattr__(name: str):
+    # Event, event argument and command input types are only used in annotations by the add-in.
+    cls = type(name, (), {})
+    globals()[name] = cls
+    return cls
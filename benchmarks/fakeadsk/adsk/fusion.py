@@ -0,0 +1,754 @@
+import math
+from enum import IntEnum
+
+from . import record
+from .core import Matrix3D, ObjectCollection, Point3D, Vector3D, _token
+
+
+class FeatureOperations(IntEnum):
+    JoinFeatureOperation = 0
+    CutFeatureOperation = 1
+    IntersectFeatureOperation = 2
+    NewBodyFeatureOperation = 3
+    NewComponentFeatureOperation = 4
+
+
+class DesignTypes(IntEnum):
+    DirectDesignType = 0
+    ParametricDesignType = 1
+
+
+class _Collection:
+    def __init__(self, items=None):
+        self._items = list(items or [])
+
+    @property
+    def count(self) -> int:
+        return len(self._items)
+
+    def item(self, index: int):
+        return self._items[index]
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __len__(self):
+        return len(self._items)
+
+
+# Sketch x and y directions in model space of the construction planes.
+_PLANE_DIRECTIONS = {
+    'xY': ((1.0, 0.0, 0.0), (0.0, 1.0, 0.0)),
+    'xZ': ((1.0, 0.0, 0.0), (0.0, 0.0, -1.0)),
+    'yZ': ((0.0, 0.0, 1.0), (0.0, 1.0, 0.0)),
+}
+
+
+# Every attribute added in the active design, for Design.findAttributes.
+_attributes = []
+
+
+class Attribute:
+    def __init__(self, parent, group_name: str, name: str, value: str):
+        self._parent = parent
+        self.groupName = group_name
+        self.name = name
+        self.value = value
+
+    @property
+    def parent(self):
+        return self._parent if self._parent.isValid else None
+
+
+class Attributes:
+    def __init__(self, parent):
+        self._parent = parent
+        self._items = {}
+
+    def add(self, group_name: str, name: str, value: str) -> Attribute:
+        # Adding an existing group and name updates its value, as in the Fusion API.
+        record('Attributes.add')
+        attribute = self._items.get((group_name, name))
+        if attribute is None:
+            attribute = self._items[group_name, name] = Attribute(self._parent, group_name, name, value)
+            _attributes.append(attribute)
+        attribute.value = value
+        return attribute
+
+    def itemByName(self, group_name: str, name: str):
+        record('Attributes.itemByName')
+        return self._items.get((group_name, name))
+
+
+class _Entity:
+    # Base of the entities that can carry attributes and be deleted.
+    _owner = None
+
+    @property
+    def attributes(self) -> Attributes:
+        if '_attribute_items' not in self.__dict__:
+            self._attribute_items = Attributes(self)
+        return self._attribute_items
+
+    @property
+    def isValid(self) -> bool:
+        # Entities of a deleted component are deleted with it.
+        if self.__dict__.get('_deleted', False):
+            return False
+        parent = self.__dict__.get('parentComponent')
+        return parent is None or parent.isValid
+
+    def deleteMe(self) -> bool:
+        record(f'{type(self).__name__}.deleteMe')
+        self._deleted = True
+        if self._owner is not None and self in self._owner._items:
+            self._owner._items.remove(self)
+        return True
+
+
+class ConstructionPlane:
+    def __init__(self, name: str):
+        self.name = name
+
+
+class ConstructionAxis:
+    def __init__(self, name: str):
+        self.name = name
+
+
+class SketchPoint:
+    __slots__ = ('geometry', 'entityToken')
+
+    def __init__(self, geometry):
+        self.geometry = geometry
+        self.entityToken = _token('SketchPoint')
+
+
+def _sketch_point(point) -> SketchPoint:
+    return point if isinstance(point, SketchPoint) else SketchPoint(point)
+
+
+class SketchLine(_Entity):
+    def __init__(self, sketch, start: SketchPoint, end: SketchPoint):
+        self.parentSketch = sketch
+        self.startSketchPoint = start
+        self.endSketchPoint = end
+        self.entityToken = _token('SketchLine')
+
+
+class SketchCircle(_Entity):
+    def __init__(self, sketch, center, radius: float):
+        self.parentSketch = sketch
+        self.centerSketchPoint = SketchPoint(center)
+        self.radius = radius
+        self.entityToken = _token('SketchCircle')
+
+
+class SketchFittedSpline(_Entity):
+    def __init__(self, sketch, points):
+        self.parentSketch = sketch
+        self.fitPoints = [SketchPoint(point) for point in points]
+        self.isClosed = False
+        self.entityToken = _token('SketchFittedSpline')
+
+
+class SketchLines:
+    def __init__(self, sketch):
+        self._sketch = sketch
+
+    def addByTwoPoints(self, start, end) -> SketchLine:
+        record('SketchLines.addByTwoPoints')
+        line = SketchLine(self._sketch, _sketch_point(start), _sketch_point(end))
+        self._sketch._add_curve(line)
+        return line
+
+
+class SketchCircles:
+    def __init__(self, sketch):
+        self._sketch = sketch
+
+    def addByCenterRadius(self, center, radius: float) -> SketchCircle:
+        record('SketchCircles.addByCenterRadius')
+        circle = SketchCircle(self._sketch, center, radius)
+        self._sketch._add_curve(circle)
+        return circle
+
+
+class SketchFittedSplines:
+    def __init__(self, sketch):
+        self._sketch = sketch
+
+    def add(self, points: ObjectCollection) -> SketchFittedSpline:
+        record('SketchFittedSplines.add')
+        spline = SketchFittedSpline(self._sketch, list(points))
+        self._sketch._add_curve(spline)
+        return spline
+
+
+def _rotated(point: Point3D, cos_a: float, sin_a: float) -> Point3D:
+    return Point3D(point.x * cos_a - point.y * sin_a, point.x * sin_a + point.y * cos_a, point.z)
+
+
+class CircularPatternConstraintInput:
+    def __init__(self, entities, center: SketchPoint):
+        self.entities = list(entities)
+        self.centerPoint = center
+        self.quantity = None
+        self.totalAngle = None
+
+
+class CircularPatternConstraint(_Entity):
+    def __init__(self, sketch, pattern_input: CircularPatternConstraintInput):
+        # Copies are made about the sketch origin, the only centre the add-in uses.
+        self.parentSketch = sketch
+        quantity = int(pattern_input.quantity.realValue)
+        total = pattern_input.totalAngle.realValue
+        steps = quantity if math.isclose(total, 2 * math.pi) else quantity - 1
+        self.createdEntities = []
+        for index in range(1, quantity):
+            angle = total * index / steps
+            cos_a, sin_a = math.cos(angle), math.sin(angle)
+            # Connected curves stay connected, they share the copies of their sketch points.
+            points = {}
+
+            def copy(point: SketchPoint) -> SketchPoint:
+                if id(point) not in points:
+                    points[id(point)] = SketchPoint(_rotated(point.geometry, cos_a, sin_a))
+                return points[id(point)]
+
+            for entity in pattern_input.entities:
+                if isinstance(entity, SketchLine):
+                    curve = SketchLine(sketch, copy(entity.startSketchPoint), copy(entity.endSketchPoint))
+                elif isinstance(entity, SketchFittedSpline):
+                    curve = SketchFittedSpline(sketch, [_rotated(p.geometry, cos_a, sin_a) for p in entity.fitPoints])
+                    curve.isClosed = entity.isClosed
+                else:
+                    center = entity.centerSketchPoint.geometry
+                    curve = SketchCircle(sketch, _rotated(center, cos_a, sin_a), entity.radius)
+                sketch._add_curve(curve)
+                self.createdEntities.append(curve)
+        self.entityToken = _token('CircularPatternConstraint')
+
+
+class GeometricConstraints:
+    def __init__(self, sketch):
+        self._sketch = sketch
+
+    def createCircularPatternInput(self, entities, center: SketchPoint) -> CircularPatternConstraintInput:
+        record('GeometricConstraints.createCircularPatternInput')
+        return CircularPatternConstraintInput(entities, center)
+
+    def addCircularPattern(self, pattern_input: CircularPatternConstraintInput) -> CircularPatternConstraint:
+        record('GeometricConstraints.addCircularPattern')
+        return CircularPatternConstraint(self._sketch, pattern_input)
+
+
+class SketchCurves:
+    def __init__(self, sketch):
+        self._sketch = sketch
+        self.sketchLines = SketchLines(sketch)
+        self.sketchCircles = SketchCircles(sketch)
+        self.sketchFittedSplines = SketchFittedSplines(sketch)
+
+    @property
+    def count(self) -> int:
+        return len(self._sketch._curves)
+
+    def item(self, index: int):
+        record('SketchCurves.item')
+        return self._sketch._curves[index]
+
+    def __iter__(self):
+        return iter(list(self._sketch._curves))
+
+
+class ProfileCurve:
+    __slots__ = ('sketchEntity',)
+
+    def __init__(self, entity):
+        self.sketchEntity = entity
+
+
+class ProfileLoop:
+    def __init__(self, loop, is_outer: bool):
+        self.isOuter = is_outer
+        self.profileCurves = _Collection(ProfileCurve(curve) for curve in loop.curves)
+
+
+class Profile:
+    def __init__(self, sketch, outer, inner):
+        self.parentSketch = sketch
+        self.profileLoops = _Collection([ProfileLoop(outer, True)] + [ProfileLoop(loop, False) for loop in inner])
+        self.area = outer.area - sum(loop.area for loop in inner)
+
+
+class _Loop:
+    # A closed loop of sketch curves, approximated as a circle or a polygon for containment tests.
+
+    def __init__(self, curves, circle=None, polygon=None):
+        self.curves = curves
+        self.circle = circle
+        self.polygon = polygon
+        if circle is not None:
+            self.area = math.pi * circle[2] ** 2
+            self.sample = (circle[0] + circle[2], circle[1])
+            self.bounds = (circle[0] - circle[2], circle[1] - circle[2], circle[0] + circle[2], circle[1] + circle[2])
+        else:
+            xs = [p[0] for p in polygon]
+            ys = [p[1] for p in polygon]
+            self.area = abs(sum(xs[i - 1] * ys[i] - xs[i] * ys[i - 1] for i in range(len(xs)))) / 2
+            self.sample = polygon[0]
+            self.bounds = (min(xs), min(ys), max(xs), max(ys))
+
+    def contains(self, other: '_Loop') -> bool:
+        if other.area >= self.area:
+            return False
+        x, y = other.sample
+        if self.circle is not None:
+            cx, cy, r = self.circle
+            return math.hypot(x - cx, y - cy) < r
+        x0, y0, x1, y1 = self.bounds
+        if not (x0 <= x <= x1 and y0 <= y <= y1):
+            return False
+        inside = False
+        polygon = self.polygon
+        px, py = polygon[-1]
+        for qx, qy in polygon:
+            if (qy > y) != (py > y) and x < (px - qx) * (y - qy) / (py - qy) + qx:
+                inside = not inside
+            px, py = qx, qy
+        return inside
+
+
+def _coincident(a: tuple, b: tuple) -> bool:
+    return abs(a[0] - b[0]) < 1e-9 and abs(a[1] - b[1]) < 1e-9
+
+
+class Sketch(_Entity):
+    def __init__(self, component, plane):
+        self._owner = component.sketches
+        self.parentComponent = component
+        self.referencePlane = plane
+        self.isComputeDeferred = False
+        self.sketchCurves = SketchCurves(self)
+        self.geometricConstraints = GeometricConstraints(self)
+        self.originPoint = SketchPoint(Point3D())
+        x_direction, y_direction = _PLANE_DIRECTIONS[plane.name]
+        self.xDirection = Vector3D(*x_direction)
+        self.yDirection = Vector3D(*y_direction)
+        self.origin = Point3D()
+        self.entityToken = _token('Sketch')
+        self._curves = []
+        self._profiles = None
+
+    def _add_curve(self, curve):
+        curve._owner = self
+        self._curves.append(curve)
+        self._profiles = None
+
+    @property
+    def _items(self) -> list:
+        # Deleting a curve removes it from _items, which is the curve list.
+        self._profiles = None
+        return self._curves
+
+    def _loops(self):
+        loops = []
+        # Open chains as [curves, points, start, end], every curve is appended at the end of one.
+        chains = []
+        for curve in self._curves:
+            if isinstance(curve, SketchCircle):
+                center = curve.centerSketchPoint.geometry
+                loops.append(_Loop([curve], circle=(center.x, center.y, curve.radius)))
+                continue
+            if isinstance(curve, SketchFittedSpline):
+                points = [(p.geometry.x, p.geometry.y) for p in curve.fitPoints]
+                if curve.isClosed:
+                    loops.append(_Loop([curve], polygon=points))
+                    continue
+            else:
+                points = [(p.geometry.x, p.geometry.y) for p in (curve.startSketchPoint, curve.endSketchPoint)]
+            # Open curves whose end points coincide form one chain, a closed chain is a loop.
+            chain = next((chain for chain in chains if _coincident(chain[3], points[0])), None)
+            if chain is None:
+                chain = [[], [], points[0], None]
+                chains.append(chain)
+            chain[0].append(curve)
+            chain[1].extend(points[:-1])
+            chain[3] = points[-1]
+            if _coincident(chain[2], chain[3]):
+                chains.remove(chain)
+                loops.append(_Loop(chain[0], polygon=chain[1]))
+        return loops
+
+    @property
+    def profiles(self) -> _Collection:
+        record('Sketch.profiles')
+        if self._profiles is None:
+            loops = self._loops()
+            profiles = []
+            for outer in loops:
+                contained = [loop for loop in loops if loop is not outer and outer.contains(loop)]
+                # Only loops directly inside the outer loop are its inner loops.
+                inner = [loop for loop in contained if not any(other.contains(loop) for other in contained)]
+                profiles.append(Profile(self, outer, inner))
+            self._profiles = _Collection(profiles)
+        return self._profiles
+
+
+class Sketches(_Collection):
+    def __init__(self, component):
+        super().__init__()
+        self._component = component
+
+    def add(self, plane) -> Sketch:
+        record('Sketches.add')
+        sketch = Sketch(self._component, plane)
+        self._items.append(sketch)
+        return sketch
+
+
+class BRepBody:
+    def __init__(self, component, source, volume: float = 0.0):
+        self.parentComponent = component
+        self.source = source
+        self.volume = volume
+        self.transform = None
+        self.entityToken = _token('BRepBody')
+
+
+class BRepBodies(_Collection):
+    pass
+
+
+class ExtrudeFeatureInput:
+    def __init__(self, profiles, operation):
+        self.profiles = profiles
+        self.operation = operation
+        self.distance = None
+
+    def setDistanceExtent(self, is_symmetric: bool, distance) -> bool:
+        record('ExtrudeFeatureInput.setDistanceExtent')
+        self.distance = distance
+        return True
+
+
+class ModelParameter:
+    def __init__(self, value: float):
+        self._value = value
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    @value.setter
+    def value(self, value: float):
+        record('ModelParameter.value')
+        self._value = value
+
+
+class DistanceExtentDefinition:
+    def __init__(self, distance: float):
+        self.distance = ModelParameter(distance)
+
+
+class Timeline:
+    def __init__(self):
+        self.markerPosition = 0
+
+    def moveToEnd(self) -> bool:
+        record('Timeline.moveToEnd')
+        return True
+
+
+class TimelineObject:
+    def rollTo(self, roll_before: bool) -> bool:
+        record('TimelineObject.rollTo')
+        return True
+
+
+def _remove_bodies(feature):
+    for body in feature.bodies:
+        if body in feature.parentComponent.bRepBodies._items:
+            feature.parentComponent.bRepBodies._items.remove(body)
+
+
+class ExtrudeFeature(_Entity):
+    def __init__(self, component, extrude_input, bodies):
+        self._owner = component.features.extrudeFeatures
+        self.parentComponent = component
+        self.operation = extrude_input.operation
+        self.bodies = _Collection(bodies)
+        self.extentOne = DistanceExtentDefinition(extrude_input.distance.realValue or 0.0)
+        self.timelineObject = TimelineObject()
+        self.entityToken = _token('ExtrudeFeature')
+        self._profile = extrude_input.profiles
+
+    @property
+    def profile(self):
+        return self._profile
+
+    @profile.setter
+    def profile(self, profiles):
+        # The bodies are rebuilt from the new profiles, the feature keeps its identity.
+        record('ExtrudeFeature.profile')
+        self._profile = profiles
+        if self.operation == FeatureOperations.NewBodyFeatureOperation:
+            _remove_bodies(self)
+            height = abs(self.extentOne.distance.value)
+            bodies = [BRepBody(self.parentComponent, profile, profile.area * height) for profile in profiles]
+            self.parentComponent.bRepBodies._items.extend(bodies)
+            self.bodies = _Collection(bodies)
+
+    def deleteMe(self) -> bool:
+        _remove_bodies(self)
+        return super().deleteMe()
+
+
+class ExtrudeFeatures(_Collection):
+    def __init__(self, component):
+        super().__init__()
+        self._component = component
+
+    def createInput(self, profiles, operation) -> ExtrudeFeatureInput:
+        record('ExtrudeFeatures.createInput')
+        return ExtrudeFeatureInput(profiles, operation)
+
+    def add(self, extrude_input: ExtrudeFeatureInput) -> ExtrudeFeature:
+        record('ExtrudeFeatures.add')
+        profiles = extrude_input.profiles
+        profiles = list(profiles) if isinstance(profiles, ObjectCollection) else [profiles]
+        bodies = []
+        if extrude_input.operation == FeatureOperations.NewBodyFeatureOperation:
+            height = abs(extrude_input.distance.realValue or 0.0)
+            bodies = [BRepBody(self._component, profile, profile.area * height) for profile in profiles]
+            self._component.bRepBodies._items.extend(bodies)
+        feature = ExtrudeFeature(self._component, extrude_input, bodies)
+        self._items.append(feature)
+        return feature
+
+
+class CircularPatternFeatureInput:
+    def __init__(self, entities, axis):
+        self.inputEntities = entities
+        self.axis = axis
+        self.quantity = None
+        self.totalAngle = None
+        self.isSymmetric = False
+
+
+class CircularPatternFeature:
+    def __init__(self, component, pattern_input, bodies):
+        self.parentComponent = component
+        self.bodies = _Collection(bodies)
+        self.entityToken = _token('CircularPatternFeature')
+
+
+class CircularPatternFeatures(_Collection):
+    def __init__(self, component):
+        super().__init__()
+        self._component = component
+
+    def createInput(self, entities, axis) -> CircularPatternFeatureInput:
+        record('CircularPatternFeatures.createInput')
+        return CircularPatternFeatureInput(entities, axis)
+
+    def add(self, pattern_input: CircularPatternFeatureInput) -> CircularPatternFeature:
+        record('CircularPatternFeatures.add')
+        copies = max(int(pattern_input.quantity.realValue or 1) - 1, 0)
+        bodies = [BRepBody(self._component, entity, getattr(entity, 'volume', 0.0))
+                  for entity in pattern_input.inputEntities if isinstance(entity, BRepBody)
+                  for _ in range(copies)]
+        self._component.bRepBodies._items.extend(bodies)
+        feature = CircularPatternFeature(self._component, pattern_input, bodies)
+        self._items.append(feature)
+        return feature
+
+
+class CopyPasteBody(_Entity):
+    def __init__(self, component, bodies):
+        self._owner = component.features.copyPasteBodies
+        self.parentComponent = component
+        self.bodies = _Collection(bodies)
+        self.entityToken = _token('CopyPasteBody')
+
+    def deleteMe(self) -> bool:
+        _remove_bodies(self)
+        return super().deleteMe()
+
+
+class CopyPasteBodies(_Collection):
+    def __init__(self, component):
+        super().__init__()
+        self._component = component
+
+    def add(self, bodies) -> CopyPasteBody:
+        record('CopyPasteBodies.add')
+        sources = list(bodies) if isinstance(bodies, ObjectCollection) else [bodies]
+        copies = [BRepBody(self._component, body, body.volume) for body in sources]
+        self._component.bRepBodies._items.extend(copies)
+        feature = CopyPasteBody(self._component, copies)
+        self._items.append(feature)
+        return feature
+
+
+class MoveFeatureInput:
+    def __init__(self, entities):
+        self.inputEntities = entities
+        self.transform = None
+
+    def defineAsFreeMove(self, transform: Matrix3D) -> bool:
+        record('MoveFeatureInput.defineAsFreeMove')
+        self.transform = transform
+        return True
+
+
+class MoveFeature(_Entity):
+    def __init__(self, component, move_input):
+        self._owner = component.features.moveFeatures
+        self.parentComponent = component
+        self.inputEntities = move_input.inputEntities
+        self.transform = move_input.transform
+        self.entityToken = _token('MoveFeature')
+
+
+class MoveFeatures(_Collection):
+    def __init__(self, component):
+        super().__init__()
+        self._component = component
+
+    def createInput2(self, entities) -> MoveFeatureInput:
+        record('MoveFeatures.createInput2')
+        return MoveFeatureInput(entities)
+
+    def add(self, move_input: MoveFeatureInput) -> MoveFeature:
+        record('MoveFeatures.add')
+        feature = MoveFeature(self._component, move_input)
+        for body in move_input.inputEntities:
+            body.transform = move_input.transform
+        self._items.append(feature)
+        return feature
+
+
+class BaseFeature(_Entity):
+    def __init__(self, component):
+        self._owner = component.features.baseFeatures
+        self.parentComponent = component
+        self.isEditing = False
+        self.entityToken = _token('BaseFeature')
+
+    def startEdit(self) -> bool:
+        record('BaseFeature.startEdit')
+        self.isEditing = True
+        return True
+
+    def finishEdit(self) -> bool:
+        record('BaseFeature.finishEdit')
+        self.isEditing = False
+        return True
+
+
+class BaseFeatures(_Collection):
+    def __init__(self, component):
+        super().__init__()
+        self._component = component
+
+    def add(self) -> BaseFeature:
+        record('BaseFeatures.add')
+        feature = BaseFeature(self._component)
+        self._items.append(feature)
+        return feature
+
+
+class Features:
+    def __init__(self, component):
+        self.extrudeFeatures = ExtrudeFeatures(component)
+        self.circularPatternFeatures = CircularPatternFeatures(component)
+        self.copyPasteBodies = CopyPasteBodies(component)
+        self.moveFeatures = MoveFeatures(component)
+        self.baseFeatures = BaseFeatures(component)
+
+
+class Occurrence(_Entity):
+    def __init__(self, occurrences, component, transform):
+        self._owner = occurrences
+        self.component = component
+        self.transform = transform
+        self.entityToken = _token('Occurrence')
+
+    @property
+    def transform2(self) -> Matrix3D:
+        return self.transform
+
+    @transform2.setter
+    def transform2(self, transform: Matrix3D):
+        record('Occurrence.transform2')
+        self.transform = transform
+
+    def deleteMe(self) -> bool:
+        # A component without occurrences is deleted with its last occurrence.
+        super().deleteMe()
+        if not any(occurrence.component is self.component for occurrence in self._owner):
+            self.component._deleted = True
+        return True
+
+
+class Occurrences(_Collection):
+    def addNewComponent(self, transform: Matrix3D) -> Occurrence:
+        record('Occurrences.addNewComponent')
+        occurrence = Occurrence(self, Component(''), transform)
+        self._items.append(occurrence)
+        return occurrence
+
+    def addExistingComponent(self, component, transform: Matrix3D) -> Occurrence:
+        record('Occurrences.addExistingComponent')
+        occurrence = Occurrence(self, component, transform)
+        self._items.append(occurrence)
+        return occurrence
+
+
+class Component(_Entity):
+    def __init__(self, name: str = 'root'):
+        self.name = name
+        self.occurrences = Occurrences()
+        self.sketches = Sketches(self)
+        self.features = Features(self)
+        self.bRepBodies = BRepBodies()
+        self.xYConstructionPlane = ConstructionPlane('xY')
+        self.xZConstructionPlane = ConstructionPlane('xZ')
+        self.yZConstructionPlane = ConstructionPlane('yZ')
+        self.xConstructionAxis = ConstructionAxis('x')
+        self.yConstructionAxis = ConstructionAxis('y')
+        self.zConstructionAxis = ConstructionAxis('z')
+
+
+class Design:
+    def __init__(self):
+        _attributes.clear()
+        self.rootComponent = Component()
+        self.designType = DesignTypes.ParametricDesignType
+        self.timeline = Timeline()
+
+    def findAttributes(self, group_name: str, name: str) -> list:
+        record('Design.findAttributes')
+        return [attribute for attribute in _attributes
+                if attribute.groupName == group_name and attribute.name == name and attribute.parent is not None]
+
+    def deleteEntities(self, entities) -> bool:
+        record('Design.deleteEntities')
+        for entity in list(entities):
+            entity._deleted = True
+            if entity._owner is not None and entity in entity._owner._items:
+                entity._owner._items.remove(entity)
+        return True
+
+    @staticmethod
+    def cast(obj):
+        return obj if isinstance(obj, Design) else None
+
+
+def __getattr__(name: str):
+    # Types that are only used in annotations by the add-in.
+    cls = type(name, (), {})
+    globals()[name] = cls
+    return cls
@@ -0,0 +1,8 @@
+# The geometry engine does not need Fusion, its tests import it from the add-in folder the way
+# its command line tools run, e.g. python -m lib.cycloidGeometry.sweep.
+
+import os
+import sys
+
+ADDIN_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Cycloid Generator Add In')
+sys.path.insert(0, ADDIN_FOLDER)
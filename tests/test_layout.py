@@ -0,0 +1,50 @@
+import pytest
+
+from lib import cycloidGeometry as geometry
+
+numpy_only = pytest.mark.skipif(not geometry.has_numpy(), reason='NumPy is not installed')
+
+DESIGNS = [(11, 5.0, 0.5, 0.25), (31, 5.0, 0.25, 0.08), (101, 10.0, 0.15, 0.05)]
+
+
+@pytest.mark.parametrize('pin_count, cycloid_radius, pin_radius, eccentricity', DESIGNS)
+def test_layout_matches_drive(pin_count, cycloid_radius, pin_radius, eccentricity):
+    drive = geometry.compute_drive(pin_count, cycloid_radius, pin_radius, eccentricity, use_numpy=False)
+    layout = geometry.compute_layout(pin_count, cycloid_radius, pin_radius, eccentricity, use_numpy=False)
+    assert layout.pin_xs == pytest.approx(drive.pin_xs)
+    assert layout.pin_ys == pytest.approx(drive.pin_ys)
+    assert layout.hole_xs == pytest.approx(drive.hole_xs)
+    assert layout.hole_ys == pytest.approx(drive.hole_ys)
+    for name in ('bore_center', 'bore_radius', 'output_pin_radius', 'throughhole_radius'):
+        assert getattr(layout, name) == getattr(drive, name)
+
+
+@numpy_only
+@pytest.mark.parametrize('pin_count, cycloid_radius, pin_radius, eccentricity', DESIGNS)
+def test_numpy_matches_python(pin_count, cycloid_radius, pin_radius, eccentricity):
+    fast = geometry.compute_layout(pin_count, cycloid_radius, pin_radius, eccentricity, use_numpy=True)
+    slow = geometry.compute_layout(pin_count, cycloid_radius, pin_radius, eccentricity, use_numpy=False)
+    fast_clearances = geometry.layout_clearances(fast, use_numpy=True)
+    slow_clearances = geometry.layout_clearances(slow, use_numpy=False)
+    assert fast_clearances == pytest.approx(slow_clearances, abs=1e-9)
+
+    fast = geometry.optimize_holes(pin_count, cycloid_radius, pin_radius, eccentricity, use_numpy=True)
+    slow = geometry.optimize_holes(pin_count, cycloid_radius, pin_radius, eccentricity, use_numpy=False)
+    assert fast.hole_count == slow.hole_count
+    assert fast.hole_circle == pytest.approx(slow.hole_circle, abs=1e-9)
+    assert fast.hole_radius == pytest.approx(slow.hole_radius, abs=1e-9)
+
+
+@pytest.mark.parametrize('pin_count, cycloid_radius, pin_radius, eccentricity', DESIGNS)
+def test_optimized_holes_keep_every_wall(pin_count, cycloid_radius, pin_radius, eccentricity):
+    layout = geometry.optimize_holes(pin_count, cycloid_radius, pin_radius, eccentricity)
+    assert layout.output_pin_radius > 0
+    assert geometry.check_layout(layout) == ()
+    clearances = geometry.layout_clearances(layout)
+    assert min(clearances['hole_spacing'], clearances['hole_bore'], clearances['hole_outline']) == \
+        pytest.approx(geometry.MIN_WALL_THICKNESS, abs=0.002)
+
+    # The default count is one of the candidates, so the chosen one carries at least as much.
+    default = geometry.optimize_holes(pin_count, cycloid_radius, pin_radius, eccentricity,
+                                      hole_count=geometry.output_hole_count(pin_count))
+    assert layout.hole_count * layout.output_pin_radius >= default.hole_count * default.output_pin_radius - 1e-9
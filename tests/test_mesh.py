@@ -0,0 +1,51 @@
+from collections import Counter
+
+import pytest
+
+from lib import cycloidGeometry as geometry
+
+numpy_only = pytest.mark.skipif(not geometry.has_numpy(), reason='NumPy is not installed')
+
+
+def _assert_watertight(mesh):
+    # Every edge is shared by exactly two faces that run through it in opposite directions.
+    edges = Counter()
+    for a, b, c in mesh.faces:
+        a, b, c = int(a), int(b), int(c)
+        assert len({a, b, c}) == 3
+        edges.update(((a, b), (b, c), (c, a)))
+    assert all(count == 1 for count in edges.values())
+    assert all((b, a) in edges for a, b in edges)
+    used = {index for edge in edges for index in edge}
+    assert used == set(range(mesh.vertex_count))
+
+
+def _canonical(face):
+    a, b, c = (int(index) for index in face)
+    first = min(range(3), key=(a, b, c).__getitem__)
+    return ((a, b, c) * 2)[first:first + 3]
+
+
+@pytest.mark.parametrize('use_numpy', [False, pytest.param(True, marks=numpy_only)])
+@pytest.mark.parametrize('pin_count, cycloid_radius, pin_radius, eccentricity', [(11, 5.0, 0.5, 0.25),
+                                                                                (31, 5.0, 0.25, 0.1)])
+def test_drive_meshes_are_watertight(use_numpy, pin_count, cycloid_radius, pin_radius, eccentricity):
+    drive = geometry.compute_drive(pin_count, cycloid_radius, pin_radius, eccentricity, 0.001, use_numpy=use_numpy)
+    parts = geometry.drive_meshes(drive, 0.5, 1.0, disc_count=2, disc_set_count=2, use_numpy=use_numpy)
+    assert [part.name for part in parts] == ['disc', 'roller plate', 'roller pins', 'output pins']
+    assert len(parts[0].transforms) == 4
+    assert len(parts[2].transforms) == pin_count
+    for part in parts:
+        _assert_watertight(part.mesh)
+
+
+@numpy_only
+def test_numpy_matches_python():
+    drive = geometry.compute_drive(11, 5.0, 0.5, 0.25, 0.001, use_numpy=False)
+    fast = geometry.disc_mesh(drive, 0.5, use_numpy=True)
+    slow = geometry.disc_mesh(drive, 0.5, use_numpy=False)
+    # The caps may be fanned in a different order, so compare the faces as a set.
+    assert {_canonical(face) for face in fast.faces.tolist()} == {_canonical(face) for face in slow.faces}
+    assert len(fast.vertices) == len(slow.vertices)
+    for fast_vertex, slow_vertex in zip(fast.vertices.tolist(), slow.vertices):
+        assert fast_vertex == pytest.approx(list(slow_vertex))
@@ -0,0 +1,58 @@
+import math
+
+import pytest
+
+from lib import cycloidGeometry as geometry
+
+numpy_only = pytest.mark.skipif(not geometry.has_numpy(), reason='NumPy is not installed')
+
+
+def _segments_cross(a, b, c, d):
+    def turn(p, q, r):
+        return (q[0] - p[0]) * (r[1] - p[1]) - (q[1] - p[1]) * (r[0] - p[0])
+    return turn(a, b, c) * turn(a, b, d) < 0 and turn(c, d, a) * turn(c, d, b) < 0
+
+
+def _is_simple(xs, ys) -> bool:
+    points = list(zip(xs, ys))
+    n = len(points)
+    for i in range(n):
+        for j in range(i + 2, n):
+            if i == 0 and j == n - 1:
+                continue
+            if _segments_cross(points[i], points[(i + 1) % n], points[j], points[(j + 1) % n]):
+                return False
+    return True
+
+
+@pytest.mark.parametrize('use_numpy', [False, pytest.param(True, marks=numpy_only)])
+def test_loops_are_trimmed(use_numpy):
+    # Moved outwards by more than the radius of curvature at the lobe roots, every lobe loops once.
+    offset = -0.5
+    outline = geometry.equidistant_profile(11, 5.0, 0.1, offset, 0.001, use_numpy=use_numpy)
+    assert outline.loops_trimmed == 10
+    assert outline.converged
+    xs, ys = list(outline.xs), list(outline.ys)
+    assert _is_simple(xs, ys)
+
+    # No point of the outline is closer to the profile than the offset.
+    profile_xs, profile_ys = geometry.cycloid_profile(11, 5.0, 0.1, 4000, use_numpy=False)
+    for x, y in zip(xs, ys):
+        nearest = min(math.hypot(x - px, y - py) for px, py in zip(profile_xs, profile_ys))
+        assert nearest > abs(offset) - 0.002
+
+
+def test_no_loops_to_trim():
+    outline = geometry.equidistant_profile(11, 5.0, 0.25, 0.9, 0.001)
+    assert outline.loops_trimmed == 0
+    assert _is_simple(list(outline.xs), list(outline.ys))
+
+
+@numpy_only
+def test_numpy_matches_python():
+    fast = geometry.equidistant_profile(11, 5.0, 0.1, -0.5, 0.001, use_numpy=True)
+    slow = geometry.equidistant_profile(11, 5.0, 0.1, -0.5, 0.001, use_numpy=False)
+    assert fast.loops_trimmed == slow.loops_trimmed
+    assert fast.point_count == slow.point_count
+    assert list(fast.xs) == pytest.approx(slow.xs, abs=1e-9)
+    assert list(fast.ys) == pytest.approx(slow.ys, abs=1e-9)
@@ -0,0 +1,48 @@
+import math
+
+import pytest
+
+from lib import cycloidGeometry as geometry
+
+numpy_only = pytest.mark.skipif(not geometry.has_numpy(), reason='NumPy is not installed')
+
+
+@pytest.mark.parametrize('use_numpy', [False, pytest.param(True, marks=numpy_only)])
+def test_lobes_are_rotated_copies(use_numpy):
+    profile = geometry.adaptive_profile(11, 5.0, 0.25, 0.001, use_numpy=use_numpy)
+    lobes = profile.lobe_count
+    assert lobes == 10
+    size = profile.point_count // lobes
+    step = 2 * math.pi / lobes
+    xs, ys = list(profile.xs), list(profile.ys)
+    for k in range(1, lobes):
+        cos_a, sin_a = math.cos(k * step), math.sin(k * step)
+        for i in range(size):
+            x, y = xs[i], ys[i]
+            assert xs[k * size + i] == pytest.approx(cos_a * x - sin_a * y, abs=1e-12)
+            assert ys[k * size + i] == pytest.approx(sin_a * x + cos_a * y, abs=1e-12)
+
+
+@pytest.mark.parametrize('use_numpy', [False, pytest.param(True, marks=numpy_only)])
+def test_lobe_symmetry_points_lie_on_the_profile(use_numpy):
+    profile = geometry.adaptive_profile(31, 5.0, 0.08, 0.001, use_numpy=use_numpy)
+    assert profile.converged
+    assert profile.max_error <= 0.001
+    xs, ys = geometry.cycloid_points(31, 5.0, 0.08, profile.angles, use_numpy=use_numpy)
+    for x, y, px, py in zip(xs, ys, profile.xs, profile.ys):
+        assert math.hypot(x - px, y - py) < 1e-9
+
+
+@numpy_only
+@pytest.mark.parametrize('pin_count, cycloid_radius, eccentricity', [(11, 5.0, 0.25), (101, 10.0, 0.05)])
+def test_numpy_matches_python(pin_count, cycloid_radius, eccentricity):
+    fast = geometry.cycloid_profile(pin_count, cycloid_radius, eccentricity, 2000, use_numpy=True)
+    slow = geometry.cycloid_profile(pin_count, cycloid_radius, eccentricity, 2000, use_numpy=False)
+    assert list(fast[0]) == pytest.approx(slow[0], abs=1e-12)
+    assert list(fast[1]) == pytest.approx(slow[1], abs=1e-12)
+
+    fast = geometry.adaptive_profile(pin_count, cycloid_radius, eccentricity, 0.001, use_numpy=True)
+    slow = geometry.adaptive_profile(pin_count, cycloid_radius, eccentricity, 0.001, use_numpy=False)
+    assert fast.point_count == slow.point_count
+    assert list(fast.xs) == pytest.approx(slow.xs, abs=1e-12)
+    assert list(fast.ys) == pytest.approx(slow.ys, abs=1e-12)
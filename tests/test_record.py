@@ -0,0 +1,47 @@
+import pytest
+
+from lib import cycloidGeometry as geometry
+
+numpy_only = pytest.mark.skipif(not geometry.has_numpy(), reason='NumPy is not installed')
+
+
+@pytest.fixture
+def drive():
+    return geometry.compute_drive(11, 5.0, 0.5, 0.25, 0.001)
+
+
+@pytest.mark.parametrize('use_numpy, memory_map', [(False, False), pytest.param(True, False, marks=numpy_only),
+                                                   pytest.param(True, True, marks=numpy_only)])
+def test_round_trip(tmp_path, drive, use_numpy, memory_map):
+    path = str(tmp_path / 'drive.cyr')
+    parameters = {'pin_count': 11, 'disk_extent_length': 0.5, 'disc_count': 2}
+    geometry.write_record(path, drive, parameters, tolerance=0.001, sampling={'max_samples': 20000})
+
+    record = geometry.read_record(path, use_numpy=use_numpy, memory_map=memory_map)
+    # The drive inputs are stored with the parameters.
+    assert record.parameters == dict(parameters, cycloid_radius=5.0, pin_radius=0.5, eccentricity=0.25)
+    assert record.tolerance == 0.001
+    assert record.sampling == {'max_samples': 20000}
+    read = record.drive
+    assert (read.pin_count, read.cycloid_radius, read.pin_radius, read.eccentricity, read.clearance) == \
+        (drive.pin_count, drive.cycloid_radius, drive.pin_radius, drive.eccentricity, drive.clearance)
+    for name in ('xs', 'ys'):
+        assert list(getattr(read.profile, name)) == list(getattr(drive.profile, name))
+        assert list(getattr(read.outline, name)) == list(getattr(drive.outline, name))
+    assert list(read.profile.angles) == list(drive.profile.angles)
+    assert list(read.pin_xs) == list(drive.pin_xs)
+    assert list(read.hole_ys) == list(drive.hole_ys)
+    assert read.outline.loops_trimmed == drive.outline.loops_trimmed
+
+
+@pytest.mark.parametrize('damage', [
+    lambda data: b'XXXX' + data[4:],
+    lambda data: data[:4] + b'\x09\x00' + data[6:],
+    lambda data: data[:len(data) // 2],
+])
+def test_damaged_record(tmp_path, drive, damage):
+    path = tmp_path / 'drive.cyr'
+    geometry.write_record(str(path), drive)
+    path.write_bytes(damage(path.read_bytes()))
+    with pytest.raises(ValueError):
+        geometry.read_record(str(path))
@@ -0,0 +1,49 @@
+import pytest
+
+from lib import cycloidGeometry as geometry
+
+
+@pytest.fixture
+def table_path(tmp_path):
+    table, errors = geometry.build_table([(11, 0.05), (31, 0.016)])
+    assert not errors
+    path = str(tmp_path / 'table.cyt')
+    table.save(path)
+    return path
+
+
+def test_round_trip(table_path):
+    table = geometry.ProfileTable.load(table_path)
+    assert sorted(table.keys()) == [(11, 0.05), (31, 0.016)]
+    assert table.tolerance == geometry.TABLE_TOLERANCE
+
+
+@pytest.mark.parametrize('cycloid_radius', [2.5, 5.0, 10.0])
+def test_profiles_match_live_ones(table_path, cycloid_radius):
+    table = geometry.ProfileTable.load(table_path)
+    results = geometry.check_table(table, cycloid_radii=[cycloid_radius])
+    assert len(results) == 2
+    assert all(result['ok'] for result in results)
+
+
+def test_lookup(table_path):
+    table = geometry.ProfileTable.load(table_path)
+    # Any radius, pin radius and clearance with a tabled eccentricity ratio.
+    drive = table.lookup(11, 6.0, 0.5, 0.3, 0.001, clearance=0.3)
+    live = geometry.compute_drive(11, 6.0, 0.5, 0.3, 0.001, clearance=0.3)
+    assert drive is not None
+    assert drive.outline.point_count == live.outline.point_count
+    assert list(drive.outline.xs) == pytest.approx(list(live.outline.xs))
+    assert drive.profile.max_error <= 0.001
+
+    assert table.lookup(11, 6.0, 0.5, 0.31, 0.001) is None
+    # The unit profile is not accurate enough for this tolerance on this radius.
+    assert table.lookup(11, 6.0, 0.5, 0.3, 0.0001) is None
+    assert table.lookup(11, 6.0, 0.5, 0.3, 0.001, max_samples=100) is None
+
+
+def test_damaged_table(table_path):
+    with open(table_path, 'r+b') as file:
+        file.write(b'XXXX')
+    with pytest.raises(ValueError):
+        geometry.ProfileTable.load(table_path)